@@ -1,16 +1,35 @@
 import re
 from xxlimited import foo
 from fastapi import APIRouter, HTTPException
-from openai import OpenAI
+from fastapi.responses import StreamingResponse
+from openai import AsyncOpenAI
 from datetime import datetime
+import os
 import json
+import time
+import uuid
 import asyncio
 from dotenv import load_dotenv
-from database.schemas import ChatRequest, ChatResponse, FoodItem, FoodItemList
-from client.usda_client import USDAClient
+from database.schemas import (
+    ChatRequest, ChatResponse, FoodItem, FoodItemList, IntentWithItems, ItemEstimateList, ItemSelectionList
+)
+from client.usda_client import create_usda_client
+from client.fdc_nutrients import extract_usda_nutrients
+from client.fdc_search import match_confidence
+from client.food_resolutions import FoodResolutionStore
+from client.conversations import ConversationStore
+from client.nutrient_knn import NutrientKNN
+from utils.food_keys import canonical_food_key, starts_with_count, UNITS
+from utils.portions import portion_grams, size_hint
+from utils.nutrient_vector import NutrientVector
 from llm.tools import USDA_FUNCTION
+from llm.client import get_openai_client, request_scope, openai_dependency
+from llm.intent import classify_intent, intent_agreement
+from llm.history import compact_history, format_history, history_with_summary
+from llm.routing import InvalidOutput, confidence_of, model_router, request_route
 from llm.helpers import (
     create_openai_response, 
+    create_parsed_response,
     extract_response_text, 
     clean_json_text, 
     filter_usda_json
@@ -19,17 +38,66 @@ from llm.prompts import (
     FOOD_LOOKUP_PROMPT,
     INTENT_CLASSIFICATION_PROMPT,
     SELECTION_PROMPT,
+    SELECTION_BATCH_PROMPT,
     USDA_EXTRACTION_PROMPT,
     LLM_ESTIMATION_PROMPT,
-    CHAT_RESPONSE_PROMPT
+    LLM_BATCH_ESTIMATION_PROMPT,
+    CHAT_RESPONSE_PROMPT,
+    COMBINED_INTENT_PROMPT
 )
-from utils.secrets import get_secret
+from utils.metrics import LatencyStats, register_stats
+from utils.batching import MicroBatcher
+from utils.deadline import DeadlineExceeded, deadline_scope, stage, stage_timings, time_limit, timed_stage
 
 
 router = APIRouter()
 
-# Initialize USDA client
-usda_client = USDAClient()
+# Initialize USDA client (or the local FDC mirror, see create_usda_client)
+usda_client = create_usda_client()
+food_resolutions = FoodResolutionStore()
+conversations = ConversationStore()
+# Nearest-neighbour estimates over the FDC mirror, tried before the LLM estimate (needs FDC_KNN_INDEX)
+nutrient_knn = NutrientKNN()
+
+# Minimum top-1/top-2 margin for trusting a ranked search hit without the SELECTION_PROMPT call
+FDC_SELECTION_MARGIN = float(os.getenv("FDC_SELECTION_MARGIN", "0.2"))
+
+# two_step: intent call then FOOD_LOOKUP_PROMPT decomposition; combined: one structured call for both
+CHAT_PIPELINE_MODE = os.getenv("CHAT_PIPELINE_MODE", "two_step")
+pipeline_latency = LatencyStats("chat_pipeline")
+
+# two_step only: decompose the meal and start its USDA searches while the intent call runs,
+# discarding that work when the intent is chat (see speculation on /metrics)
+CHAT_SPECULATIVE = os.getenv("CHAT_SPECULATIVE", "false").lower() == "true"
+speculation_stats = {"started": 0, "used": 0, "wasted": 0, "failed": 0,
+                     "searches": 0, "wasted_searches": 0, "saved_ms": 0.0, "wasted_ms": 0.0}
+register_stats("speculation", lambda: {
+    **speculation_stats,
+    "saved_ms": round(speculation_stats["saved_ms"], 1),
+    "wasted_ms": round(speculation_stats["wasted_ms"], 1),
+    "waste_rate": round(speculation_stats["wasted"] / speculation_stats["started"], 4) if speculation_stats["started"] else 0.0,
+})
+# Speculative searches not yet consumed by a lookup (see use_search / discard_search)
+_speculative_searches = set()
+
+# Estimate the items of a meal that miss USDA (within a short window) in one LLM call
+LLM_BATCH_ESTIMATION = os.getenv("LLM_BATCH_ESTIMATION", "true").lower() == "true"
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "50"))
+estimation_stats = {"batches": 0, "batched_items": 0, "single_items": 0}
+register_stats("llm_estimation", lambda: dict(estimation_stats))
+# Ask the selector once for every ambiguous item of a meal (same window as estimation)
+LLM_BATCH_SELECTION = os.getenv("LLM_BATCH_SELECTION", "true").lower() == "true"
+selection_stats = {"batches": 0, "batched_items": 0, "single_items": 0}
+register_stats("llm_selection", lambda: dict(selection_stats))
+
+# Whole-request deadline (API Gateway stops waiting at ~29s) and per-stage budgets, in seconds;
+# CHAT_DEADLINE_RESERVE is kept back for building and saving the response
+CHAT_DEADLINE_SECONDS = float(os.getenv("CHAT_DEADLINE_SECONDS", "25"))
+CHAT_INTENT_BUDGET = float(os.getenv("CHAT_INTENT_BUDGET", "8"))
+CHAT_DECOMPOSE_BUDGET = float(os.getenv("CHAT_DECOMPOSE_BUDGET", "10"))
+CHAT_DEADLINE_RESERVE = float(os.getenv("CHAT_DEADLINE_RESERVE", "1"))
+
+NO_FOOD_ITEMS_MESSAGE = "No food items found in the description. Please provide a more detailed description."
 
 # Define USDA lookup function for OpenAI tools
 async def lookup_usda_nutrition(food_description: str) -> dict:
@@ -44,13 +112,16 @@ async def lookup_usda_nutrition(food_description: str) -> dict:
                 formatted_results.append({
                     "description": food.get("description", ""),
                     "fdc_id": food.get("fdcId", ""),
-                    "data_type": food.get("dataType", "")
+                    "data_type": food.get("dataType", ""),
+                    "score": food.get("score")
                 })
             
             return {
                 "success": True,
                 "search_results": formatted_results,
-                "count": len(formatted_results)
+                "count": len(formatted_results),
+                # Only the local mirror's ranked scores are comparable across results
+                "confidence": match_confidence(foods) if getattr(usda_client, "ranked_search", False) else None
             }
         return {"success": False, 
                 "error": f"No USDA data found for {food_description}"}
@@ -77,125 +148,445 @@ async def get_usda_nutrition_details(fdc_id: str) -> dict:
 
 
 
-import time
-async def food_lookup(client: OpenAI, request: ChatRequest) -> ChatResponse:
+async def decompose_meal(client: AsyncOpenAI, request: ChatRequest) -> list:
+    """Split the user's message into FoodItems with FOOD_LOOKUP_PROMPT"""
     chat_prompt = build_chat_prompt(request, FOOD_LOOKUP_PROMPT)
 
-    response = client.responses.parse(
-        model="gpt-4o-mini",
-        input=[{"role": "user", "content": chat_prompt}],
-        temperature=0.3,
-        text_format=FoodItemList,
-    )
+    async def decompose(route):
+        response = await create_parsed_response(
+            client, route.model,
+            [{"role": "user", "content": chat_prompt}],
+            FoodItemList,
+            temperature=route.temperature,
+            max_tokens=route.max_tokens
+        )
+        if response.output_parsed is None:
+            raise InvalidOutput("no food items parsed")
+        return response.output_parsed.items
 
-    food_items = response.output_parsed.items if response.output_parsed else []
+    try:
+        return await model_router.call("decompose", decompose)
+    except InvalidOutput as e:
+        print(f"Meal decomposition failed: {e}")
+        return []
+
+
+async def iter_food_item_results(client: AsyncOpenAI, food_items: list, searches: list = None):
+    """
+    Yield (index, result) for each food item as soon as its lookup completes.
+    searches, when given, holds each item's speculative USDA search (see speculate_food_lookup).
+    Lookups still running when the request deadline (minus CHAT_DEADLINE_RESERVE)
+    arrives are cancelled and yielded as timed-out errors.
+    Every result carries the item's lookup time as elapsed_ms.
+    """
+    # These batchers serve this request only, so they keep its deadline and concurrency slots
+    estimate_batcher = select_batcher = None
+    if LLM_BATCH_ESTIMATION and len(food_items) > 1:
+        # Items that miss USDA within the window share one estimation call
+        async def estimate_many(keys: list) -> dict:
+            estimates = await estimate_food_items(client, {int(key): food_items[int(key)] for key in keys})
+            return {str(index): result for index, result in estimates.items()}
+
+        estimate_batcher = MicroBatcher(
+            None, estimate_many, window=LLM_BATCH_WINDOW_MS / 1000, max_batch=len(food_items), isolated=False
+        )
 
-    if not food_items:
-        return ChatResponse(
-            message="No food items found in the description. Please provide a more detailed description."
+    search_results = {}
+    if LLM_BATCH_SELECTION and len(food_items) > 1:
+        # Ambiguous USDA searches finishing within the window share one selection call
+        async def select_many(keys: list) -> dict:
+            entries = {int(key): (food_items[int(key)], search_results[int(key)]) for key in keys}
+            selections = await select_food_items(client, entries)
+            return {str(index): selection for index, selection in selections.items()}
+
+        select_batcher = MicroBatcher(
+            None, select_many, window=LLM_BATCH_WINDOW_MS / 1000, max_batch=len(food_items), isolated=False
         )
 
+    started = time.perf_counter()
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    async def run(index: int, item: FoodItem):
+        estimate = (lambda: estimate_batcher.load(str(index))) if estimate_batcher else None
+        select = None
+        if select_batcher:
+            async def select(usda_result: dict) -> tuple:
+                search_results[index] = usda_result
+                return await select_batcher.load(str(index))
+        search = searches[index] if searches else None
+        try:
+            result = await process_single_food_item(client, item, estimate, select, search=search)
+        except Exception as e:
+            print(f"Food lookup failed for {item.description}: {e}")
+            result = None
+        result = result or {"error": f"Could not look up {item.description}"}
+        return index, {**result, "elapsed_ms": elapsed_ms()}
+
+    tasks = [asyncio.create_task(run(index, item)) for index, item in enumerate(food_items)]
+    pending = set(range(len(food_items)))
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=time_limit(reserve=CHAT_DEADLINE_RESERVE)):
+            index, result = await next_done
+            pending.discard(index)
+            yield index, result
+    except TimeoutError:
+        for index in sorted(pending):
+            tasks[index].cancel()
+            print(f"Food lookup for {food_items[index].description} cancelled at the deadline")
+            yield index, {
+                "error": f"Timed out looking up {food_items[index].description}",
+                "timed_out": True,
+                "elapsed_ms": elapsed_ms(),
+            }
+    finally:
+        # Stop outstanding lookups if the consumer goes away (e.g. a closed stream)
+        for task in tasks:
+            task.cancel()
+
+
+async def estimate_food_items(client: AsyncOpenAI, items: dict) -> dict:
+    """
+    LLM estimates for {index: FoodItem} in one structured-output call. Items the
+    batch does not cover (or a failed batch) fall back to try_llm_food_lookup.
+    """
+    results = {}
+    if len(items) > 1:
+        indexed = list(items.items())
+        item_lines = "\n".join(
+            f"{position}. {item.user_serving_size}g {item.description}"
+            for position, (_, item) in enumerate(indexed)
+        )
+        async def estimate_batch(route):
+            response = await create_parsed_response(
+                client, route.model,
+                [{"role": "system", "content": LLM_BATCH_ESTIMATION_PROMPT},
+                 {"role": "user", "content": f"Lookup nutrition for:\n{item_lines}"}],
+                ItemEstimateList,
+                temperature=route.temperature,
+                max_tokens=route.max_tokens
+            )
+            if response.output_parsed is None:
+                raise InvalidOutput("no estimates parsed")
+            return response.output_parsed.estimates
+
+        try:
+            estimates = await model_router.call("batch_estimation", estimate_batch)
+            estimation_stats["batches"] += 1
+            for estimate in estimates:
+                if not 0 <= estimate.item_index < len(indexed):
+                    continue
+                index, item = indexed[estimate.item_index]
+                if index in results:
+                    continue
+                nutritional_estimate = build_nutrition_estimate(estimate.model_dump(), item)
+                if nutritional_estimate is not None:
+                    results[index] = {"nutrition": nutritional_estimate}
+            estimation_stats["batched_items"] += len(results)
+        except Exception as e:
+            print(f"Batched estimation failed for {len(items)} items: {e}")
+
+    async def single(index: int, item: FoodItem):
+        try:
+            return index, await try_llm_food_lookup(client, item)
+        except Exception as e:
+            print(f"LLM estimation failed for {item.description}: {e}")
+            return index, {"error": f"Could not estimate nutrition for {item.description}"}
+
+    remaining = [single(index, item) for index, item in items.items() if index not in results]
+    estimation_stats["single_items"] += len(remaining)
+    results.update(await asyncio.gather(*remaining))
+    return results
+
+
+def build_lookup_response(results: list) -> ChatResponse:
+    """ChatResponse from per-item lookup results, in item order"""
     meal_results = []
     errors = []
-    
-    tasks = [
-        process_single_food_item(client, item) for item in food_items
-    ]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    item_timings = []
 
-    for result in results:
+    for index, result in enumerate(results):
         if isinstance(result, dict):
             if "nutrition" in result:
                 meal_results.append(result["nutrition"])
             if "error" in result:
                 errors.append(result["error"])
+            status = "timed_out" if result.get("timed_out") else "ok" if "nutrition" in result else "error"
+            item_timings.append({"index": index, "status": status, "elapsed_ms": result.get("elapsed_ms")})
 
     return ChatResponse(
         message="Nutrition lookup completed",
         meals=meal_results,
-        errors=errors
+        totals=NutrientVector.sum(NutrientVector.from_dict(meal) for meal in meal_results).to_dict(),
+        errors=errors,
+        timings={"items": item_timings}
     )
 
-async def process_single_food_item(client: OpenAI, item: FoodItem) -> dict:
-    result = await try_usda_food_lookup(client, item)
+async def process_single_food_item(client: AsyncOpenAI, item: FoodItem, estimate=None, select=None, search=None) -> dict:
+    """
+    USDA lookup (skipped while its circuit is open), falling back to a confident kNN
+    estimate, then estimate() (a batched estimation) or a single LLM estimate.
+    select, when given, replaces the per-item LLM selection (see select_usda_food);
+    search is the item's speculative USDA search, discarded when the lookup does not use it.
+    """
+    # While the USDA circuit is open, go straight to the fallbacks instead of failing per call
+    try:
+        if getattr(usda_client, "available", True):
+            result = await try_usda_food_lookup(client, item, select, search)
+            if result:
+                return result
+    finally:
+        discard_search(search)
+    result = await try_knn_food_lookup(item)
     if result:
         return result
+    elif estimate is not None:
+        return await estimate()
     else:
         return await try_llm_food_lookup(client, item)
         
 
-async def try_llm_food_lookup(client: OpenAI, item: FoodItem) -> ChatResponse:
+async def try_knn_food_lookup(item: FoodItem) -> dict | None:
+    """Estimate from the nearest FDC foods, or None when they are not similar enough"""
+    estimate = await nutrient_knn.estimate(item.description)
+    if estimate is None:
+        return None
+    neighbours = ", ".join(f"{description} ({similarity:.2f})" for _, description, similarity in estimate.neighbours[:3])
+    meal_data = {
+        "intent": "log_food",
+        "description": item.description,
+        **estimate.nutrients.to_dict(digits=4),
+        "assumptions": f"Estimated from similar USDA foods: {neighbours}",
+    }
+    nutritional_estimate = build_nutrition_estimate(meal_data, item)
+    nutritional_estimate["similarity"] = estimate.similarity
+    return {"nutrition": nutritional_estimate}
+
+
+async def try_llm_food_lookup(client: AsyncOpenAI, item: FoodItem) -> ChatResponse:
     item_lookup = f"Lookup nutrition for {item.user_serving_size}g {item.description}"
     print(f"LLM Processing for {item_lookup}")
-    response = await create_openai_response(
-        client, "gpt-4o-mini",
-        [{"role": "user", "content": item_lookup}],
-        LLM_ESTIMATION_PROMPT
-    )
-    response_text = extract_response_text(response)
-    nutritional_estimate = extract_nutrition_estimate(response_text, item)
-    if (nutritional_estimate is not None):
-        return {"nutrition": nutritional_estimate}
-    else:
+
+    async def estimate(route):
+        response = await create_openai_response(
+            client, route.model,
+            [{"role": "user", "content": item_lookup}],
+            LLM_ESTIMATION_PROMPT,
+            temperature=route.temperature,
+            max_tokens=route.max_tokens,
+            prompt_type="estimation",
+            cache_key=[canonical_food_key(item.description).key, item.user_serving_size]
+        )
+        nutritional_estimate = extract_nutrition_estimate(extract_response_text(response), item)
+        if nutritional_estimate is None:
+            raise InvalidOutput(f"no nutrition estimate for {item.description}")
+        return nutritional_estimate
+
+    try:
+        return {"nutrition": await model_router.call("estimation", estimate)}
+    except InvalidOutput:
         return {"error": f"Could not estimate nutrition for {item.description}"}
 
 
-async def try_usda_food_lookup(client: OpenAI, item: FoodItem) -> dict | None:
-    usda_result = await lookup_usda_nutrition(item.description)
-    if (usda_result.get("success")):
-        results_text = f"Result for Food Item: {item.description}:\n"
-        for i, result in enumerate(usda_result.get("search_results", []), 1):
-            results_text += f"{i}. {result['description']} (FDC ID: {result['fdc_id']})\n"
-        
+async def select_usda_food(client: AsyncOpenAI, item: FoodItem, usda_result: dict, select=None) -> tuple:
+    """
+    Pick the best FDC id from the search results, asking the LLM only when the ranking is ambiguous
+    (through select(usda_result) when batching selections for a meal).
+    Returns (fdc_id, source) where source is "ranked" or "llm".
+    """
+    confidence = usda_result.get("confidence")
+    if confidence is not None and confidence >= FDC_SELECTION_MARGIN:
+        return str(usda_result["search_results"][0]["fdc_id"]), "ranked"
+    if select is not None:
+        return await select(usda_result)
+
+    results_text = f"Result for Food Item: {item.description}:\n"
+    for i, result in enumerate(usda_result.get("search_results", []), 1):
+        results_text += f"{i}. {result['description']} (FDC ID: {result['fdc_id']})\n"
+
+    candidates = [str(result["fdc_id"]) for result in usda_result.get("search_results", [])]
+
+    async def select_with_llm(route):
         response = await create_openai_response(
             client,
-            "gpt-4o-mini",
+            route.model,
             [{"role": "user", "content": f"User requested nutritional for: {item.description}, USDA returned {results_text}\n"}],
-            SELECTION_PROMPT
+            SELECTION_PROMPT,
+            temperature=route.temperature,
+            max_tokens=route.max_tokens,
+            prompt_type="selection",
+            cache_key=[canonical_food_key(item.description).key, candidates]
         )
         response_text = extract_response_text(response)
         clean_text = clean_json_text(response_text)
         selected_item = json.loads(clean_text)
-        fdc_id = selected_item.get("id", "none") if not isinstance(selected_item, list) else selected_item[0].get("id", "none") 
-        nutrition_result = await get_usda_nutrition_details(fdc_id)
-
-        if nutrition_result.get("success"):
-            nutrition_data = filter_usda_json(nutrition_result["nutrition_data"])
-            input_content = (
-                "USDA returned nutritional estimate for: \n"
-                f"{fdc_id}\n\nUSDA JSON:\n{json.dumps(nutrition_data, indent=2)}"
+        fdc_id = str(selected_item.get("id", "none") if not isinstance(selected_item, list) else selected_item[0].get("id", "none"))
+        if fdc_id != "none" and fdc_id not in candidates:
+            raise InvalidOutput(f"selected FDC id {fdc_id} is not a search result")
+        return fdc_id
+
+    try:
+        return await model_router.call("selection", select_with_llm), "llm"
+    except InvalidOutput as e:
+        # Estimated instead, like a "none" selection
+        print(f"Selection failed for {item.description}: {e}")
+        return "none", "llm"
+
+
+async def select_food_items(client: AsyncOpenAI, entries: dict) -> dict:
+    """
+    LLM selections for {index: (FoodItem, usda_result)} in one structured-output call,
+    returning {index: (fdc_id, "llm")}. Items the batch does not answer with one of
+    their own candidates (or a failed batch) fall back to select_usda_food.
+    """
+    results = {}
+    indexed = list(entries.items())
+    if len(indexed) > 1:
+        blocks = []
+        for position, (_, (item, usda_result)) in enumerate(indexed):
+            lines = [f"Item {position}: {item.description}"]
+            for i, result in enumerate(usda_result.get("search_results", []), 1):
+                lines.append(f"  {i}. {result['description']} (FDC ID: {result['fdc_id']})")
+            blocks.append("\n".join(lines))
+        async def select_batch(route):
+            response = await create_parsed_response(
+                client, route.model,
+                [{"role": "system", "content": SELECTION_BATCH_PROMPT},
+                 {"role": "user", "content": "USDA returned:\n\n" + "\n\n".join(blocks)}],
+                ItemSelectionList,
+                temperature=route.temperature,
+                max_tokens=route.max_tokens
             )
-            response = await create_openai_response(
-                client, "gpt-4o-mini",
-                [{"role": "user", "content": input_content}],
-                USDA_EXTRACTION_PROMPT)
-
-            response_text = extract_response_text(response)
-            nutritional_estimate = extract_nutrition_estimate(response_text, item)
-            if (nutritional_estimate is not None):
-                return {"nutrition": nutritional_estimate}
-        
+            if response.output_parsed is None:
+                raise InvalidOutput("no selections parsed")
+            return response.output_parsed.selections
+
+        try:
+            selections = await model_router.call("batch_selection", select_batch)
+            selection_stats["batches"] += 1
+            for selection in selections:
+                if not 0 <= selection.item_index < len(indexed):
+                    continue
+                index, (_, usda_result) = indexed[selection.item_index]
+                candidates = {str(result["fdc_id"]) for result in usda_result.get("search_results", [])}
+                fdc_id = str(selection.fdc_id)
+                if index not in results and (fdc_id in candidates or fdc_id == "none"):
+                    results[index] = (fdc_id, "llm")
+            selection_stats["batched_items"] += len(results)
+        except Exception as e:
+            print(f"Batched selection failed for {len(indexed)} items: {e}")
+
+    async def single(index: int, item: FoodItem, usda_result: dict):
+        try:
+            return index, await select_usda_food(client, item, usda_result)
+        except Exception as e:
+            print(f"Selection failed for {item.description}: {e}")
+            return index, ("none", "llm")
+
+    remaining = [single(index, *entry) for index, entry in indexed if index not in results]
+    selection_stats["single_items"] += len(remaining)
+    results.update(await asyncio.gather(*remaining))
+    return results
+
+
+async def try_usda_food_lookup(client: AsyncOpenAI, item: FoodItem, select=None, search=None) -> dict | None:
+    food_key = canonical_food_key(item.description).key
+
+    # A previously learned resolution skips the search and selection round trips
+    fdc_id = await food_resolutions.get(food_key)
+    if fdc_id:
+        result = await usda_nutrition_for_item(client, item, fdc_id)
+        if result:
+            return result
+
+    usda_result = await use_search(search) if search is not None else await lookup_usda_nutrition(item.description)
+    if (usda_result.get("success")):
+        fdc_id, source = await select_usda_food(client, item, usda_result, select)
+        result = await usda_nutrition_for_item(client, item, fdc_id)
+        if result:
+            food_resolutions.record(food_key, fdc_id, usda_result.get("confidence"), source)
+            return result
+
     return None
 
+
+async def usda_nutrition_for_item(client: AsyncOpenAI, item: FoodItem, fdc_id: str) -> dict | None:
+    """Nutrition for item from the FDC record fdc_id, or None when it is unusable"""
+    nutrition_result = await get_usda_nutrition_details(fdc_id)
+    if not nutrition_result.get("success"):
+        return None
+
+    nutrition_data = filter_usda_json(nutrition_result["nutrition_data"])
+    # The record's own portions (e.g. "1 medium = 182 g") beat the generic density table
+    item = apply_portion(item, nutrition_data.get("foodPortions"))
+    usda_nutrients = extract_usda_nutrients(nutrition_data)
+    if usda_nutrients is not None:
+        return {"nutrition": build_nutrition_estimate(usda_nutrients, item)}
+
+    # Record lacks the core nutrients, let the LLM read what is there
+    input_content = (
+        "USDA returned nutritional estimate for: \n"
+        f"{fdc_id}\n\nUSDA JSON:\n{json.dumps(nutrition_data, indent=2)}"
+    )
+
+    async def extract(route):
+        response = await create_openai_response(
+            client, route.model,
+            [{"role": "user", "content": input_content}],
+            USDA_EXTRACTION_PROMPT,
+            temperature=route.temperature,
+            max_tokens=route.max_tokens,
+            prompt_type="usda_extraction")
+        nutritional_estimate = extract_nutrition_estimate(extract_response_text(response), item)
+        if nutritional_estimate is None:
+            raise InvalidOutput(f"no nutrition in FDC record {fdc_id}")
+        return nutritional_estimate
+
+    try:
+        return {"nutrition": await model_router.call("usda_extraction", extract)}
+    except InvalidOutput:
+        return None
+
 def extract_nutrition_estimate(response_text: str, item: FoodItem) -> dict | None:
     # # Clean up markdown code blocks
     clean_text = clean_json_text(response_text)
     
     # # Parse JSON and return nutrition estimate
     meal_data = json.loads(clean_text)
-    
+    return build_nutrition_estimate(meal_data, item)
+
+def apply_portion(item: FoodItem, food_portions: list = None) -> FoodItem:
+    """
+    Item with user_serving_size computed locally from its quantity and unit
+    (falling back to ones parsed from the description when they carry a unit or
+    open it as a count); unchanged when the portion cannot be converted.
+    """
+    food_key = canonical_food_key(item.description)
+    quantity, unit = item.quantity, item.unit
+    if unit:
+        unit = UNITS.get(unit.lower().strip().rstrip("."), unit.lower().strip())
+    if quantity is None and unit is None and (food_key.unit or starts_with_count(item.description)):
+        # A bare number elsewhere ("salad with 3 eggs") does not count the item itself
+        quantity, unit = food_key.quantity, food_key.unit
+    if quantity is None and unit is None:
+        return item
+
+    grams = portion_grams(food_key.key, quantity, unit, food_portions, size_hint(item.description))
+    if grams is None or grams <= 0:
+        return item
+    return item.model_copy(update={"user_serving_size": max(1, round(grams))})
+
+
+def build_nutrition_estimate(meal_data: dict, item: FoodItem) -> dict | None:
+    """Scale per-100g nutrition data to the item's serving size"""
     serving_size = item.user_serving_size or item.single_serving_size
 
     if meal_data.get("intent") == "log_food":
         nutrition_estimate = {
             "id": None,
             "timestamp": datetime.now().isoformat(),
-            "calories": get_value_per_serving_size(meal_data.get("calories", 0), serving_size),
-            "protein": get_value_per_serving_size(meal_data.get("protein", 0), serving_size),
-            "fiber": get_value_per_serving_size(meal_data.get("fiber", 0), serving_size),
-            "carbs": get_value_per_serving_size(meal_data.get("carbs", 0), serving_size),
-            "fat": get_value_per_serving_size(meal_data.get("fat", 0), serving_size),
-            "sugar": get_value_per_serving_size(meal_data.get("sugar", 0), serving_size),
+            **NutrientVector.from_dict(meal_data).for_grams(serving_size).to_dict(),
             "quantity": f"{serving_size}g",
             "description": meal_data.get("description", item.description),
             "assumptions": meal_data.get("assumptions", None)
@@ -209,23 +600,11 @@ def extract_nutrition_estimate(response_text: str, item: FoodItem) -> dict | Non
     else:
         return None
 
-def get_value_per_serving_size(value: int, user_serving_size: int) -> int:
-    if value is None:
-        return 0.0
-    return round(value / 100 * user_serving_size,2)
-
 def build_chat_prompt(request: ChatRequest, prompt: str) -> str:
     """Build chat prompt from request history and description"""
     
-    # Format conversation history
-    history_text = ""
-    if request.history:
-        for msg in request.history:
-            if msg["role"] == "user":
-                history_text += f"User: {msg['content']}\n"
-            elif msg["role"] == "assistant":
-                history_text += f"Assistant: {msg['content']}\n"
-    
+    history_text = format_history(request.history)
+
     # Build the chat prompt
     chat_prompt = prompt.format(
         history=history_text if history_text else "No previous conversation.",
@@ -235,19 +614,24 @@ def build_chat_prompt(request: ChatRequest, prompt: str) -> str:
     return chat_prompt
 
 
-async def chat_action(client: OpenAI, request: ChatRequest) -> ChatResponse:
+async def chat_action(client: AsyncOpenAI, request: ChatRequest) -> ChatResponse:
     # Generate a proper chat response using conversation history
     chat_prompt = build_chat_prompt(request, CHAT_RESPONSE_PROMPT)
 
     # Generate chat response using LLM
-    try:      
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": chat_prompt}],
-            temperature=0.3,
-            max_tokens=500
-        )
+    # An explicit model, temperature or max_tokens in the request applies to this reply only
+    route = request_route(model_router.route("chat"), request)
 
+    async def reply(route):
+        params = {"model": route.model, "messages": [{"role": "user", "content": chat_prompt}]}
+        if route.temperature is not None:
+            params["temperature"] = route.temperature
+        if route.max_tokens is not None:
+            params["max_tokens"] = route.max_tokens
+        return await openai_dependency.call(lambda: client.chat.completions.create(**params))
+
+    try:      
+        response = await model_router.call("chat", reply, route=route)
         generated_message = response.choices[0].message.content.strip()
 
         return ChatResponse(
@@ -262,46 +646,108 @@ async def chat_action(client: OpenAI, request: ChatRequest) -> ChatResponse:
 
 @router.post("/openai/chat", response_model=ChatResponse)
 async def openai_chat(request: ChatRequest):
-    openai_api_key = get_secret('openai_api_key')
-    if not openai_api_key:
+    try:
+        client = get_openai_client()
+    except ValueError:
         raise HTTPException(status_code=500, detail="OpenAI API key not available")
-    
-    client = OpenAI(api_key=openai_api_key)
 
-    input_content = (
-        "User says or asks the following: \n"
-        f"{request.description}\n\n"
-        "Conversation history: \n"
-        f"{json.dumps(request.history, indent=2)}\n\n"
-    )
-
-    response = await create_openai_response(
-        client,
-        "gpt-4o",
-        [{"role": "user", "content": input_content}],
-        INTENT_CLASSIFICATION_PROMPT,
-    )
-
-    response_text = extract_response_text(response)
-    response_text = clean_json_text(response_text)  
-    action_data = json.loads(response_text)
-    action = action_data.get("action")
-    
-    request.history = request.history or []
-    request.history.append({
-        "role": "assistant",
-        "content": response_text,
-        "timestamp": datetime.now().isoformat()
-    })
-
-    chat_response = None
+    async with request_scope():
+        with deadline_scope(CHAT_DEADLINE_SECONDS):
+            turns, summary = await load_conversation(request)
+            try:
+                chat_response = await run_chat_pipeline(client, request)
+            except DeadlineExceeded as e:
+                # Nothing to return when intent or decomposition ran out of time; item lookups return partial results
+                print(f"Chat request timed out: {e}")
+                raise HTTPException(status_code=504, detail=str(e))
+            await save_conversation(request, turns, summary, chat_response)
+            return chat_response
+
+
+async def load_conversation(request: ChatRequest) -> tuple:
+    """
+    Replace request.history with the stored, compacted conversation. Unknown ids
+    (or ids owned by another user) start a new conversation seeded from any
+    client-sent history. Returns (turns, summary).
+    """
+    stored = await conversations.load(request.conversation_id, request.user_id)
+    if stored is None:
+        request.conversation_id = str(uuid.uuid4())
+        client_turns = [msg for msg in request.history or [] if msg.get("role") in ("user", "assistant")]
+        stored = compact_history(client_turns)
+
+    turns, summary = stored
+    request.history = history_with_summary(turns, summary)
+    return turns, summary
+
+
+async def save_conversation(request: ChatRequest, turns: list, summary: str, chat_response: ChatResponse):
+    """Append this turn to the stored conversation and compact it"""
+    turns, summary = compact_history(turns + list(chat_response.history or []), summary)
+    await conversations.save(request.conversation_id, request.user_id, turns, summary)
+    chat_response.conversation_id = request.conversation_id
+
+
+async def run_chat_pipeline(client: AsyncOpenAI, request: ChatRequest) -> ChatResponse:
+    started = time.perf_counter()
+    async for event, data in chat_pipeline_events(client, request):
+        if event == "intent":
+            action = data["action"]
+        elif event == "summary":
+            chat_response = data
+    pipeline_latency.record(f"{CHAT_PIPELINE_MODE}.{action}", time.perf_counter() - started)
+    return chat_response
 
-    if action == "food_lookup":
-        chat_response = await food_lookup(client, request)
-    elif action == "chat":
-        chat_response = await chat_action(client, request)
 
-        
+async def chat_pipeline_events(client: AsyncOpenAI, request: ChatRequest):
+    """
+    The chat pipeline as (event, data) pairs: ("intent", {"action"}), for food lookups
+    ("items", {"items"}) and one ("item", {"index", ...result}) per item in completion
+    order, then ("summary", ChatResponse) with the finished response.
+    """
+    action, response_text, food_items, searches = await classify_with_speculation(client, request)
+    try:
+        request.history = request.history or []
+        request.history.append({
+            "role": "assistant",
+            "content": response_text,
+            "timestamp": datetime.now().isoformat()
+        })
+        yield "intent", {"action": action}
+
+        chat_response = None
+        if action == "food_lookup":
+            # Decompose the meal unless the combined intent call (or speculation) already did
+            if food_items is None:
+                async with stage("decompose", CHAT_DECOMPOSE_BUDGET, CHAT_DEADLINE_RESERVE):
+                    food_items = await decompose_meal(client, request)
+
+            if not food_items:
+                chat_response = ChatResponse(message=NO_FOOD_ITEMS_MESSAGE)
+            else:
+                food_items = [apply_portion(item) for item in food_items]
+                yield "items", {"items": [item.model_dump() for item in food_items]}
+                results = [None] * len(food_items)
+                with timed_stage("lookup"):
+                    async for index, result in iter_food_item_results(client, food_items, searches):
+                        results[index] = result
+                        yield "item", {"index": index, **result}
+                chat_response = build_lookup_response(results)
+        elif action == "chat":
+            async with stage("chat", reserve=CHAT_DEADLINE_RESERVE):
+                chat_response = await chat_action(client, request)
+    finally:
+        # Speculative searches for items that never reached a lookup
+        for search in searches:
+            discard_search(search)
+
+    finish_chat_response(request, action, chat_response)
+    yield "summary", chat_response
+
+
+def finish_chat_response(request: ChatRequest, action: str, chat_response: ChatResponse):
+    """Append this turn (user message and assistant summary) to the response history, and the stage timings"""
+    chat_response.timings = {"stages": stage_timings(), **(chat_response.timings or {})}
     # Append assistant response to conversation context
     if action == "food_lookup" and chat_response.meals:
         # Format food lookup response for context
@@ -316,18 +762,211 @@ async def openai_chat(request: ChatRequest):
     else:
         # Chat response
         assistant_content = chat_response.message if chat_response.message else "No response provided"
-    
-  
+
     chat_response.history.append({
         "role": "user",
         "content": request.description,
         "timestamp": datetime.now().isoformat()
-    })  
+    })
     chat_response.history.append({
         "role": "assistant",
         "content": assistant_content,
         "timestamp": datetime.now().isoformat()
     })
-    return chat_response
 
 
+@router.post("/openai/chat/stream")
+async def openai_chat_stream(request: ChatRequest):
+    """
+    Server-Sent Events version of /openai/chat: an intent event, one item event per
+    food item in completion order, then a summary event with the full ChatResponse.
+    """
+    try:
+        client = get_openai_client()
+    except ValueError:
+        raise HTTPException(status_code=500, detail="OpenAI API key not available")
+
+    return StreamingResponse(
+        stream_chat_pipeline(client, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_chat_pipeline(client: AsyncOpenAI, request: ChatRequest):
+    """chat_pipeline_events as SSE events, sent as results become available"""
+    # The scopes are entered here because the body is iterated after the route returns
+    async with request_scope():
+        with deadline_scope(CHAT_DEADLINE_SECONDS):
+            try:
+                started = time.perf_counter()
+                turns, summary = await load_conversation(request)
+                async for event, data in chat_pipeline_events(client, request):
+                    if event == "intent":
+                        action = data["action"]
+                    elif event == "summary":
+                        await save_conversation(request, turns, summary, data)
+                        pipeline_latency.record(f"stream.{CHAT_PIPELINE_MODE}.{action}", time.perf_counter() - started)
+                        data = data.model_dump()
+                    yield sse_event(event, data)
+            except Exception as e:
+                print(f"Chat stream failed: {e}")
+                yield sse_event("error", {"detail": str(e)})
+
+
+async def classify_with_speculation(client: AsyncOpenAI, request: ChatRequest) -> tuple:
+    """
+    classify_request within the intent budget. With CHAT_SPECULATIVE (two_step mode), the meal
+    decomposition and its first USDA searches run alongside it; for food_lookup the decomposed
+    items are returned as food_items with their search tasks (one per item, for
+    process_single_food_item), for chat the speculative work is cancelled.
+    Returns (action, response_text, food_items, searches).
+    """
+    speculation = None
+    if CHAT_SPECULATIVE and CHAT_PIPELINE_MODE == "two_step":
+        speculation_stats["started"] += 1
+        speculation = asyncio.create_task(speculate_food_lookup(client, request))
+
+    intent_started = time.perf_counter()
+    try:
+        async with stage("intent", CHAT_INTENT_BUDGET, CHAT_DEADLINE_RESERVE):
+            action, response_text, food_items = await classify_request(client, request)
+    except BaseException:
+        if speculation is not None:
+            discard_speculation(speculation, time.perf_counter() - intent_started)
+        raise
+
+    intent_seconds = time.perf_counter() - intent_started
+    if speculation is None:
+        return action, response_text, food_items, []
+    if action != "food_lookup":
+        discard_speculation(speculation, intent_seconds)
+        return action, response_text, food_items, []
+
+    try:
+        async with stage("decompose", CHAT_DECOMPOSE_BUDGET, CHAT_DEADLINE_RESERVE):
+            food_items, searches, speculated = await speculation
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        # The regular decomposition runs instead
+        speculation_stats["failed"] += 1
+        print(f"Speculative decomposition failed: {e}")
+        return action, response_text, None, []
+
+    speculation_stats["used"] += 1
+    speculation_stats["searches"] += len(searches)
+    # Decomposition time that overlapped the intent call
+    speculation_stats["saved_ms"] += min(speculated, intent_seconds) * 1000
+    return action, response_text, food_items, searches
+
+
+async def speculate_food_lookup(client: AsyncOpenAI, request: ChatRequest) -> tuple:
+    """Decompose the meal and start its USDA searches; returns (food_items, search tasks, seconds)"""
+    started = time.perf_counter()
+    food_items = await decompose_meal(client, request)
+    searches = []
+    if getattr(usda_client, "available", True):
+        # Handed to the item lookups, which await them instead of searching again
+        for item in food_items:
+            search = asyncio.create_task(lookup_usda_nutrition(item.description))
+            _speculative_searches.add(search)
+            searches.append(search)
+    return food_items, searches, time.perf_counter() - started
+
+
+def discard_speculation(speculation: asyncio.Task, seconds: float):
+    """Cancel speculative work for a request that turned out not to need it, counting what was wasted"""
+    speculation_stats["wasted"] += 1
+    if speculation.done() and not speculation.cancelled() and speculation.exception() is None:
+        _, searches, speculated = speculation.result()
+        for search in searches:
+            discard_search(search)
+        speculation_stats["wasted_ms"] += speculated * 1000
+    else:
+        speculation.cancel()
+        speculation_stats["wasted_ms"] += seconds * 1000
+
+
+async def use_search(search: asyncio.Task) -> dict:
+    """The result of a speculative search, which is no longer discarded"""
+    _speculative_searches.discard(search)
+    return await search
+
+
+def discard_search(search: asyncio.Task | None):
+    """Cancel a speculative search nothing used (a no-op once use_search took it), counting it as wasted"""
+    if search in _speculative_searches:
+        _speculative_searches.discard(search)
+        search.cancel()
+        speculation_stats["wasted_searches"] += 1
+
+
+async def classify_request(client: AsyncOpenAI, request: ChatRequest) -> tuple:
+    """
+    Decide between food_lookup and chat. Returns (action, response_text, food_items);
+    food_items is only set when the combined call already decomposed the meal.
+    """
+    # Obvious messages are classified locally, the rest by the LLM
+    guess = classify_intent(request.description)
+    if intent_agreement.use_fast_path(guess):
+        return guess.action, json.dumps(guess._asdict()), None
+
+    if CHAT_PIPELINE_MODE == "combined":
+        async def classify_combined(route):
+            response = await create_parsed_response(
+                client, route.model,
+                [{"role": "user", "content": build_chat_prompt(request, COMBINED_INTENT_PROMPT)}],
+                IntentWithItems,
+                temperature=route.temperature,
+                max_tokens=route.max_tokens
+            )
+            if response.output_parsed is None:
+                raise InvalidOutput("no intent parsed")
+            return response.output_parsed
+
+        try:
+            parsed = await model_router.call("combined_intent", classify_combined, lambda parsed: parsed.confidence)
+        except InvalidOutput as e:
+            # Fall back to the two-step intent call
+            print(f"Combined intent call failed: {e}")
+            parsed = None
+        if parsed is not None:
+            intent_agreement.record(guess, parsed.action, request.description)
+            response_text = json.dumps(parsed.model_dump(exclude={"items"}))
+            return parsed.action, response_text, parsed.items if parsed.action == "food_lookup" else None
+
+    input_content = (
+        "User says or asks the following: \n"
+        f"{request.description}\n\n"
+        "Conversation history: \n"
+        f"{format_history(request.history) or 'No previous conversation.'}\n\n"
+    )
+
+    async def classify(route):
+        response = await create_openai_response(
+            client,
+            route.model,
+            [{"role": "user", "content": input_content}],
+            INTENT_CLASSIFICATION_PROMPT,
+            temperature=route.temperature,
+            max_tokens=route.max_tokens,
+            prompt_type="intent"
+        )
+        response_text = clean_json_text(extract_response_text(response))
+        intent = json.loads(response_text)
+        if not isinstance(intent, dict) or intent.get("action") not in ("food_lookup", "chat"):
+            raise InvalidOutput(f"unexpected intent {response_text[:80]!r}")
+        return intent, response_text
+
+    intent, response_text = await model_router.call(
+        "intent", classify, lambda result: confidence_of(result[0].get("confidence"))
+    )
+    action = intent["action"]
+    intent_agreement.record(guess, action, request.description)
+    return action, response_text, None
@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 from database.crud import get_meals, create_meal, clear_meals, delete_meal as crud_delete_meal, get_meal
 from database.schemas import MealCreate, MealResponse
 from database.db import get_db
+from utils.nutrient_vector import NutrientVector
 
 router = APIRouter()
 
@@ -15,8 +16,9 @@ def get_meals_endpoint(
 ):
     
     meals = get_meals(user_id, search_date, db)
+    totals = NutrientVector.sum(NutrientVector.from_object(meal) for meal in meals)
     # SQLAlchemy objects are returned with all their attributes
-    return {"meals": meals}
+    return {"meals": meals, "totals": totals.to_dict()}
 
 @router.delete("/meals/{user_id}/clear")
 def clear_meals_endpoint(user_id: str, db: Session = Depends(get_db)):
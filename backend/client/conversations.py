@@ -0,0 +1,109 @@
+"""
+Server-side conversation history (conversations table) with an in-process fallback.
+
+Turns of one conversation can reach different Lambda containers, so the table is
+always read first; the in-process copy is only served while the database is down.
+"""
+import asyncio
+import os
+import time
+from typing import List, Optional, Tuple
+from utils.cache import LRUCache
+from utils.metrics import register_stats
+
+CONVERSATION_STORE_ENABLED = os.getenv("CONVERSATION_STORE_ENABLED", "true").lower() == "true"
+CONVERSATION_CACHE_SIZE = int(os.getenv("CONVERSATION_CACHE_SIZE", "512"))
+# After a database error only the in-process copy is used for this long
+CONVERSATION_RETRY_AFTER = float(os.getenv("CONVERSATION_RETRY_AFTER", "60"))
+
+
+class ConversationStore:
+    """Conversation turns and summary by conversation_id; database errors fall back to the in-process copy"""
+
+    def __init__(self, enabled: bool = CONVERSATION_STORE_ENABLED, cache_size: int = CONVERSATION_CACHE_SIZE):
+        self.enabled = enabled
+        self.memory = LRUCache(cache_size)
+        self._unavailable_until = 0.0
+        self._counters = {"memory_hits": 0, "store_hits": 0, "misses": 0, "writes": 0, "errors": 0}
+        register_stats("conversations", self.stats)
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    def _failed(self, action: str, error: Exception):
+        self._counters["errors"] += 1
+        self._unavailable_until = time.monotonic() + CONVERSATION_RETRY_AFTER
+        print(f"Conversation {action} failed: {error}")
+
+    @staticmethod
+    def _read(conversation_id: str) -> Optional[dict]:
+        from database.db import get_db_session
+        from database.crud import get_conversation
+
+        db = get_db_session()
+        try:
+            conversation = get_conversation(conversation_id, db)
+            if conversation is None:
+                return None
+            return {"user_id": conversation.user_id, "turns": conversation.turns, "summary": conversation.summary}
+        finally:
+            db.close()
+
+    @staticmethod
+    def _write(conversation_id: str, entry: dict):
+        from database.db import get_db_session
+        from database.crud import save_conversation
+
+        db = get_db_session()
+        try:
+            save_conversation(conversation_id, entry["user_id"], entry["turns"], entry["summary"], db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def load(self, conversation_id: str, user_id: str) -> Optional[Tuple[List[dict], Optional[str]]]:
+        """(turns, summary) for a conversation owned by user_id, or None"""
+        if not self.enabled or not conversation_id:
+            return None
+        entry = None
+        from_store = False
+        if self._available():
+            try:
+                entry = await asyncio.to_thread(self._read, conversation_id)
+                from_store = True
+            except Exception as e:
+                self._failed("load", e)
+        if from_store:
+            if entry is not None:
+                self._counters["store_hits"] += 1
+                self.memory.set(conversation_id, entry, time.time())
+        else:
+            # Possibly older than the table (another container may have saved since)
+            cached = self.memory.get(conversation_id)
+            if cached is not None:
+                self._counters["memory_hits"] += 1
+                entry = cached[0]
+
+        if entry is None or entry["user_id"] != user_id:
+            self._counters["misses"] += 1
+            return None
+        return list(entry["turns"]), entry["summary"]
+
+    async def save(self, conversation_id: str, user_id: str, turns: List[dict], summary: Optional[str]):
+        """Store a conversation's compacted turns and summary"""
+        if not self.enabled:
+            return
+        entry = {"user_id": user_id, "turns": turns, "summary": summary}
+        self.memory.set(conversation_id, entry, time.time())
+        if not self._available():
+            return
+        try:
+            await asyncio.to_thread(self._write, conversation_id, entry)
+            self._counters["writes"] += 1
+        except Exception as e:
+            self._failed("save", e)
+
+    def stats(self) -> dict:
+        return {**self._counters, "enabled": self.enabled, "memory_entries": len(self.memory)}
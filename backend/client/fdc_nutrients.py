@@ -0,0 +1,100 @@
+"""
+Deterministic nutrient extraction from USDA FoodData Central records.
+"""
+from typing import Dict, Iterator, Optional, Tuple
+
+# FDC nutrient numbers for each macro, in order of preference.
+# Foundation foods often omit Energy (208) and only report the Atwater variants.
+NUTRIENT_NUMBERS = {
+    "calories": ["208", "958", "957"],  # Energy, Atwater Specific, Atwater General
+    "protein": ["203"],
+    "carbs": ["205", "205.2"],           # By difference, by summation
+    "fat": ["204"],
+    "fiber": ["291"],
+    "sugar": ["269", "269.3"],           # Total including NLEA, Total NLEA
+}
+# Micronutrients (mg), reported only when the record has them
+MICRO_NUTRIENT_NUMBERS = {
+    "sodium": ["307"],
+    "calcium": ["301"],
+    "iron": ["303"],
+}
+
+# Nutrient ids used by layouts that only carry the id
+NUTRIENT_ID_TO_NUMBER = {
+    1008: "208", 2048: "958", 2047: "957",
+    1003: "203",
+    1005: "205", 1050: "205.2",
+    1004: "204",
+    1079: "291",
+    2000: "269", 1063: "269.3",
+    1093: "307", 1087: "301", 1089: "303",
+}
+
+REQUIRED_NUTRIENTS = ("calories", "protein", "carbs", "fat")
+
+USDA_ASSUMPTION = "Data from USDA FoodData Central"
+
+
+def _iter_nutrient_amounts(food_nutrients: list) -> Iterator[Tuple[str, float, str]]:
+    """Yield (nutrient number, amount, unit) across the FDC record layouts"""
+    for entry in food_nutrients or []:
+        nutrient = entry.get("nutrient")
+        if isinstance(nutrient, dict):
+            # Full layout (Foundation, SR Legacy details and bulk downloads)
+            number = nutrient.get("number")
+            nutrient_id = nutrient.get("id")
+            unit = nutrient.get("unitName", "")
+            amount = entry.get("amount")
+        else:
+            # Search results carry nutrientNumber/value, abridged details number/amount
+            number = entry.get("nutrientNumber") or entry.get("number")
+            nutrient_id = entry.get("nutrientId")
+            unit = entry.get("unitName", "")
+            amount = entry.get("value", entry.get("amount"))
+
+        if not number and nutrient_id is not None:
+            number = NUTRIENT_ID_TO_NUMBER.get(int(nutrient_id))
+        if number is None or amount is None:
+            continue
+        yield str(number), float(amount), (unit or "").lower()
+
+
+def extract_usda_nutrients(usda_data: dict) -> Optional[Dict]:
+    """Read per-100g macros from an FDC record without an LLM round trip.
+
+    Returns the same shape the USDA_EXTRACTION_PROMPT asks the LLM for, or
+    None when the record lacks energy or one of the core macros.
+    """
+    amounts = {}
+    for number, amount, unit in _iter_nutrient_amounts(usda_data.get("foodNutrients")):
+        # Energy is reported in both kcal and kJ under the Atwater numbers
+        if unit == "kj":
+            continue
+        amounts.setdefault(number, amount)
+
+    values = {}
+    for name, numbers in NUTRIENT_NUMBERS.items():
+        values[name] = next((amounts[n] for n in numbers if n in amounts), None)
+
+    if any(values[name] is None for name in REQUIRED_NUTRIENTS):
+        return None
+
+    missing = [name for name, value in values.items() if value is None]
+    assumptions = USDA_ASSUMPTION
+    if missing:
+        assumptions += f"; {', '.join(missing)} not reported, assumed 0"
+
+    micros = {}
+    for name, numbers in MICRO_NUTRIENT_NUMBERS.items():
+        value = next((amounts[n] for n in numbers if n in amounts), None)
+        if value is not None:
+            micros[name] = round(value, 2)
+
+    return {
+        "intent": "log_food",
+        "description": usda_data.get("description", ""),
+        **{name: round(value or 0.0, 2) for name, value in values.items()},
+        **micros,
+        "assumptions": assumptions
+    }
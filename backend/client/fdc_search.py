@@ -0,0 +1,95 @@
+"""
+Ranking of FoodData Central search candidates for the local mirror.
+
+The database (SQLite FTS5 bm25 or Postgres ts_rank_cd) supplies candidates
+with a text score; these helpers re-rank them with FDC-specific signals and
+report how clearly the best match beats the runner-up.
+"""
+import re
+from typing import Dict, List
+
+PRODUCE_CATEGORIES = {
+    "Fruits and Fruit Juices",
+    "Vegetables and Vegetable Products",
+}
+PREPARATION_TERMS = {
+    "cooked", "boiled", "baked", "fried", "roasted", "grilled", "steamed",
+    "stewed", "braised", "canned", "frozen", "dried", "juice", "microwaved",
+}
+
+TEXT_WEIGHT = 0.4
+COVERAGE_WEIGHT = 0.4
+HEAD_WEIGHT = 0.2
+RAW_PRODUCE_BOOST = 0.1
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def stem(token: str) -> str:
+    """Crude plural folding so 'apples' matches 'apple'"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("oes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split on non-alphanumerics and fold plurals"""
+    return [stem(token) for token in _TOKEN_RE.findall((text or "").lower())]
+
+
+def _matches(query_term: str, terms: List[str]) -> bool:
+    return any(term.startswith(query_term) for term in terms)
+
+
+def score_food(query_terms: List[str], food: Dict, text_score: float) -> float:
+    """Combine the normalized text score with FDC description signals"""
+    description = food.get("description", "")
+    terms = tokenize(description)
+    head = tokenize(description.split(",")[0])
+
+    matched = [q for q in query_terms if _matches(q, terms)]
+    coverage = len(matched) / len(query_terms)
+    # FDC descriptions lead with the food itself ("Apples, raw" vs "Apple juice, canned")
+    head_match = sum(1 for term in head if any(term.startswith(q) for q in query_terms)) / max(len(head), 1)
+    # Descriptions with many extra qualifiers are less generic matches
+    unmatched = sum(1 for term in terms if not any(term.startswith(q) for q in query_terms))
+    brevity = 1.0 / (1.0 + 0.1 * unmatched)
+
+    score = (TEXT_WEIGHT * text_score + COVERAGE_WEIGHT * coverage + HEAD_WEIGHT * head_match)
+    score *= 0.7 + 0.3 * brevity
+
+    # Users logging produce almost always mean the raw food
+    if (food.get("foodCategory") in PRODUCE_CATEGORIES and "raw" in terms
+            and not PREPARATION_TERMS.intersection(query_terms)):
+        score += RAW_PRODUCE_BOOST
+    return round(score, 4)
+
+
+def rank_foods(query: str, candidates: List[Dict]) -> List[Dict]:
+    """Re-rank candidates carrying a raw "textScore" (higher is better)"""
+    query_terms = tokenize(query)
+    if not query_terms or not candidates:
+        return []
+
+    top_text_score = max(food["textScore"] for food in candidates) or 1.0
+    ranked = []
+    for food in candidates:
+        text_score = food.pop("textScore") / top_text_score
+        ranked.append(food | {"score": score_food(query_terms, food, text_score)})
+
+    ranked.sort(key=lambda food: food["score"], reverse=True)
+    return ranked
+
+
+def match_confidence(foods: List[Dict]) -> float:
+    """Relative margin of the best match over the runner-up (0 to 1)"""
+    if not foods or not foods[0].get("score"):
+        return 0.0
+    if len(foods) == 1:
+        return 1.0
+    top, runner_up = foods[0]["score"], foods[1]["score"]
+    return round((top - runner_up) / top, 4)
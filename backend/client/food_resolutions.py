@@ -0,0 +1,131 @@
+"""
+Learned canonical description -> FDC id mapping (food_resolutions table).
+"""
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import Optional
+from utils.metrics import register_stats
+
+FOOD_RESOLUTIONS_ENABLED = os.getenv("FOOD_RESOLUTIONS_ENABLED", "true").lower() == "true"
+# After a database error the table is skipped for this long instead of failing every item
+FOOD_RESOLUTIONS_RETRY_AFTER = float(os.getenv("FOOD_RESOLUTIONS_RETRY_AFTER", "60"))
+
+
+class FoodResolutionStore:
+    """Async access to food_resolutions; errors are logged and treated as misses"""
+
+    def __init__(self, enabled: bool = FOOD_RESOLUTIONS_ENABLED):
+        self.enabled = enabled
+        self._unavailable_until = 0.0
+        self._tasks = set()
+        # Hit counts not yet written; lookups stay read-only and one task adds them up in the background
+        self._pending_hits = Counter()
+        self._hit_writer = None
+        self._counters = {"hits": 0, "misses": 0, "writes": 0, "hit_writes": 0, "errors": 0}
+        register_stats("food_resolutions", self.stats)
+
+    def _available(self) -> bool:
+        return self.enabled and time.monotonic() >= self._unavailable_until
+
+    def _failed(self, action: str, error: Exception):
+        self._counters["errors"] += 1
+        self._unavailable_until = time.monotonic() + FOOD_RESOLUTIONS_RETRY_AFTER
+        print(f"Food resolution {action} failed: {error}")
+
+    @staticmethod
+    def _read(description: str) -> Optional[str]:
+        from database.db import get_db_session
+        from database.crud import get_food_resolution
+
+        db = get_db_session()
+        try:
+            resolution = get_food_resolution(description, db)
+            return resolution.fdc_id if resolution else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _write_hits(hits: dict):
+        from database.db import get_db_session
+        from database.crud import add_food_resolution_hits
+
+        db = get_db_session()
+        try:
+            add_food_resolution_hits(hits, db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _write(description: str, fdc_id: str, confidence: Optional[float], source: str):
+        from database.db import get_db_session
+        from database.crud import upsert_food_resolution
+
+        db = get_db_session()
+        try:
+            upsert_food_resolution(description, fdc_id, confidence, source, db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def get(self, description: str) -> Optional[str]:
+        """Learned FDC id for a canonical description, or None"""
+        if not description or not self._available():
+            return None
+        try:
+            fdc_id = await asyncio.to_thread(self._read, description)
+        except Exception as e:
+            self._failed("lookup", e)
+            return None
+        self._counters["hits" if fdc_id else "misses"] += 1
+        if fdc_id:
+            self._count_hit(description)
+        return fdc_id
+
+    def _count_hit(self, description: str):
+        self._pending_hits[description] += 1
+        writer = self._hit_writer
+        if writer is None or writer.done() or writer.get_loop() is not asyncio.get_running_loop():
+            self._hit_writer = asyncio.ensure_future(self._write_pending_hits())
+            self._tasks.add(self._hit_writer)
+            self._hit_writer.add_done_callback(self._tasks.discard)
+
+    async def _write_pending_hits(self):
+        """Write counted hits; hits arriving during a write go out together in the next one"""
+        while self._pending_hits:
+            hits, self._pending_hits = dict(self._pending_hits), Counter()
+            try:
+                await asyncio.to_thread(self._write_hits, hits)
+                self._counters["hit_writes"] += 1
+            except Exception as e:
+                self._failed("hit count", e)
+                return
+
+    def record(self, description: str, fdc_id: str, confidence: Optional[float], source: str):
+        """Store a resolution in the background; the lookup that found it does not wait"""
+        if not description or not self._available():
+            return
+        task = asyncio.ensure_future(self._record(description, fdc_id, confidence, source))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _record(self, description: str, fdc_id: str, confidence: Optional[float], source: str):
+        try:
+            await asyncio.to_thread(self._write, description, fdc_id, confidence, source)
+            self._counters["writes"] += 1
+        except Exception as e:
+            self._failed("write", e)
+
+    def stats(self) -> dict:
+        lookups = self._counters["hits"] + self._counters["misses"]
+        return {
+            **self._counters,
+            "enabled": self.enabled,
+            "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,171 @@
+"""
+Local FoodData Central mirror, a drop-in alternative to the USDA API client.
+
+Tables are kept on their own metadata so the mirror can live in the app's
+Postgres database or in an embedded SQLite file (see scripts/ingest_fdc.py).
+"""
+import asyncio
+from typing import Dict, List, Optional
+from sqlalchemy import Column, Integer, String, JSON, Index, create_engine, select, text
+from sqlalchemy.orm import declarative_base, sessionmaker
+from client.fdc_search import tokenize, rank_foods
+
+# Full-text candidates fetched before re-ranking
+SEARCH_CANDIDATES = 50
+
+FDCBase = declarative_base()
+
+
+class FDCFoodModel(FDCBase):
+    """
+    One FDC food record (Foundation or SR Legacy).
+    The record column holds the food in the same layout as GET /food/{fdcId}.
+    """
+    __tablename__ = "fdc_foods"
+
+    fdc_id = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String, nullable=False)
+    data_type = Column(String, nullable=False)
+    food_category = Column(String, nullable=True)
+    record = Column(JSON, nullable=False)
+
+    __table_args__ = (
+        Index("ix_fdc_foods_data_type", "data_type"),
+        Index("ix_fdc_foods_food_category", "food_category"),
+        Index("ix_fdc_foods_description", "description"),
+    )
+
+
+def create_fdc_engine(database_url: str):
+    """Create an engine for the mirror database (SQLite file or Postgres)"""
+    if database_url.startswith("sqlite"):
+        # Queries run in worker threads, see LocalFDCBackend
+        return create_engine(database_url, connect_args={"check_same_thread": False})
+    return create_engine(database_url, pool_pre_ping=True, pool_recycle=300)
+
+
+def create_search_index(engine):
+    """Build the full-text index over food descriptions (FTS5 on SQLite, GIN tsvector on Postgres)"""
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS fdc_foods_fts USING fts5("
+                "description, food_category, content='fdc_foods', content_rowid='fdc_id', "
+                "tokenize='porter unicode61')"
+            ))
+            conn.execute(text("INSERT INTO fdc_foods_fts(fdc_foods_fts) VALUES ('rebuild')"))
+        elif engine.dialect.name == "postgresql":
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_fdc_foods_description_tsv "
+                "ON fdc_foods USING gin (to_tsvector('english', description))"
+            ))
+
+
+class LocalFDCBackend:
+    """FoodData Central lookups served from the local mirror"""
+
+    # Search results carry comparable scores, see fdc_search.match_confidence
+    ranked_search = True
+
+    def __init__(self, database_url: str):
+        self.database_url = database_url
+        self._session_factory = None
+
+    def _get_session(self):
+        """Create the engine lazily so importing the backend never touches the database"""
+        if self._session_factory is None:
+            engine = create_fdc_engine(self.database_url)
+            self._session_factory = sessionmaker(bind=engine)
+        return self._session_factory()
+
+    async def aclose(self):
+        """Dispose the engine's connection pool"""
+        if self._session_factory is not None:
+            self._session_factory.kw["bind"].dispose()
+            self._session_factory = None
+
+    def _candidates(self, session, terms: List[str], limit: int) -> List[Dict]:
+        """Full-text candidates with a raw text score, higher is better"""
+        dialect = session.bind.dialect.name
+        if dialect == "sqlite":
+            statement = text(
+                "SELECT f.fdc_id, f.description, f.data_type, f.food_category, "
+                "-bm25(fdc_foods_fts, 10.0, 1.0) AS text_score "
+                "FROM fdc_foods_fts JOIN fdc_foods f ON f.fdc_id = fdc_foods_fts.rowid "
+                "WHERE fdc_foods_fts MATCH :query ORDER BY text_score DESC LIMIT :limit"
+            )
+            query = " OR ".join(f'"{term}"*' for term in terms)
+        elif dialect == "postgresql":
+            statement = text(
+                "SELECT fdc_id, description, data_type, food_category, "
+                "ts_rank_cd(to_tsvector('english', description), to_tsquery('english', :query)) AS text_score "
+                "FROM fdc_foods WHERE to_tsvector('english', description) @@ to_tsquery('english', :query) "
+                "ORDER BY text_score DESC LIMIT :limit"
+            )
+            query = " | ".join(f"{term}:*" for term in terms)
+        else:
+            raise ValueError(f"Unsupported FDC mirror dialect: {dialect}")
+
+        rows = session.execute(statement, {"query": query, "limit": limit}).all()
+        return [
+            {
+                "fdcId": row.fdc_id,
+                "description": row.description,
+                "dataType": row.data_type,
+                "foodCategory": row.food_category,
+                "textScore": float(row.text_score)
+            }
+            for row in rows
+        ]
+
+    def _search(self, query: str, page_size: int) -> List[Dict]:
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        with self._get_session() as session:
+            candidates = self._candidates(session, terms, max(page_size, SEARCH_CANDIDATES))
+        return rank_foods(query, candidates)[:page_size]
+
+    def _details(self, fdc_id: str) -> Optional[Dict]:
+        if not str(fdc_id).isdigit():
+            return None
+        with self._get_session() as session:
+            return session.execute(
+                select(FDCFoodModel.record).where(FDCFoodModel.fdc_id == int(fdc_id))
+            ).scalar_one_or_none()
+
+    def _details_many(self, fdc_ids: List[str]) -> Dict[str, Dict]:
+        ids = [int(fdc_id) for fdc_id in fdc_ids if str(fdc_id).isdigit()]
+        if not ids:
+            return {}
+        with self._get_session() as session:
+            rows = session.execute(
+                select(FDCFoodModel.fdc_id, FDCFoodModel.record).where(FDCFoodModel.fdc_id.in_(ids))
+            ).all()
+        return {str(row.fdc_id): row.record for row in rows}
+
+    async def search_food(self, query: str, page_size: int = 10) -> List[Dict]:
+        """Search for foods in the local mirror"""
+        try:
+            return await asyncio.to_thread(self._search, query, page_size)
+        except Exception as e:
+            print(f"Error searching local FDC mirror: {e}")
+            return []
+
+    async def get_food_details_many(self, fdc_ids: List[str]) -> Dict[str, Dict]:
+        """Get detailed nutrition data for several foods, keyed by FDC id"""
+        try:
+            return await asyncio.to_thread(self._details_many, fdc_ids)
+        except Exception as e:
+            print(f"Error getting local FDC food details: {e}")
+            return {}
+
+    async def get_food_details(self, fdc_id: str) -> Optional[Dict]:
+        """Get detailed nutrition data for a specific food"""
+        try:
+            return await asyncio.to_thread(self._details, fdc_id)
+        except Exception as e:
+            print(f"Error getting local FDC food details: {e}")
+            return None
+
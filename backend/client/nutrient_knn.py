@@ -0,0 +1,234 @@
+"""
+Nearest-neighbour nutrition estimates over the local FDC mirror.
+
+Food descriptions are indexed as character n-gram TF-IDF vectors (built by
+scripts/ingest_fdc.py --knn-index). A query is answered with the similarity
+weighted per-100g nutrients of its closest foods, so most items that miss
+USDA get a reproducible estimate without an LLM call.
+
+Index file layout: 8-byte magic, 8-byte header length, JSON header
+(vocabulary, idf, FDC ids, descriptions, section offsets), then four
+8-byte aligned arrays: posting offsets (int64, per n-gram), nutrients
+(float64, per food in NutrientVector order), posting weights (float32)
+and posting rows (int32). The arrays are memory-mapped, so loading the
+index costs the header parse only.
+"""
+import asyncio
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from array import array
+from collections import Counter
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+from client.fdc_nutrients import extract_usda_nutrients
+from utils.food_keys import canonical_food_key
+from utils.metrics import register_stats
+from utils.nutrient_vector import FIELDS, NutrientVector
+
+FDC_KNN_INDEX = os.getenv("FDC_KNN_INDEX")
+# Top-1 cosine similarity needed to use the estimate instead of the LLM
+KNN_MIN_SIMILARITY = float(os.getenv("KNN_MIN_SIMILARITY", "0.75"))
+KNN_NEIGHBOURS = int(os.getenv("KNN_NEIGHBOURS", "5"))
+
+NGRAM_SIZE = 3
+INDEX_MAGIC = b"FDCKNN01"
+_HEADER = struct.Struct("<8sQ")
+
+
+class KNNEstimate(NamedTuple):
+    """Per-100g nutrients of a query's nearest foods"""
+    nutrients: NutrientVector
+    similarity: float  # cosine similarity of the closest food, 0..1
+    neighbours: List[Tuple[int, str, float]]  # (fdc_id, description, similarity)
+
+
+def char_ngrams(text: str) -> Counter:
+    """Character n-gram counts of the canonical food key, words padded with spaces"""
+    key = canonical_food_key(text).key
+    grams = Counter()
+    for word in key.split():
+        padded = f" {word} "
+        grams.update(padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1))
+    return grams
+
+
+def _tf(count: int) -> float:
+    return 1.0 + math.log(count)
+
+
+def _pad(buffer: bytearray):
+    buffer.extend(b"\0" * (-len(buffer) % 8))
+
+
+def build_knn_index(records: Iterable[dict], path: str) -> int:
+    """Write the index for FDC records (GET /food/{fdcId} layout); returns the number of foods indexed"""
+    fdc_ids, descriptions, nutrients, documents = [], [], array("d"), []
+    for record in records:
+        values = extract_usda_nutrients(record)
+        grams = char_ngrams(record.get("description", ""))
+        if values is None or not grams:
+            continue
+        fdc_ids.append(int(record["fdcId"]))
+        descriptions.append(record["description"])
+        nutrients.extend(NutrientVector.from_dict(values).values)
+        documents.append(grams)
+
+    document_frequency = Counter(gram for grams in documents for gram in grams)
+    vocabulary = {gram: column for column, gram in enumerate(sorted(document_frequency))}
+    idf = [0.0] * len(vocabulary)
+    for gram, column in vocabulary.items():
+        idf[column] = math.log((1 + len(documents)) / (1 + document_frequency[gram])) + 1.0
+
+    postings = [[] for _ in vocabulary]
+    for row, grams in enumerate(documents):
+        weights = {vocabulary[gram]: _tf(count) * idf[vocabulary[gram]] for gram, count in grams.items()}
+        norm = math.sqrt(sum(w * w for w in weights.values()))
+        for column, weight in weights.items():
+            postings[column].append((row, weight / norm))
+
+    offsets, weights, rows = array("q", [0]), array("f"), array("i")
+    for column_postings in postings:
+        for row, weight in column_postings:
+            rows.append(row)
+            weights.append(weight)
+        offsets.append(len(rows))
+
+    sections = bytearray()
+    layout = {}
+    for name, values in (("offsets", offsets), ("nutrients", nutrients), ("weights", weights), ("rows", rows)):
+        layout[name] = [len(sections), len(values) * values.itemsize]
+        sections.extend(values.tobytes())
+        _pad(sections)
+
+    header = json.dumps({
+        "ngram_size": NGRAM_SIZE,
+        "fields": list(FIELDS),
+        "vocabulary": vocabulary,
+        "idf": idf,
+        "fdc_ids": fdc_ids,
+        "descriptions": descriptions,
+        "sections": layout,
+    }).encode()
+    header += b" " * (-(len(header) + _HEADER.size) % 8)
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(INDEX_MAGIC, len(header)))
+        f.write(header)
+        f.write(sections)
+    return len(fdc_ids)
+
+
+class NutrientKNN:
+    """Memory-mapped kNN estimator; the index is opened on first use"""
+
+    def __init__(self, path: Optional[str] = FDC_KNN_INDEX, neighbours: int = KNN_NEIGHBOURS, name: Optional[str] = "knn_estimator"):
+        self.path = path
+        self.neighbours = neighbours
+        self._index = None
+        self._load_failed = False
+        self._lock = threading.Lock()
+        self._counters = {"queries": 0, "confident": 0, "low_similarity": 0, "no_match": 0}
+        if name:
+            register_stats(name, self.stats)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path) and not self._load_failed
+
+    def _load(self):
+        with self._lock:
+            if self._index is not None or self._load_failed:
+                return self._index
+            try:
+                with open(self.path, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, header_size = _HEADER.unpack_from(mapped)
+                if magic != INDEX_MAGIC:
+                    raise ValueError(f"{self.path} is not a kNN index")
+                header = json.loads(mapped[_HEADER.size:_HEADER.size + header_size])
+                if header["fields"] != list(FIELDS) or header["ngram_size"] != NGRAM_SIZE:
+                    raise ValueError(f"{self.path} was built for different nutrient fields, rebuild it")
+                base = memoryview(mapped)[_HEADER.size + header_size:]
+                arrays = {}
+                for name, code in (("offsets", "q"), ("nutrients", "d"), ("weights", "f"), ("rows", "i")):
+                    start, size = header["sections"][name]
+                    arrays[name] = base[start:start + size].cast(code)
+                self._index = (header, arrays)
+            except Exception as e:
+                self._load_failed = True
+                print(f"kNN nutrition index unavailable: {e}")
+            return self._index
+
+    def nearest(self, description: str) -> Optional[KNNEstimate]:
+        """Similarity-weighted nutrients of the closest foods, or None when nothing overlaps"""
+        index = self._load() if self.path else None
+        if index is None:
+            return None
+        header, arrays = index
+        vocabulary, idf = header["vocabulary"], header["idf"]
+        offsets, rows, weights = arrays["offsets"], arrays["rows"], arrays["weights"]
+
+        # n-grams no indexed food has keep the smoothed idf of df=0, so they still lower the similarity
+        unseen_idf = math.log(1 + len(header["fdc_ids"])) + 1.0
+        query, norm = {}, 0.0
+        for gram, count in char_ngrams(description).items():
+            column = vocabulary.get(gram)
+            weight = _tf(count) * (idf[column] if column is not None else unseen_idf)
+            norm += weight * weight
+            if column is not None:
+                query[column] = weight
+        if not query:
+            return None
+        norm = math.sqrt(norm)
+
+        scores = {}
+        for column, query_weight in query.items():
+            start, end = offsets[column], offsets[column + 1]
+            for row, weight in zip(rows[start:end], weights[start:end]):
+                scores[row] = scores.get(row, 0.0) + query_weight * weight
+
+        nearest = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:self.neighbours]
+        nutrients = arrays["nutrients"]
+        width = len(FIELDS)
+        total_weight = sum(score for _, score in nearest)
+        estimate = NutrientVector.sum(
+            NutrientVector(nutrients[row * width:(row + 1) * width]).scaled(score / total_weight)
+            for row, score in nearest
+        )
+        neighbours = [
+            (header["fdc_ids"][row], header["descriptions"][row], round(score / norm, 4))
+            for row, score in nearest
+        ]
+        return KNNEstimate(estimate, neighbours[0][2], neighbours)
+
+    async def estimate(self, description: str, min_similarity: float = None) -> Optional[KNNEstimate]:
+        """nearest() when its top similarity reaches min_similarity, else None"""
+        min_similarity = KNN_MIN_SIMILARITY if min_similarity is None else min_similarity
+        if not self.enabled:
+            return None
+        self._counters["queries"] += 1
+        try:
+            result = await asyncio.to_thread(self.nearest, description)
+        except Exception as e:
+            print(f"kNN nutrition estimate failed for {description}: {e}")
+            result = None
+        if result is None:
+            self._counters["no_match"] += 1
+            return None
+        if result.similarity < min_similarity:
+            self._counters["low_similarity"] += 1
+            return None
+        self._counters["confident"] += 1
+        return result
+
+    def stats(self) -> dict:
+        queries = self._counters["queries"]
+        return {
+            **self._counters,
+            "loaded": self._index is not None,
+            "min_similarity": KNN_MIN_SIMILARITY,
+            "confident_rate": round(self._counters["confident"] / queries, 4) if queries else 0.0,
+        }
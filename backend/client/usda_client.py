@@ -1,17 +1,171 @@
+import asyncio
 import httpx
 import os
 from typing import List, Dict, Optional
 from dotenv import load_dotenv
 from utils.secrets import get_secret
+from utils.cache import TieredCache
+from utils.metrics import register_stats
+from utils.batching import MicroBatcher
+from utils.food_keys import canonical_food_key
+from utils.rate_limit import TokenBucket, RateLimited
+from utils.resilience import Dependency, CircuitOpen
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx (httpx[http2] in requirements.txt)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 load_dotenv()
 
+# FDC data changes a few times a year, so responses can be cached for a long time
+USDA_CACHE_BACKEND = os.getenv("USDA_CACHE_BACKEND", "disk")
+USDA_SEARCH_CACHE_TTL = float(os.getenv("USDA_SEARCH_CACHE_TTL", str(7 * 24 * 3600)))
+USDA_DETAILS_CACHE_TTL = float(os.getenv("USDA_DETAILS_CACHE_TTL", str(30 * 24 * 3600)))
+USDA_CACHE_STALE_TTL = float(os.getenv("USDA_CACHE_STALE_TTL", str(30 * 24 * 3600)))
+USDA_CACHE_MAX_SIZE = int(os.getenv("USDA_CACHE_MAX_SIZE", "2048"))
+
+# Connection pool shared by every USDA call in the process
+USDA_MAX_CONNECTIONS = int(os.getenv("USDA_MAX_CONNECTIONS", "20"))
+USDA_MAX_KEEPALIVE = int(os.getenv("USDA_MAX_KEEPALIVE", "10"))
+USDA_TIMEOUT = httpx.Timeout(
+    connect=float(os.getenv("USDA_CONNECT_TIMEOUT", "3.0")),
+    read=float(os.getenv("USDA_READ_TIMEOUT", "5.0")),
+    write=float(os.getenv("USDA_WRITE_TIMEOUT", "5.0")),
+    pool=float(os.getenv("USDA_POOL_TIMEOUT", "2.0")),
+)
+
+# Detail lookups arriving within this window are fetched with one POST /foods call
+USDA_BATCH_WINDOW_MS = float(os.getenv("USDA_BATCH_WINDOW_MS", "5"))
+USDA_BATCH_MAX_IDS = 20  # POST /foods accepts at most 20 fdcIds
+# A detail batch serves several requests, so it has its own time limit instead of any caller's deadline
+USDA_BATCH_TIMEOUT = float(os.getenv("USDA_BATCH_TIMEOUT", "10"))
+
+# Token bucket sized to the API key's hourly quota (api.data.gov default: 1000/hour).
+# Requests wait at most USDA_RATE_MAX_WAIT for a token, interactive chat ahead of
+# background refreshes, which leave USDA_RATE_BACKGROUND_RESERVE of the burst unused.
+USDA_RATE_LIMIT_PER_HOUR = float(os.getenv("USDA_RATE_LIMIT_PER_HOUR", "1000"))
+USDA_RATE_BURST = int(os.getenv("USDA_RATE_BURST", "50"))
+USDA_RATE_QUEUE_SIZE = int(os.getenv("USDA_RATE_QUEUE_SIZE", "100"))
+USDA_RATE_MAX_WAIT = float(os.getenv("USDA_RATE_MAX_WAIT", "2.0"))
+USDA_RATE_BACKGROUND_RESERVE = float(os.getenv("USDA_RATE_BACKGROUND_RESERVE", "0.2"))
+# Pause after a 429 or an exhausted quota when the response has no Retry-After
+USDA_RATE_COOLDOWN = float(os.getenv("USDA_RATE_COOLDOWN", "60"))
+
+# Retries (with jittered backoff) and circuit breaker for transport errors and 5xx responses;
+# USDA_HEDGE sends a second request once one runs past the recent p95 (costs quota)
+USDA_RETRY_ATTEMPTS = int(os.getenv("USDA_RETRY_ATTEMPTS", "2"))
+USDA_RETRY_BASE_DELAY = float(os.getenv("USDA_RETRY_BASE_DELAY", "0.2"))
+USDA_CIRCUIT_FAILURES = int(os.getenv("USDA_CIRCUIT_FAILURES", "5"))
+USDA_CIRCUIT_RESET = float(os.getenv("USDA_CIRCUIT_RESET", "30"))
+USDA_HEDGE = os.getenv("USDA_HEDGE", "false").lower() == "true"
+
+SEARCH_DATA_TYPES = ["Foundation", "SR Legacy"]  # High quality data
+
+
+class USDAServerError(Exception):
+    """USDA answered with a 5xx status"""
+
+
+def is_usda_failure(error: Exception) -> bool:
+    """Errors that count against the USDA circuit and are retried"""
+    return isinstance(error, (httpx.TransportError, USDAServerError))
+
+
 class USDAClient:
     """Client for USDA FoodData Central API"""
     
     def __init__(self):
         self.base_url = "https://api.nal.usda.gov/fdc/v1"
         # API key will be fetched at runtime for each request
+        self.search_cache = TieredCache(
+            "usda_search", ttl=USDA_SEARCH_CACHE_TTL, stale_ttl=USDA_CACHE_STALE_TTL,
+            max_size=USDA_CACHE_MAX_SIZE, backend=USDA_CACHE_BACKEND
+        )
+        self.details_cache = TieredCache(
+            "usda_details", ttl=USDA_DETAILS_CACHE_TTL, stale_ttl=USDA_CACHE_STALE_TTL,
+            max_size=USDA_CACHE_MAX_SIZE, backend=USDA_CACHE_BACKEND
+        )
+        self._http_client = None
+        self._http_loop = None
+        self._pool_counters = {"requests": 0, "in_flight": 0, "clients_created": 0}
+        register_stats("usda_http", self.pool_stats)
+        self.rate_limiter = TokenBucket(
+            "usda_rate_limit", USDA_RATE_LIMIT_PER_HOUR, USDA_RATE_BURST,
+            max_queue=USDA_RATE_QUEUE_SIZE, max_wait=USDA_RATE_MAX_WAIT,
+            background_reserve=USDA_RATE_BACKGROUND_RESERVE, cooldown=USDA_RATE_COOLDOWN
+        )
+        self.dependency = Dependency(
+            "usda", is_usda_failure, attempts=USDA_RETRY_ATTEMPTS, base_delay=USDA_RETRY_BASE_DELAY,
+            failure_threshold=USDA_CIRCUIT_FAILURES, reset_timeout=USDA_CIRCUIT_RESET, hedge=USDA_HEDGE
+        )
+        self._details_batcher = MicroBatcher(
+            "usda_details_batch", self._fetch_details_many,
+            window=USDA_BATCH_WINDOW_MS / 1000, max_batch=USDA_BATCH_MAX_IDS, timeout=USDA_BATCH_TIMEOUT
+        )
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Long-lived pooled client, created lazily because Mangum runs without lifespan events"""
+        loop = asyncio.get_running_loop()
+        # A pool cannot be reused across event loops; the old one is dropped with its loop
+        if self._http_client is None or self._http_client.is_closed or self._http_loop is not loop:
+            self._http_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=USDA_MAX_CONNECTIONS,
+                    max_keepalive_connections=USDA_MAX_KEEPALIVE,
+                ),
+                timeout=USDA_TIMEOUT,
+                http2=HTTP2_AVAILABLE,
+            )
+            self._http_loop = loop
+            self._pool_counters["clients_created"] += 1
+        return self._http_client
+
+    @property
+    def available(self) -> bool:
+        """False while the USDA circuit is open"""
+        return self.dependency.available
+
+    async def _request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request with retries behind the circuit breaker; raises CircuitOpen or RateLimited"""
+        return await self.dependency.call(lambda: self._send(method, path, **kwargs))
+
+    async def _send(self, method: str, path: str, **kwargs) -> httpx.Response:
+        await self.rate_limiter.acquire()
+        client = self._get_http_client()
+        self._pool_counters["requests"] += 1
+        self._pool_counters["in_flight"] += 1
+        try:
+            response = await client.request(method, path, **kwargs)
+        finally:
+            self._pool_counters["in_flight"] -= 1
+        self.rate_limiter.observe(response.status_code, response.headers)
+        if response.status_code >= 500:
+            raise USDAServerError(f"USDA API Error: {response.status_code}")
+        return response
+
+    async def _get(self, path: str, params: dict) -> httpx.Response:
+        return await self._request("GET", path, params=params)
+
+    async def aclose(self):
+        """Close the pooled client (called from the app lifespan under uvicorn)"""
+        if self._http_client is not None and self._http_loop is asyncio.get_running_loop():
+            await self._http_client.aclose()
+        self._http_client = None
+        self._http_loop = None
+
+    def pool_stats(self) -> dict:
+        """Request counters and connection pool state"""
+        pool = getattr(getattr(self._http_client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        return {
+            **self._pool_counters,
+            "http2": HTTP2_AVAILABLE,
+            "connections": len(connections),
+            "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+        }
     
     def _get_api_key(self) -> str:
         """Get USDA API key from secrets at runtime"""
@@ -25,49 +179,111 @@ class USDAClient:
     
     async def search_food(self, query: str, page_size: int = 10) -> List[Dict]:
         """Search for foods in USDA database"""
-       
+        # "Bananas", "1 banana" and "a ripe banana" share one cache entry and one search; USDA
+        # gets the description as written, the canonical key only names the cache entry
+        food_key = canonical_food_key(query).key or query.strip().lower()
+        key = f"{food_key}|{page_size}|{','.join(SEARCH_DATA_TYPES)}"
+        return await self.search_cache.get_or_fetch(
+            key, lambda: self._fetch_search(query.strip(), page_size)
+        )
+
+    async def _fetch_search(self, query: str, page_size: int) -> List[Dict]:
         try:
             api_key = self._get_api_key()
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/foods/search",
-                    params={
-                        "api_key": api_key,
-                        "query": query,
-                        "pageSize": page_size,
-                        "dataType": ["Foundation", "SR Legacy"]  # High quality data
-                    },
-                    timeout=5.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    return data.get("foods", [])
-                else:
-                    print(f"USDA API Error: {response.status_code} - {response.text}")
-                    return []
-                    
+            response = await self._get(
+                "/foods/search",
+                params={
+                    "api_key": api_key,
+                    "query": query,
+                    "pageSize": page_size,
+                    "dataType": SEARCH_DATA_TYPES
+                }
+            )
+
+            if response.status_code == 200:
+                data = response.json()
+                return data.get("foods", [])
+            else:
+                print(f"USDA API Error: {response.status_code} - {response.text}")
+                return []
+
+        except (RateLimited, CircuitOpen) as e:
+            print(f"USDA search skipped: {e}")
+            return []
         except Exception as e:
             print(f"Error searching USDA: {e}")
             return []
     
     async def get_food_details(self, fdc_id: str) -> Optional[Dict]:
         """Get detailed nutrition data for a specific food"""
+        return await self.details_cache.get_or_fetch(
+            str(fdc_id), lambda: self._details_batcher.load(str(fdc_id))
+        )
+
+    async def get_food_details_many(self, fdc_ids: List[str]) -> Dict[str, Dict]:
+        """Get detailed nutrition data for several foods, keyed by FDC id"""
+        ids = [str(fdc_id) for fdc_id in fdc_ids]
+        # Cache misses are coalesced by the micro-batcher into bulk POST /foods calls
+        results = await asyncio.gather(*(self.get_food_details(fdc_id) for fdc_id in ids))
+        return {fdc_id: food for fdc_id, food in zip(ids, results) if food}
+
+    async def _fetch_details_many(self, fdc_ids: List[str]) -> Dict[str, Dict]:
+        ids = [int(fdc_id) for fdc_id in fdc_ids if fdc_id.isdigit()]
+        if len(ids) == 1:
+            food = await self._fetch_details(str(ids[0]))
+            return {str(ids[0]): food} if food else {}
+
+        chunks = [ids[i:i + USDA_BATCH_MAX_IDS] for i in range(0, len(ids), USDA_BATCH_MAX_IDS)]
+        foods = {}
+        for chunk_foods in await asyncio.gather(*(self._fetch_foods(chunk) for chunk in chunks)):
+            foods.update({str(food["fdcId"]): food for food in chunk_foods})
+        return foods
+
+    async def _fetch_foods(self, fdc_ids: List[int]) -> List[Dict]:
+        try:
+            api_key = self._get_api_key()
+            response = await self._request(
+                "POST", "/foods",
+                params={"api_key": api_key},
+                json={"fdcIds": fdc_ids, "format": "full"}
+            )
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                print(f"USDA API Error: {response.status_code} - {response.text}")
+                return []
+
+        except (RateLimited, CircuitOpen) as e:
+            print(f"USDA bulk details skipped: {e}")
+            return []
+        except Exception as e:
+            print(f"Error getting food details in bulk: {e}")
+            return []
+
+    async def _fetch_details(self, fdc_id: str) -> Optional[Dict]:
         try:
             api_key = self._get_api_key()
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/food/{fdc_id}",
-                    params={"api_key": api_key},
-                    timeout=5.0
-                )
-
-                if response.status_code == 200:
-                    return response.json()
-                else:
-                    print(f"USDA API Error: {response.status_code}")
-                    return None
-                    
+            response = await self._get(f"/food/{fdc_id}", params={"api_key": api_key})
+
+            if response.status_code == 200:
+                return response.json()
+            else:
+                print(f"USDA API Error: {response.status_code}")
+                return None
+
+        except (RateLimited, CircuitOpen) as e:
+            print(f"USDA details skipped: {e}")
+            return None
         except Exception as e:
             print(f"Error getting food details: {e}")
             return None
+
+
+def create_usda_client():
+    """Use the local FDC mirror when FDC_LOCAL_DB_URL is set, otherwise the USDA API"""
+    database_url = os.getenv("FDC_LOCAL_DB_URL")
+    if database_url:
+        from client.local_fdc import LocalFDCBackend
+        return LocalFDCBackend(database_url)
+    return USDAClient()
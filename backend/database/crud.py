@@ -1,11 +1,11 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func, cast, Date
-from database.models import MealModel, UserModel
+from database.models import MealModel, UserModel, FoodResolutionModel, ConversationModel
 from database.schemas import MealCreate, UserProfile
 from datetime import datetime
 import uuid
 from fastapi import HTTPException
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 # CRUD for meals
 
@@ -101,3 +101,56 @@ def update_user_profile(user_id: str, user: UserProfile, db: Session) -> Optiona
         db.refresh(db_user)
         return db_user
     return None
+
+# CRUD for food resolutions
+
+def get_food_resolution(description: str, db: Session) -> Optional[FoodResolutionModel]:
+    """Get the learned FDC id for a canonical description (read only, see add_food_resolution_hits)"""
+    return db.get(FoodResolutionModel, description)
+
+def add_food_resolution_hits(hits: Dict[str, int], db: Session):
+    """Add counted lookups to hit_count for several descriptions in one transaction"""
+    for description, count in hits.items():
+        db.query(FoodResolutionModel).filter(FoodResolutionModel.description == description).update(
+            {FoodResolutionModel.hit_count: FoodResolutionModel.hit_count + count}, synchronize_session=False
+        )
+    db.commit()
+
+def upsert_food_resolution(description: str, fdc_id: str, confidence: Optional[float],
+                           source: str, db: Session) -> FoodResolutionModel:
+    """Create or replace the learned FDC id for a canonical description"""
+    resolution = db.get(FoodResolutionModel, description)
+    if resolution is None:
+        resolution = FoodResolutionModel(description=description, hit_count=0)
+        db.add(resolution)
+    elif resolution.fdc_id != fdc_id:
+        resolution.hit_count = 0
+    resolution.fdc_id = fdc_id
+    resolution.confidence = confidence
+    resolution.source = source
+    db.commit()
+    return resolution
+
+def delete_food_resolution(description: str, db: Session) -> bool:
+    """Forget the learned FDC id for a canonical description"""
+    deleted = db.query(FoodResolutionModel).filter(FoodResolutionModel.description == description).delete()
+    db.commit()
+    return deleted > 0
+
+# CRUD for conversations
+
+def get_conversation(conversation_id: str, db: Session) -> Optional[ConversationModel]:
+    """Get a conversation by ID"""
+    return db.get(ConversationModel, conversation_id)
+
+def save_conversation(conversation_id: str, user_id: str, turns: List[dict], summary: Optional[str],
+                      db: Session) -> ConversationModel:
+    """Create or replace a conversation's turns and summary"""
+    conversation = db.get(ConversationModel, conversation_id)
+    if conversation is None:
+        conversation = ConversationModel(id=conversation_id, user_id=user_id)
+        db.add(conversation)
+    conversation.turns = turns
+    conversation.summary = summary
+    db.commit()
+    return conversation
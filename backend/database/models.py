@@ -2,7 +2,7 @@
 SQLAlchemy database models.
 This module defines the database schema using SQLAlchemy ORM models.
 """
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, DateTime, Text, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database.connection import Base
@@ -48,3 +48,50 @@ class MealModel(Base):
     
     # Relationships
     user = relationship("UserModel", back_populates="meals")
+
+
+class CacheEntryModel(Base):
+    """
+    Cache entry model for the Postgres-backed response cache (utils/cache.py).
+    Entries are grouped by namespace, e.g. usda_search or usda_details.
+    """
+    __tablename__ = "cache_entries"
+
+    namespace = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    value = Column(JSON, nullable=False)
+    stored_at = Column(Float, nullable=False)  # Unix timestamp
+
+    __table_args__ = (
+        Index("ix_cache_entries_stored_at", "namespace", "stored_at"),
+    )
+
+
+class FoodResolutionModel(Base):
+    """
+    Learned mapping from a canonical food description (utils/food_keys.py)
+    to the FDC id chosen for it, so repeat lookups skip search and selection.
+    """
+    __tablename__ = "food_resolutions"
+
+    description = Column(String, primary_key=True)
+    fdc_id = Column(String, nullable=False)
+    confidence = Column(Float, nullable=True)  # ranked search margin, None for LLM selections
+    source = Column(String, nullable=False)  # "ranked" or "llm"
+    hit_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class ConversationModel(Base):
+    """
+    Conversation model for server-side chat history keyed by conversation_id.
+    Recent turns are kept verbatim, older ones folded into summary.
+    """
+    __tablename__ = "conversations"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String, nullable=False, index=True)
+    turns = Column(JSON, nullable=False)  # [{"role", "content", "timestamp"}]
+    summary = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
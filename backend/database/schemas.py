@@ -3,7 +3,7 @@ Pydantic schemas for API request/response validation.
 This module defines the data validation and serialization models used by the API endpoints.
 """
 from pydantic import BaseModel, ConfigDict
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Literal
 from datetime import date, datetime
 
 
@@ -21,6 +21,7 @@ class ChatRequest(BaseModel):
     history: Optional[List[Dict]] = []
     conversation_id: Optional[str] = None
     user_feedback: Optional[str] = None
+    # Only applied to the chat reply when sent explicitly (see llm/routing.py request_route)
     model: Optional[str] = "gpt-4"
     temperature: Optional[float] = 0
     max_tokens: Optional[int] = 150
@@ -35,6 +36,8 @@ class ChatResponse(BaseModel):
     message: Optional[str] = None  # Generic message field for any non-meal responses
     conversation_complete: Optional[bool] = False
     conversation_id: Optional[str] = None
+    totals: Optional[Dict[str, float]] = None  # Summed nutrients of meals
+    timings: Optional[Dict[str, Any]] = None  # Stage durations and per-item lookup times (ms)
     errors: Optional[List[str]] = None  # List of errors encountered during processing
     
     model_config = ConfigDict(from_attributes=True)
@@ -96,6 +99,41 @@ class FoodItem(BaseModel):
     description: str
     single_serving_size: int
     user_serving_size: int
+    # Amount as the user wrote it, converted to grams locally (utils/portions.py)
+    quantity: Optional[float] = None
+    unit: Optional[str] = None
    
 class FoodItemList(BaseModel):
-    items: list[FoodItem]
\ No newline at end of file
+    items: list[FoodItem]
+
+class IntentWithItems(BaseModel):
+    """Combined intent classification and meal decomposition (CHAT_PIPELINE_MODE=combined)"""
+    action: Literal["food_lookup", "chat"]
+    confidence: float
+    reasoning: str
+    items: list[FoodItem]  # empty for chat
+
+class ItemEstimate(BaseModel):
+    """LLM nutrition estimate for one item of a batched estimation call"""
+    item_index: int
+    intent: Literal["log_food", "chat"]
+    description: str
+    calories: float
+    protein: float
+    fiber: float
+    carbs: float
+    fat: float
+    sugar: float
+    assumptions: str
+    message: str  # clarifying question when intent is chat, otherwise empty
+
+class ItemEstimateList(BaseModel):
+    estimates: list[ItemEstimate]
+
+class ItemSelection(BaseModel):
+    """Selected FDC id for one item of a batched selection call"""
+    item_index: int
+    fdc_id: str  # "none" when no result matches
+
+class ItemSelectionList(BaseModel):
+    selections: list[ItemSelection]
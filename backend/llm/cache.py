@@ -0,0 +1,44 @@
+"""
+Exact-match response cache for create_openai_response, opt-in per prompt type.
+"""
+import hashlib
+import json
+import os
+from typing import Optional
+from utils.cache import TieredCache
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")  # memory, disk or postgres
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_SIZE = int(os.getenv("LLM_CACHE_MAX_SIZE", "2048"))
+# Prompt types whose completions are cached, e.g. "selection,usda_extraction,estimation"
+LLM_CACHE_PROMPTS = {
+    prompt_type.strip()
+    for prompt_type in os.getenv("LLM_CACHE_PROMPTS", "selection,usda_extraction,estimation").split(",")
+    if prompt_type.strip()
+}
+
+# One cache per prompt type so hit rates are reported per pipeline stage
+_caches = {}
+
+
+def get_llm_cache(prompt_type: Optional[str]) -> Optional[TieredCache]:
+    """Cache for a prompt type, or None when caching is disabled for it"""
+    if not LLM_CACHE_ENABLED or prompt_type not in LLM_CACHE_PROMPTS:
+        return None
+    if prompt_type not in _caches:
+        _caches[prompt_type] = TieredCache(
+            f"llm_{prompt_type}", ttl=LLM_CACHE_TTL,
+            max_size=LLM_CACHE_MAX_SIZE, backend=LLM_CACHE_BACKEND
+        )
+    return _caches[prompt_type]
+
+
+def llm_cache_key(model: str, instructions: str, messages: list, tools: list = None,
+                  temperature: float = None, max_tokens: int = None) -> str:
+    """Stable hash of everything that determines a completion"""
+    payload = json.dumps(
+        [model, instructions, messages, tools, temperature, max_tokens],
+        sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
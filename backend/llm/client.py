@@ -0,0 +1,125 @@
+"""
+Shared AsyncOpenAI client and concurrency scheduling for the chat pipeline.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+import httpx
+import openai
+from openai import AsyncOpenAI
+from utils.resilience import Dependency
+from utils.secrets import get_secret
+
+# Maximum in-flight OpenAI calls for the whole process
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+# Maximum in-flight OpenAI calls made on behalf of a single chat request
+OPENAI_REQUEST_CONCURRENCY = int(os.getenv("OPENAI_REQUEST_CONCURRENCY", "6"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+# Retries with jittered backoff and a circuit breaker around every OpenAI call (the SDK's own
+# retries are disabled); OPENAI_HEDGE sends a second request once one runs past the recent p95
+OPENAI_RETRY_ATTEMPTS = int(os.getenv("OPENAI_RETRY_ATTEMPTS", "3"))
+OPENAI_RETRY_BASE_DELAY = float(os.getenv("OPENAI_RETRY_BASE_DELAY", "0.5"))
+OPENAI_CIRCUIT_FAILURES = int(os.getenv("OPENAI_CIRCUIT_FAILURES", "5"))
+OPENAI_CIRCUIT_RESET = float(os.getenv("OPENAI_CIRCUIT_RESET", "30"))
+OPENAI_HEDGE = os.getenv("OPENAI_HEDGE", "false").lower() == "true"
+
+# Global client instance for serverless optimization (reused across warm invocations)
+_openai_client = None
+_global_semaphore = None
+_client_loop = None
+
+_request_semaphore: ContextVar = ContextVar("openai_request_semaphore", default=None)
+
+
+def is_openai_failure(error: Exception) -> bool:
+    """Errors that count against the OpenAI circuit and are retried"""
+    return isinstance(error, (
+        openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError
+    ))
+
+
+def get_openai_client() -> AsyncOpenAI:
+    """Get the process-wide AsyncOpenAI client with lazy initialization"""
+    global _openai_client, _global_semaphore, _client_loop
+
+    # The client's connection pool is bound to the event loop it was created on
+    loop = asyncio.get_running_loop()
+    if _openai_client is not None and _client_loop is loop:
+        return _openai_client
+    if _openai_client is not None:
+        _release_client(_openai_client, _client_loop)
+        _openai_client = None
+        _client_loop = None
+
+    api_key = get_secret('openai_api_key') or os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OpenAI API key not available")
+
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONCURRENCY,
+            max_keepalive_connections=OPENAI_MAX_CONCURRENCY,
+        ),
+        timeout=OPENAI_TIMEOUT,
+    )
+    _openai_client = AsyncOpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+    _global_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+    _client_loop = loop
+    return _openai_client
+
+
+def _release_client(client: AsyncOpenAI, loop: asyncio.AbstractEventLoop):
+    """
+    Close a client whose event loop is no longer current. Its pool can only be closed
+    on that loop; once the loop has stopped, the client is dropped and its sockets
+    close as their transports are collected.
+    """
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.close(), loop)
+
+
+async def close_openai_client():
+    """Close the shared client and its connection pool"""
+    global _openai_client, _global_semaphore, _client_loop
+    if _openai_client is not None and _client_loop is asyncio.get_running_loop():
+        await _openai_client.close()
+    _openai_client = None
+    _global_semaphore = None
+    _client_loop = None
+
+
+@asynccontextmanager
+async def request_scope(limit: int = OPENAI_REQUEST_CONCURRENCY):
+    """Bound the number of concurrent OpenAI calls made for one chat request"""
+    token = _request_semaphore.set(asyncio.Semaphore(limit))
+    try:
+        yield
+    finally:
+        _request_semaphore.reset(token)
+
+
+@asynccontextmanager
+async def llm_slot():
+    """Wait for a per-request and a process-wide OpenAI concurrency slot"""
+    global _global_semaphore
+    if _global_semaphore is None:
+        _global_semaphore = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+    request_semaphore = _request_semaphore.get()
+    if request_semaphore is None:
+        async with _global_semaphore:
+            yield
+        return
+
+    async with request_semaphore:
+        async with _global_semaphore:
+            yield
+
+
+# Every attempt and hedge takes its own llm_slot, released while backing off between retries
+openai_dependency = Dependency(
+    "openai", is_openai_failure, attempts=OPENAI_RETRY_ATTEMPTS, base_delay=OPENAI_RETRY_BASE_DELAY,
+    max_delay=4.0, failure_threshold=OPENAI_CIRCUIT_FAILURES, reset_timeout=OPENAI_CIRCUIT_RESET,
+    hedge=OPENAI_HEDGE, slot=llm_slot
+)
@@ -1,13 +1,26 @@
 """
 OpenAI helper functions and utilities for the nutrition app.
 """
-from openai import OpenAI
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion
 from database.schemas import ChatResponse
+from llm.client import openai_dependency
+from llm.cache import get_llm_cache, llm_cache_key
+from utils.singleflight import SingleFlight
 import re
 
+llm_flights = SingleFlight("llm_singleflight")
 
-async def create_openai_response(client: OpenAI, model: str, messages, instructions: str,  tools: list = None) -> object:
-    """Standardized OpenAI response creation"""
+
+async def create_openai_response(client: AsyncOpenAI, model: str, messages, instructions: str,  tools: list = None,
+                                 temperature: float = None, prompt_type: str = None, cache_key=None,
+                                 max_tokens: int = None) -> object:
+    """
+    Standardized OpenAI response creation (with openai_dependency's retries and circuit breaker),
+    served from the LLM cache when enabled for prompt_type.
+    Identical concurrent requests with a prompt_type are coalesced into one call.
+    cache_key replaces the messages in the cache key when equivalent requests differ only in wording.
+    """
     
     # Create the system message with instructions
     system_message = {"role": "system", "content": instructions}
@@ -24,7 +37,48 @@ async def create_openai_response(client: OpenAI, model: str, messages, instructi
         params["tools"] = tools
         params["tool_choice"] = "auto"
 
-    return client.chat.completions.create(**params)
+    if temperature is not None:
+        params["temperature"] = temperature
+
+    if max_tokens is not None:
+        params["max_tokens"] = max_tokens
+
+    async def call():
+        return await openai_dependency.call(lambda: client.chat.completions.create(**params))
+
+    if prompt_type is None:
+        return await call()
+
+    key = llm_cache_key(
+        model, instructions, all_messages[1:] if cache_key is None else cache_key, tools, temperature, max_tokens
+    )
+    cache = get_llm_cache(prompt_type)
+    if cache is None:
+        # Identical in-flight requests share one completion
+        return await llm_flights.do(f"{prompt_type}:{key}", call)
+
+    async def fetch():
+        return (await call()).model_dump(mode="json")
+
+    return ChatCompletion.model_validate(await cache.get_or_fetch(key, fetch))
+
+
+async def create_parsed_response(client: AsyncOpenAI, model: str, messages: list, text_format, temperature: float = None,
+                                 max_tokens: int = None) -> object:
+    """Structured-output response creation parsed into a Pydantic model"""
+    params = {
+        "model": model,
+        "input": messages,
+        "text_format": text_format
+    }
+
+    if temperature is not None:
+        params["temperature"] = temperature
+
+    if max_tokens is not None:
+        params["max_output_tokens"] = max_tokens
+
+    return await openai_dependency.call(lambda: client.responses.parse(**params))
 
 
 def create_error_response(message: str, conversation_id: str) -> ChatResponse:
@@ -0,0 +1,82 @@
+"""
+Conversation history compaction and prompt formatting.
+
+The last HISTORY_KEEP_TURNS messages are kept verbatim; older ones are folded
+into a one-line-per-message summary, and the whole history is kept under
+HISTORY_TOKEN_BUDGET (estimated at ~4 characters per token).
+"""
+import os
+import re
+from typing import List, Optional, Tuple
+
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+# Longest summary line kept for a single older message
+SUMMARY_LINE_CHARS = 160
+
+_MEAL_DESCRIPTION_RE = re.compile(r"'description': '([^']*)'.*?'calories': ([\d.]+)")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count without a tokenizer dependency"""
+    return (len(text) + 3) // 4
+
+
+def summarize_turn(turn: dict) -> str:
+    """One short line for an older message"""
+    content = str(turn.get("content", ""))
+    if content.startswith("Meals assistant found to log:"):
+        # Keep only the food names and calories from the logged meal dicts
+        meals = [f"{name} ({float(calories):.0f} kcal)" for name, calories in _MEAL_DESCRIPTION_RE.findall(content)]
+        content = "Logged " + ", ".join(meals) if meals else content
+    content = " ".join(content.split())
+    if len(content) > SUMMARY_LINE_CHARS:
+        content = content[:SUMMARY_LINE_CHARS - 3] + "..."
+    role = "User" if turn.get("role") == "user" else "Assistant"
+    return f"{role}: {content}"
+
+
+def compact_history(turns: List[dict], summary: Optional[str] = None,
+                    keep_turns: int = None, token_budget: int = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    Fold all but the last keep_turns messages into summary, then drop the oldest
+    summary lines (and, if still needed, the oldest verbatim turns) to fit token_budget.
+    """
+    keep_turns = HISTORY_KEEP_TURNS if keep_turns is None else keep_turns
+    token_budget = HISTORY_TOKEN_BUDGET if token_budget is None else token_budget
+
+    older, recent = (turns[:-keep_turns], turns[-keep_turns:]) if keep_turns else (turns, [])
+    summary_lines = summary.splitlines() if summary else []
+    summary_lines.extend(summarize_turn(turn) for turn in older)
+
+    recent_tokens = sum(estimate_tokens(str(turn.get("content", ""))) for turn in recent)
+    while recent and recent_tokens > token_budget:
+        dropped = recent.pop(0)
+        recent_tokens -= estimate_tokens(str(dropped.get("content", "")))
+        summary_lines.append(summarize_turn(dropped))
+
+    summary_tokens = sum(estimate_tokens(line) for line in summary_lines)
+    while summary_lines and recent_tokens + summary_tokens > token_budget:
+        summary_tokens -= estimate_tokens(summary_lines.pop(0))
+
+    return recent, "\n".join(summary_lines) or None
+
+
+def history_with_summary(turns: List[dict], summary: Optional[str]) -> List[dict]:
+    """Turns as sent to the pipeline, with the summary as a leading system message"""
+    if not summary:
+        return list(turns)
+    return [{"role": "system", "content": f"Earlier conversation:\n{summary}"}] + list(turns)
+
+
+def format_history(history: Optional[List[dict]]) -> str:
+    """Compact plain-text rendering of history for prompts"""
+    lines = []
+    for msg in history or []:
+        if msg.get("role") == "user":
+            lines.append(f"User: {msg['content']}")
+        elif msg.get("role") == "assistant":
+            lines.append(f"Assistant: {msg['content']}")
+        elif msg.get("role") == "system":
+            lines.append(str(msg["content"]))
+    return "\n".join(lines)
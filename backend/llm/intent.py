@@ -0,0 +1,173 @@
+"""
+Local fast-path intent classifier for the food_lookup / chat decision.
+
+Regex rules plus a tiny bag-of-words naive Bayes model decide obvious
+messages locally; anything below INTENT_FAST_PATH_THRESHOLD goes to the
+INTENT_CLASSIFICATION_PROMPT call as before. The fast path ships disabled:
+every message is classified by the LLM and compared with the local guess, and
+the per-confidence agreement on /metrics (intent.by_confidence) is what a
+threshold should be chosen from.
+"""
+import math
+import os
+import random
+import re
+from collections import Counter
+from typing import NamedTuple, Optional
+from utils.metrics import register_stats
+
+# Minimum local confidence for skipping the LLM call; above 1.0 (the default) disables the fast path
+INTENT_FAST_PATH_THRESHOLD = float(os.getenv("INTENT_FAST_PATH_THRESHOLD", "1.1"))
+# Fraction of fast-path decisions still sent to the LLM to measure agreement above the threshold
+INTENT_SHADOW_RATE = float(os.getenv("INTENT_SHADOW_RATE", "0.0"))
+
+
+class IntentGuess(NamedTuple):
+    """Local classification of a message"""
+    action: str  # "food_lookup" or "chat"
+    confidence: float
+    reasoning: str
+
+
+# (pattern, weight): positive weights favour food_lookup, negative favour chat
+RULES = [
+    (re.compile(r"\bi\s+(?:just\s+|also\s+)?(?:ate|had|drank|eaten|finished|snacked on)\b"), 3.0, "past-tense eating"),
+    (re.compile(r"^\s*(?:please\s+)?(?:log|track|add|record)\b"), 3.0, "log command"),
+    (re.compile(r"\bfor\s+(?:breakfast|brunch|lunch|dinner|supper|dessert|a snack|snack)\b"), 1.5, "meal mention"),
+    (re.compile(r"^\s*\d+(?:[./]\d+)?\s*\w+"), 2.0, "leading quantity"),
+    (re.compile(r"\b\d+(?:\.\d+)?\s*(?:g|grams?|kg|oz|ml|cups?|tbsp|tsp|slices?|pieces?|bowls?|glass(?:es)?)\b"), 1.5, "measured amount"),
+    (re.compile(r"\?\s*$"), -2.5, "question mark"),
+    (re.compile(r"^\s*(?:what|why|how|when|where|which|who|is|are|does|do|can|could|should|would|will|tell|explain|compare)\b"), -2.5, "question word"),
+    (re.compile(r"\b(?:did i|have i|so far|today|yesterday|this week|last meal|my meals|my intake)\b"), -1.5, "asks about past logs"),
+    (re.compile(r"^\s*(?:hi|hello|hey|thanks|thank you|ok|okay)\b"), -2.0, "small talk"),
+    # "I had a bad day", "I had a great workout": had, but not eating
+    (re.compile(r"\b(?:had|have)\s+(?:a|an|my|the|such a)?\s*(?:\w+\s+)?"
+                r"(?:day|night|week|morning|evening|workout|run|session|time|sleep|question|idea|chat|talk|meeting|dream)\b"),
+     -4.0, "had an experience"),
+    (re.compile(r"\b(?:questions?|what do you think|your thoughts|any (?:advice|tips|ideas))\b"), -3.0, "asks for advice"),
+]
+# Corrections ("actually it was 3 eggs") depend on history, so they are left to the LLM
+CORRECTION_RE = re.compile(r"\b(?:actually|correction|instead|i meant|change that|wrong|not\s+\w+\s*,?\s*but)\b")
+CORRECTION_DAMPING = 0.3
+
+# Tiny labelled corpus for the bag-of-words model
+TRAINING_EXAMPLES = {
+    "food_lookup": [
+        "i had 2 eggs and toast", "i ate a banana", "log 2 apples", "track my breakfast oatmeal with berries",
+        "had a chicken caesar salad for lunch", "2 slices of pizza", "a bowl of cereal with milk",
+        "i drank a glass of orange juice", "greek yogurt with honey", "grilled salmon rice and broccoli",
+        "just finished a protein shake", "snacked on almonds", "coffee with cream and sugar",
+        "spaghetti bolognese for dinner", "100g chicken breast", "a cheeseburger and fries",
+        "two boiled eggs", "peanut butter sandwich", "a cup of black coffee", "add a latte",
+        "breakfast was porridge and a banana", "steak with mashed potatoes", "an apple and a handful of nuts",
+    ],
+    "chat": [
+        "what is protein", "how much protein should i eat", "what did i eat today",
+        "tell me about my last meal", "how many calories have i had so far", "is fat bad for you",
+        "why is fiber important", "what should i eat for dinner", "compare rice and quinoa",
+        "thanks", "hello", "can you explain carbs", "how am i doing this week", "what are macros",
+        "is sugar worse than fat", "how many calories are in my meals", "which foods are high in iron",
+        "does coffee count as water", "give me a high protein snack idea", "explain my intake",
+        "what was in my breakfast", "should i eat before a workout", "i have a question about fiber",
+    ],
+}
+
+_TOKEN_RE = re.compile(r"[a-z']+|\d+")
+
+
+def _tokens(text: str) -> list:
+    return ["<num>" if token.isdigit() else token for token in _TOKEN_RE.findall(text.lower())]
+
+
+class _NaiveBayes:
+    """Multinomial naive Bayes over word counts, trained at import from TRAINING_EXAMPLES"""
+
+    def __init__(self, examples: dict):
+        counts = {label: Counter(t for text in texts for t in _tokens(text)) for label, texts in examples.items()}
+        vocabulary = set().union(*counts.values())
+        self._log_ratio = {}
+        food, chat = counts["food_lookup"], counts["chat"]
+        food_total = sum(food.values()) + len(vocabulary)
+        chat_total = sum(chat.values()) + len(vocabulary)
+        for token in vocabulary:
+            self._log_ratio[token] = math.log((food[token] + 1) / food_total) - math.log((chat[token] + 1) / chat_total)
+
+    def log_odds(self, tokens: list) -> float:
+        """log P(food_lookup | tokens) - log P(chat | tokens) with equal priors"""
+        return sum(self._log_ratio.get(token, 0.0) for token in tokens)
+
+
+_model = _NaiveBayes(TRAINING_EXAMPLES)
+
+
+def classify_intent(text: str) -> IntentGuess:
+    """Local food_lookup / chat decision with a confidence in [0.5, 1]"""
+    lowered = (text or "").lower().strip()
+    logit = 0.0
+    reasons = []
+    for pattern, weight, reason in RULES:
+        if pattern.search(lowered):
+            logit += weight
+            reasons.append(reason)
+
+    # Bag-of-words evidence is capped so it refines, rather than overrides, the rules
+    logit += max(-3.0, min(3.0, 0.5 * _model.log_odds(_tokens(lowered))))
+
+    if CORRECTION_RE.search(lowered):
+        logit *= CORRECTION_DAMPING
+        reasons.append("correction")
+
+    probability = 1.0 / (1.0 + math.exp(-logit))
+    action = "food_lookup" if probability >= 0.5 else "chat"
+    confidence = max(probability, 1.0 - probability)
+    return IntentGuess(action, round(confidence, 4), ", ".join(reasons) or "bag of words")
+
+
+class IntentAgreement:
+    """Agreement between local guesses and the LLM, bucketed by local confidence"""
+
+    def __init__(self):
+        self._counters = {"fast_path": 0, "llm": 0, "shadowed": 0, "compared": 0, "agreed": 0}
+        self._buckets = {}
+        register_stats("intent", self.stats)
+
+    def use_fast_path(self, guess: IntentGuess, threshold: float = None) -> bool:
+        """Whether guess is confident enough to skip the LLM (minus shadow samples)"""
+        threshold = INTENT_FAST_PATH_THRESHOLD if threshold is None else threshold
+        if guess.confidence < threshold:
+            self._counters["llm"] += 1
+            return False
+        if INTENT_SHADOW_RATE and random.random() < INTENT_SHADOW_RATE:
+            self._counters["shadowed"] += 1
+            return False
+        self._counters["fast_path"] += 1
+        return True
+
+    def record(self, guess: IntentGuess, llm_action: Optional[str], text: str = ""):
+        """Compare a local guess with the LLM's action"""
+        if llm_action not in ("food_lookup", "chat"):
+            return
+        agreed = guess.action == llm_action
+        self._counters["compared"] += 1
+        self._counters["agreed"] += agreed
+        bucket = f"{min(int(guess.confidence * 10), 9) / 10:.1f}"
+        compared, bucket_agreed = self._buckets.get(bucket, (0, 0))
+        self._buckets[bucket] = (compared + 1, bucket_agreed + agreed)
+        if not agreed:
+            print(f"Intent disagreement: local {guess.action} ({guess.confidence}) vs LLM {llm_action}: {text[:80]!r}")
+
+    def stats(self) -> dict:
+        compared = self._counters["compared"]
+        return {
+            **self._counters,
+            "threshold": INTENT_FAST_PATH_THRESHOLD,
+            "agreement_rate": round(self._counters["agreed"] / compared, 4) if compared else 0.0,
+            # Agreement per local confidence decile, for choosing the threshold
+            "by_confidence": {
+                bucket: {"compared": n, "agreement_rate": round(agreed / n, 4)}
+                for bucket, (n, agreed) in sorted(self._buckets.items())
+            },
+        }
+
+
+intent_agreement = IntentAgreement()
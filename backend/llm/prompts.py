@@ -26,6 +26,9 @@ FOOD_LOOKUP_PROMPT = (
         "1. Food item description, e.g., 'yoghurt'\n"
         "2. Single serving size always converted to grams, e.g., 30\n"
         "3. User specified serving size always converted to grams, if not specified return single serving size\n"
+        "4. quantity: the number the user gave for the item, e.g., 2 for '2 tbsp honey' or '2 eggs', null if none\n"
+        "5. unit: the unit the user gave exactly as a plain word, e.g., 'tbsp', 'cup', 'slice', 'g', null for plain counts like '2 eggs'\n"
+        "Quantity and unit are converted to grams by the app; the gram fields are only used when it cannot convert them.\n"
         "The following are examples of how to format the response:\n"
         "An example: if the user says '1 cup yoghurt and 2 tbsp honey', you would return:\n"
         "  1. yoghurt, typical single serving size: 50g, user serving size in grams: 1 cup which is 240g\n"
@@ -46,6 +49,19 @@ FOOD_LOOKUP_PROMPT = (
     )
 
 
+# STEP 0+1 in one call (CHAT_PIPELINE_MODE=combined): intent plus meal decomposition
+COMBINED_INTENT_PROMPT = (
+        "You are a nutrition assistant. Decide the user's intent and, when they are logging food, "
+        "break the food down into items in the same response.\n\n"
+        "action:\n"
+        "- 'food_lookup' when the user mentions specific foods they ate or want to log, e.g. 'I ate X', 'Log 2 apples', 'Track my breakfast'\n"
+        "- 'chat' for questions, follow-ups or general nutrition discussion, e.g. 'What is protein?', 'What did I eat today?'\n"
+        "- Follow-up questions about previous meals or their nutrition data: ALWAYS 'chat'\n"
+        "- Corrections or amendments to previous meals: 'food_lookup'\n"
+        "confidence: number between 0 and 1. reasoning: one short sentence.\n"
+        "items: empty list for 'chat'. For 'food_lookup' follow these instructions:\n\n"
+    ) + FOOD_LOOKUP_PROMPT
+
 # STEP 2: Food Selection from USDA Results
 SELECTION_PROMPT = (
     "Select the SINGLE BEST matching food from these USDA search results for the food item if it exists. "
@@ -60,6 +76,15 @@ SELECTION_PROMPT = (
     "Be precise and return ONLY valid JSON array format."
 )
 
+# STEP 2, batched: one selection per numbered food item of a meal
+SELECTION_BATCH_PROMPT = (
+    "For each numbered food item, select the SINGLE BEST matching food from that item's USDA search results if it exists. "
+    "Reject vague terms or items that don't match the user's description.\n\n"
+    "Try to match the user's description as closely as possible.\n\n"
+    "Return one selection per item with item_index set to the item's number and fdc_id set to the chosen FDC ID. "
+    'If no good match exists for an item, use "none" as the fdc_id.'
+)
+
 # STEP 3a: Nutrition Extraction from USDA Data
 USDA_EXTRACTION_PROMPT = (
     "Extract nutrition data from this USDA JSON and format as the required JSON response. "
@@ -103,6 +128,19 @@ LLM_ESTIMATION_PROMPT = (
     "}\n"
 )
 
+# STEP 3b, batched: every item that missed USDA in one call
+LLM_BATCH_ESTIMATION_PROMPT = (
+    "You are a nutrition assistant. "
+    "Estimate the nutrition data for each numbered food item described by the user.\n\n"
+    "Return one estimate per item with item_index set to the item's number, and for each:\n"
+    "- intent: 'log_food'\n"
+    "- description, calories, protein, fiber, carbs, fat, sugar\n"
+    "- assumptions: any assumptions made and mention \"Estimate provided by LLM\"\n"
+    "- message: empty string\n\n"
+    "If you cannot estimate an item, set its intent to 'chat', its numbers to 0 and ask for more details in message, "
+    "e.g. 'Could you please provide more details about the cereal? Is it a specific brand or type?'\n"
+)
+
 CHAT_RESPONSE_PROMPT = (
     "You are a helpful nutrition assistant. Based on the user's message and conversation history, "
     "provide a helpful, accurate response about nutrition, health, or food.\n\n"
@@ -0,0 +1,192 @@
+"""
+Per-stage model routing for the chat pipeline.
+
+Every LLM call names a pipeline stage. The stage's route picks a fast default
+model, a max_tokens cap and a temperature; when the parsed output is invalid
+(InvalidOutput or another ValueError such as a JSON or validation error) or
+reports a confidence below min_confidence, the call is repeated once on the
+stage's escalation model.
+
+Routes start from DEFAULT_ROUTES, then LLM_ROUTING_FILE (JSON, e.g.
+{"intent": {"model": "gpt-4o-mini", "escalation_model": "gpt-4o"}}), then
+LLM_<STAGE>_MODEL / _ESCALATION_MODEL / _MAX_TOKENS / _MIN_CONFIDENCE.
+"""
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, NamedTuple, Optional
+from utils.metrics import LatencyStats, register_stats
+
+LLM_ROUTING_FILE = os.getenv("LLM_ROUTING_FILE")
+# Models a ChatRequest may ask for explicitly (applies to the chat reply only)
+LLM_REQUEST_MODELS = {
+    model.strip() for model in os.getenv("LLM_REQUEST_MODELS", "gpt-4o-mini,gpt-4o").split(",") if model.strip()
+}
+# Smaller requested max_tokens are ignored (older app builds send 150, which cuts replies off)
+LLM_REQUEST_MIN_TOKENS = int(os.getenv("LLM_REQUEST_MIN_TOKENS", "300"))
+
+
+class StageRoute(NamedTuple):
+    """How one pipeline stage calls the LLM"""
+    model: str
+    escalation_model: Optional[str] = None  # retried on invalid or low-confidence output
+    max_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    min_confidence: float = 0.0
+
+
+DEFAULT_ROUTES = {
+    "intent": StageRoute("gpt-4o-mini", "gpt-4o", max_tokens=200, min_confidence=0.7),
+    "combined_intent": StageRoute(
+        os.getenv("COMBINED_INTENT_MODEL", "gpt-4o-mini"), "gpt-4o", max_tokens=1500, temperature=0.3, min_confidence=0.7
+    ),
+    "decompose": StageRoute("gpt-4o-mini", "gpt-4o", max_tokens=1500, temperature=0.3),
+    "selection": StageRoute("gpt-4o-mini", "gpt-4o", max_tokens=150),
+    "batch_selection": StageRoute("gpt-4o-mini", "gpt-4o", max_tokens=1000),
+    "usda_extraction": StageRoute("gpt-4o-mini", max_tokens=500),
+    "estimation": StageRoute("gpt-4o-mini", max_tokens=500),
+    "batch_estimation": StageRoute("gpt-4o-mini", max_tokens=3000),
+    "chat": StageRoute("gpt-4o-mini", max_tokens=500, temperature=0.3),
+}
+
+_FIELD_TYPES = {"model": str, "escalation_model": str, "max_tokens": int, "temperature": float, "min_confidence": float}
+
+
+class InvalidOutput(ValueError):
+    """The model's output could not be used"""
+
+
+def _with_overrides(route: StageRoute, overrides: dict, source: str) -> StageRoute:
+    values = {}
+    for field, value in overrides.items():
+        if field not in _FIELD_TYPES:
+            print(f"Ignoring unknown routing field {field} in {source}")
+            continue
+        values[field] = None if value in (None, "") else _FIELD_TYPES[field](value)
+    return route._replace(**values)
+
+
+def load_routes(path: Optional[str] = LLM_ROUTING_FILE, environ=os.environ) -> Dict[str, StageRoute]:
+    """DEFAULT_ROUTES overridden by the routing file and then by LLM_<STAGE>_<FIELD> variables"""
+    routes = dict(DEFAULT_ROUTES)
+    if path:
+        try:
+            with open(path) as f:
+                configured = json.load(f)
+            for stage, overrides in configured.items():
+                if stage not in routes:
+                    print(f"Ignoring routing for unknown stage {stage} in {path}")
+                    continue
+                routes[stage] = _with_overrides(routes[stage], overrides, path)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"Could not load LLM routing from {path}, keeping defaults: {e}")
+
+    for stage, route in routes.items():
+        overrides = {}
+        for field in _FIELD_TYPES:
+            value = environ.get(f"LLM_{stage.upper()}_{field.upper()}")
+            if value is not None:
+                overrides[field] = value
+        if overrides:
+            try:
+                routes[stage] = _with_overrides(route, overrides, "environment")
+            except ValueError as e:
+                print(f"Ignoring LLM_{stage.upper()}_* overrides: {e}")
+    return routes
+
+
+def request_route(route: StageRoute, request) -> StageRoute:
+    """
+    route with the model, temperature and max_tokens the request set explicitly
+    (model_fields_set, so schema defaults never override the table); max_tokens
+    stays within the route's cap (and is ignored below LLM_REQUEST_MIN_TOKENS) and
+    the model must be in LLM_REQUEST_MODELS.
+    """
+    fields = request.model_fields_set
+    if "model" in fields and request.model:
+        if request.model in LLM_REQUEST_MODELS:
+            route = route._replace(model=request.model, escalation_model=None)
+        else:
+            print(f"Ignoring requested model {request.model}, not in LLM_REQUEST_MODELS")
+    if "temperature" in fields and request.temperature is not None:
+        route = route._replace(temperature=request.temperature)
+    if "max_tokens" in fields and request.max_tokens and request.max_tokens >= LLM_REQUEST_MIN_TOKENS:
+        cap = route.max_tokens
+        route = route._replace(max_tokens=request.max_tokens if cap is None else min(cap, request.max_tokens))
+    return route
+
+
+class ModelRouter:
+    """Runs stage calls on their routes, escalating and recording latency and escalation rate"""
+
+    def __init__(self, routes: Dict[str, StageRoute], name: Optional[str] = "llm_routing"):
+        self.routes = routes
+        self._counters = {stage: {"calls": 0, "escalations": 0, "invalid": 0, "low_confidence": 0} for stage in routes}
+        self.latency = LatencyStats(f"{name}_latency") if name else None
+        if name:
+            register_stats(name, self.stats)
+
+    def route(self, stage: str) -> StageRoute:
+        return self.routes[stage]
+
+    async def call(self, stage: str, fn: Callable[[StageRoute], Awaitable[Any]],
+                   confidence: Callable[[Any], Optional[float]] = None, route: StageRoute = None) -> Any:
+        """
+        fn(route) on the stage's route (or the given one), once more on the escalation
+        model when fn raises ValueError or confidence(result) is below min_confidence.
+        Raises the last ValueError when no usable output remains.
+        """
+        route = route or self.routes[stage]
+        counters = self._counters[stage]
+        counters["calls"] += 1
+        started = time.perf_counter()
+        try:
+            try:
+                result = await fn(route)
+            except ValueError as e:
+                counters["invalid"] += 1
+                if not self._can_escalate(route):
+                    raise
+                print(f"Escalating {stage} to {route.escalation_model} after invalid output: {e}")
+            else:
+                score = confidence(result) if confidence is not None else None
+                if score is None or score >= route.min_confidence:
+                    return result
+                counters["low_confidence"] += 1
+                if not self._can_escalate(route):
+                    return result
+
+            counters["escalations"] += 1
+            return await fn(route._replace(model=route.escalation_model))
+        finally:
+            if self.latency is not None:
+                self.latency.record(stage, time.perf_counter() - started)
+
+    @staticmethod
+    def _can_escalate(route: StageRoute) -> bool:
+        return bool(route.escalation_model) and route.escalation_model != route.model
+
+    def stats(self) -> dict:
+        result = {}
+        for stage, counters in self._counters.items():
+            route = self.routes[stage]
+            calls = counters["calls"]
+            result[stage] = {
+                **counters,
+                "model": route.model,
+                "escalation_model": route.escalation_model,
+                "max_tokens": route.max_tokens,
+                "escalation_rate": round(counters["escalations"] / calls, 4) if calls else 0.0,
+            }
+        return result
+
+
+def confidence_of(value) -> Optional[float]:
+    """A model-reported confidence as a float, or None when missing or malformed"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+model_router = ModelRouter(load_routes())
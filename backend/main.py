@@ -1,10 +1,13 @@
 import os
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from database.db import init_db
+from llm.client import close_openai_client
+from utils.metrics import collect_stats
 
-from api.chat import router as chat_router
+from api.chat import router as chat_router, usda_client
 from api.meals import router as meals_router
 from api.users import router as users_router
 from api.auth import router as auth_router
@@ -20,11 +23,19 @@ try:
 except Exception as e:
     logger.error(f"Database initialization failed: {e}")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Release pooled outbound connections on shutdown (not run under Mangum, see handler below)"""
+    yield
+    await close_openai_client()
+    await usda_client.aclose()
+
 # Create FastAPI app
 app = FastAPI(
     title="Nutrition App API",
     description="API for tracking meals, nutrients, and providing personalized nutrition recommendations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -56,6 +67,11 @@ def health_check():
         "database_host": os.getenv("DB_HOST", "not_set")
     }
 
+@app.get("/metrics")
+def metrics():
+    """Cache, client and pipeline counters for this process"""
+    return collect_stats()
+
 # Handler for AWS Lambda
 from mangum import Mangum
 handler = Mangum(app, lifespan="off")
@@ -21,7 +21,7 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from database.connection import Base
-from database.models import UserModel, MealModel  # Import all models here
+from database.models import UserModel, MealModel, CacheEntryModel, FoodResolutionModel, ConversationModel  # Import all models here
 target_metadata = Base.metadata
 
 # Get database URL from environment variable
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Canonical Food Key Benchmark
+
+Times canonical_food_key on typical decomposed meal descriptions, cold
+(memoization cleared before every call) and warm (served from lru_cache).
+
+Example:
+    python scripts/bench_food_keys.py --number 20000
+"""
+
+import sys
+import argparse
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.food_keys import canonical_food_key
+
+SAMPLES = [
+    "Bananas", "1 banana", "a ripe banana", "100g white rice", "2 tbsp honey",
+    "1 ½ cups semi-skimmed milk", "Greek yoghurt", "two large eggs",
+    "3 slices of wholemeal bread", "grilled chicken breast, 150g",
+    "a handful of blueberries", "cup of black coffee",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark canonical_food_key")
+    parser.add_argument("--number", type=int, default=10000, help="Calls per sample")
+    args = parser.parse_args()
+
+    def cold():
+        for text in SAMPLES:
+            canonical_food_key.cache_clear()
+            canonical_food_key(text)
+
+    def warm():
+        for text in SAMPLES:
+            canonical_food_key(text)
+
+    # cache_clear itself is part of the cold timing, so the cold figure is an upper bound
+    for name, func in (("cold", cold), ("warm", warm)):
+        seconds = min(timeit.repeat(func, number=args.number // len(SAMPLES) or 1, repeat=3))
+        calls = (args.number // len(SAMPLES) or 1) * len(SAMPLES)
+        print(f"{name}: {seconds / calls * 1e6:.2f} µs/call")
+
+    for text in SAMPLES:
+        print(f"{text!r:40} -> {canonical_food_key(text)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+FoodData Central Ingestion Script
+
+Loads the official FDC Foundation and SR Legacy bulk downloads into the
+local mirror used by LocalFDCBackend. Accepts the JSON downloads or the CSV
+downloads (zip file or extracted directory).
+
+Examples:
+    python scripts/ingest_fdc.py --database-url sqlite:///fdc.sqlite3 \\
+        FoodData_Central_foundation_food_json_2024-10-31.json \\
+        FoodData_Central_sr_legacy_food_json_2018-04.json
+
+    python scripts/ingest_fdc.py --database-url postgresql://localhost/nutrition_app \\
+        FoodData_Central_sr_legacy_food_csv_2018-04.zip
+
+    # Also write the nearest-neighbour estimator index over the whole mirror
+    python scripts/ingest_fdc.py --database-url sqlite:///fdc.sqlite3 --knn-index fdc_knn.bin \\
+        FoodData_Central_sr_legacy_food_json_2018-04.json
+"""
+
+import os
+import sys
+import csv
+import io
+import json
+import time
+import zipfile
+import argparse
+from collections import defaultdict
+from pathlib import Path
+from sqlalchemy import insert, delete, select
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from client.local_fdc import FDCBase, FDCFoodModel, create_fdc_engine, create_search_index
+from client.nutrient_knn import build_knn_index
+
+BATCH_SIZE = 1000
+
+# Bulk download data types -> API data types
+CSV_DATA_TYPES = {
+    "foundation_food": "Foundation",
+    "sr_legacy_food": "SR Legacy",
+}
+JSON_ROOT_KEYS = ("FoundationFoods", "SRLegacyFoods")
+
+
+def trim_record(food: dict) -> dict:
+    """Keep only the fields the chat pipeline reads from a food record"""
+    category = food.get("foodCategory") or {}
+    return {
+        "fdcId": food["fdcId"],
+        "description": food.get("description", ""),
+        "dataType": food.get("dataType", ""),
+        "foodCategory": {"description": category.get("description")},
+        "foodNutrients": [
+            {
+                "type": "FoodNutrient",
+                "nutrient": {
+                    "id": n["nutrient"].get("id"),
+                    "number": n["nutrient"].get("number"),
+                    "name": n["nutrient"].get("name"),
+                    "unitName": n["nutrient"].get("unitName"),
+                },
+                "amount": n.get("amount"),
+            }
+            for n in food.get("foodNutrients", [])
+            if n.get("nutrient") and n.get("amount") is not None
+        ],
+        "foodPortions": [
+            {
+                "sequenceNumber": p.get("sequenceNumber"),
+                "amount": p.get("amount"),
+                "gramWeight": p.get("gramWeight"),
+                "modifier": p.get("modifier"),
+                "portionDescription": p.get("portionDescription"),
+                "measureUnit": {"name": (p.get("measureUnit") or {}).get("name")},
+            }
+            for p in food.get("foodPortions", [])
+        ],
+    }
+
+
+def load_json_download(path: Path) -> list:
+    """Read foods from a FDC JSON bulk download"""
+    with open(path) as f:
+        data = json.load(f)
+    foods = []
+    for key in JSON_ROOT_KEYS:
+        foods.extend(data.get(key, []))
+    return [trim_record(food) for food in foods]
+
+
+def _open_csv_tables(path: Path) -> dict:
+    """Map CSV file name -> text stream for a zip file or an extracted directory"""
+    if path.suffix == ".zip":
+        archive = zipfile.ZipFile(path)
+        return {
+            Path(name).name: io.TextIOWrapper(archive.open(name), encoding="utf-8")
+            for name in archive.namelist() if name.endswith(".csv")
+        }
+    return {p.name: open(p, encoding="utf-8") for p in path.rglob("*.csv")}
+
+
+def _to_float(value: str):
+    return float(value) if value not in (None, "") else None
+
+
+def load_csv_download(path: Path) -> list:
+    """Read foods from a FDC CSV bulk download"""
+    tables = _open_csv_tables(path)
+
+    foods = {}
+    for row in csv.DictReader(tables["food.csv"]):
+        data_type = CSV_DATA_TYPES.get(row["data_type"])
+        if data_type:
+            foods[int(row["fdc_id"])] = row | {"data_type": data_type}
+
+    categories = {}
+    if "food_category.csv" in tables:
+        categories = {row["id"]: row["description"] for row in csv.DictReader(tables["food_category.csv"])}
+
+    nutrients = {row["id"]: row for row in csv.DictReader(tables["nutrient.csv"])}
+
+    measure_units = {}
+    if "measure_unit.csv" in tables:
+        measure_units = {row["id"]: row["name"] for row in csv.DictReader(tables["measure_unit.csv"])}
+
+    food_nutrients = defaultdict(list)
+    for row in csv.DictReader(tables["food_nutrient.csv"]):
+        fdc_id = int(row["fdc_id"])
+        nutrient = nutrients.get(row["nutrient_id"])
+        if fdc_id not in foods or not nutrient or row["amount"] == "":
+            continue
+        food_nutrients[fdc_id].append({
+            "nutrient": {
+                "id": int(nutrient["id"]),
+                "number": nutrient["nutrient_nbr"],
+                "name": nutrient["name"],
+                "unitName": nutrient["unit_name"],
+            },
+            "amount": float(row["amount"]),
+        })
+
+    food_portions = defaultdict(list)
+    if "food_portion.csv" in tables:
+        for row in csv.DictReader(tables["food_portion.csv"]):
+            fdc_id = int(row["fdc_id"])
+            if fdc_id not in foods:
+                continue
+            food_portions[fdc_id].append({
+                "sequenceNumber": _to_float(row.get("seq_num")),
+                "amount": _to_float(row.get("amount")),
+                "gramWeight": _to_float(row.get("gram_weight")),
+                "modifier": row.get("modifier") or None,
+                "portionDescription": row.get("portion_description") or None,
+                "measureUnit": {"name": measure_units.get(row.get("measure_unit_id"))},
+            })
+
+    return [
+        trim_record({
+            "fdcId": fdc_id,
+            "description": row["description"],
+            "dataType": row["data_type"],
+            "foodCategory": {"description": categories.get(row.get("food_category_id"))},
+            "foodNutrients": food_nutrients[fdc_id],
+            "foodPortions": food_portions[fdc_id],
+        })
+        for fdc_id, row in foods.items()
+    ]
+
+
+def load_download(path: Path) -> list:
+    """Read foods from a JSON or CSV bulk download"""
+    if path.suffix == ".json":
+        return load_json_download(path)
+    return load_csv_download(path)
+
+
+def write_foods(engine, foods: list, replace: bool):
+    """Insert food records in batches, replacing existing rows with the same FDC id"""
+    FDCBase.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        if replace:
+            conn.execute(delete(FDCFoodModel))
+        else:
+            ids = [food["fdcId"] for food in foods]
+            for start in range(0, len(ids), BATCH_SIZE):
+                conn.execute(delete(FDCFoodModel).where(
+                    FDCFoodModel.fdc_id.in_(ids[start:start + BATCH_SIZE])
+                ))
+
+        for start in range(0, len(foods), BATCH_SIZE):
+            conn.execute(insert(FDCFoodModel), [
+                {
+                    "fdc_id": food["fdcId"],
+                    "description": food["description"],
+                    "data_type": food["dataType"],
+                    "food_category": food["foodCategory"]["description"],
+                    "record": food,
+                }
+                for food in foods[start:start + BATCH_SIZE]
+            ])
+
+
+def write_knn_index(engine, path: str) -> int:
+    """Build the kNN estimator index from every food in the mirror"""
+    with engine.connect() as conn:
+        records = conn.execute(select(FDCFoodModel.record)).scalars()
+        return build_knn_index(records, path)
+
+
+def main():
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description='Load FDC bulk downloads into the local mirror')
+    parser.add_argument('paths', nargs='+', help='JSON file, CSV zip file or extracted CSV directory')
+    parser.add_argument('--database-url', default=os.getenv("FDC_LOCAL_DB_URL"),
+                        help='Target database URL (default: FDC_LOCAL_DB_URL)')
+    parser.add_argument('--replace', action='store_true',
+                        help='Delete all existing mirror rows before loading')
+    parser.add_argument('--knn-index', default=os.getenv("FDC_KNN_INDEX"),
+                        help='Also write the kNN nutrition index to this path (default: FDC_KNN_INDEX)')
+
+    args = parser.parse_args()
+
+    if not args.database_url:
+        print("❌ No database URL, pass --database-url or set FDC_LOCAL_DB_URL")
+        sys.exit(1)
+
+    print("🥕 FoodData Central Ingestion")
+    print("=" * 50)
+
+    foods = []
+    for path in args.paths:
+        started = time.perf_counter()
+        loaded = load_download(Path(path))
+        print(f"✅ Read {len(loaded)} foods from {path} in {time.perf_counter() - started:.1f}s")
+        foods.extend(loaded)
+
+    engine = create_fdc_engine(args.database_url)
+    started = time.perf_counter()
+    write_foods(engine, foods, args.replace)
+    print(f"✅ Wrote {len(foods)} foods in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    create_search_index(engine)
+    print(f"🎉 Built search index in {time.perf_counter() - started:.1f}s")
+
+    if args.knn_index:
+        started = time.perf_counter()
+        indexed = write_knn_index(engine, args.knn_index)
+        print(f"🎉 Wrote kNN index for {indexed} foods to {args.knn_index} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
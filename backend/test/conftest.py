@@ -0,0 +1,40 @@
+"""
+Shared test doubles for the OpenAI client (import with `from conftest import ...`).
+"""
+from types import SimpleNamespace
+from openai.types.chat import ChatCompletion
+
+
+def completion(content: str, model: str = "gpt-4o-mini") -> ChatCompletion:
+    """A chat completion whose single choice answers content"""
+    return ChatCompletion.model_validate({
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 2, "total_tokens": 12},
+    })
+
+
+class FakeOpenAI:
+    """
+    AsyncOpenAI stand-in. chat.completions.create answers with completion(create(params))
+    and responses.parse with output_parsed=parse(params); every call's params are recorded.
+    """
+
+    def __init__(self, create=None, parse=None):
+        self._create = create
+        self._parse = parse
+        self.create_calls = []
+        self.parse_calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create_completion))
+        self.responses = SimpleNamespace(parse=self._parse_response)
+
+    async def _create_completion(self, **params):
+        self.create_calls.append(params)
+        return completion(self._create(params), params["model"])
+
+    async def _parse_response(self, **params):
+        self.parse_calls.append(params)
+        return SimpleNamespace(output_parsed=self._parse(params))
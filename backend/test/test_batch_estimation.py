@@ -0,0 +1,52 @@
+import asyncio
+import json
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import FakeOpenAI
+from api.chat import estimate_food_items
+from database.schemas import FoodItem, ItemEstimate, ItemEstimateList
+
+
+def fake_client() -> FakeOpenAI:
+    """Batch call covers only item_index 0; single estimates answer the rest"""
+    def parse(params):
+        estimate = ItemEstimate(item_index=0, intent="log_food", description="batched", calories=100,
+                                protein=10, fiber=1, carbs=20, fat=5, sugar=2, assumptions="llm", message="")
+        return ItemEstimateList(estimates=[estimate])
+
+    def create(params):
+        return json.dumps({"intent": "log_food", "description": "single", "calories": 50, "protein": 1,
+                           "fiber": 0, "carbs": 10, "fat": 1, "sugar": 1, "assumptions": "llm"})
+
+    return FakeOpenAI(create=create, parse=parse)
+
+
+def _single_calls(client: FakeOpenAI) -> list:
+    return [params["messages"][-1]["content"] for params in client.create_calls]
+
+
+def _item(description):
+    return FoodItem(description=description, single_serving_size=100, user_serving_size=100)
+
+
+def test_batch_results_are_mapped_and_gaps_fall_back():
+    client = fake_client()
+    results = asyncio.run(estimate_food_items(client, {2: _item("curry"), 5: _item("stew")}))
+
+    assert len(client.parse_calls) == 1
+    assert results[2]["nutrition"]["description"] == "batched"
+    assert results[2]["nutrition"]["calories"] == 100
+    # item_index 1 (stew) was missing from the batch and was estimated on its own
+    assert results[5]["nutrition"]["description"] == "single"
+    assert _single_calls(client) == ["Lookup nutrition for 100g stew"]
+
+
+def test_single_item_skips_the_batch_call():
+    client = fake_client()
+    results = asyncio.run(estimate_food_items(client, {0: _item("curry")}))
+    assert not client.parse_calls
+    assert results[0]["nutrition"]["description"] == "single"
@@ -0,0 +1,42 @@
+import asyncio
+import json
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import FakeOpenAI
+from api.chat import select_food_items
+from database.schemas import FoodItem, ItemSelection, ItemSelectionList
+
+
+def fake_client() -> FakeOpenAI:
+    """Batch answers item 0 correctly and item 1 with an id that was not among its results"""
+    return FakeOpenAI(
+        create=lambda params: json.dumps({"food_item": "toast", "id": "21"}),
+        parse=lambda params: ItemSelectionList(selections=[
+            ItemSelection(item_index=0, fdc_id="11"),
+            ItemSelection(item_index=1, fdc_id="999"),
+        ]),
+    )
+
+
+def _entry(description, fdc_ids):
+    item = FoodItem(description=description, single_serving_size=100, user_serving_size=100)
+    results = [{"description": f"{description} {fdc_id}", "fdc_id": fdc_id} for fdc_id in fdc_ids]
+    return item, {"success": True, "search_results": results, "confidence": None}
+
+
+def test_one_call_for_the_meal_with_per_item_fallback():
+    client = fake_client()
+    selections = asyncio.run(select_food_items(client, {
+        3: _entry("eggs", [11, 12]),
+        4: _entry("toast", [21, 22]),
+    }))
+
+    assert len(client.parse_calls) == 1
+    assert selections[3] == ("11", "llm")
+    # "999" is not one of toast's candidates, so toast was selected on its own
+    assert len(client.create_calls) == 1
+    assert selections[4] == ("21", "llm")
@@ -0,0 +1,120 @@
+import asyncio
+import sys
+import os
+import time
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client.usda_client import USDAClient
+from utils.batching import MicroBatcher
+from utils.cache import TieredCache
+from utils.deadline import DeadlineExceeded, deadline_scope, remaining
+from utils.rate_limit import BACKGROUND, INTERACTIVE, current_priority, request_priority
+
+
+def _recording_loader(batches):
+    async def load_many(keys):
+        batches.append(sorted(keys))
+        return {key: f"food-{key}" for key in keys if key != "missing"}
+    return load_many
+
+
+def test_concurrent_loads_share_one_batch():
+    batches = []
+    batcher = MicroBatcher("test_batch_window", _recording_loader(batches), window=0.01)
+
+    async def run():
+        return await asyncio.gather(*(batcher.load(key) for key in ["1", "2", "1", "missing"]))
+
+    assert asyncio.run(run()) == ["food-1", "food-2", "food-1", None]
+    assert batches == [["1", "2", "missing"]]
+    assert batcher.stats()["avg_batch_size"] == 3
+
+
+def test_full_batch_flushes_before_window():
+    batches = []
+    batcher = MicroBatcher("test_batch_full", _recording_loader(batches), window=10, max_batch=2)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(batcher.load("1"), batcher.load("2")), timeout=1)
+
+    assert asyncio.run(run()) == ["food-1", "food-2"]
+    assert batches == [["1", "2"]]
+
+
+def test_shared_batch_ignores_the_callers_deadlines():
+    seen = []
+
+    async def load_many(keys):
+        seen.append(remaining())
+        await asyncio.sleep(0.1)
+        return {key: f"food-{key}" for key in keys}
+
+    batcher = MicroBatcher("test_batch_isolated", load_many, window=0.01, timeout=1)
+
+    async def load(key, seconds):
+        with deadline_scope(seconds):
+            return await batcher.load(key)
+
+    async def run():
+        # The hurried request starts the batch; its deadline fails only its own load
+        return await asyncio.gather(load("1", 0.05), load("2", 5), return_exceptions=True)
+
+    hurried, patient = asyncio.run(run())
+    assert isinstance(hurried, DeadlineExceeded)
+    assert patient == "food-2"
+    assert seen == [None]
+
+
+def test_batch_timeout_resolves_waiters_with_none():
+    async def load_many(keys):
+        await asyncio.sleep(1)
+
+    batcher = MicroBatcher("test_batch_timeout", load_many, window=0.001, timeout=0.02)
+
+    assert asyncio.run(batcher.load("1")) is None
+    assert batcher.stats()["timeouts"] == 1
+
+
+def test_batch_runs_at_its_most_urgent_callers_priority():
+    seen = []
+
+    async def load_many(keys):
+        seen.append(current_priority())
+        return {key: f"food-{key}" for key in keys}
+
+    batcher = MicroBatcher("test_batch_priority", load_many, window=0.01)
+
+    async def load(key, priority):
+        with request_priority(priority):
+            return await batcher.load(key)
+
+    async def run():
+        await load("1", BACKGROUND)
+        await asyncio.gather(load("2", BACKGROUND), load("3", INTERACTIVE))
+
+    asyncio.run(run())
+    assert seen == [BACKGROUND, INTERACTIVE]
+
+
+def test_stale_details_refresh_is_background_without_the_request_deadline():
+    usda = USDAClient()
+    usda.details_cache = TieredCache("test_stale_details", ttl=60, stale_ttl=3600)
+    seen = []
+
+    async def load_many(keys):
+        seen.append((current_priority(), remaining()))
+        return {key: {"fdcId": int(key)} for key in keys}
+
+    usda._details_batcher.load_many = load_many
+
+    async def run():
+        usda.details_cache.memory.set("171688", {"fdcId": 171688, "old": True}, time.time() - 120)
+        with deadline_scope(25):
+            assert (await usda.get_food_details("171688"))["old"]
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert seen == [(BACKGROUND, None)]
+    assert usda.details_cache.memory.get("171688")[0] == {"fdcId": 171688}
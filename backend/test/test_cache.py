@@ -0,0 +1,102 @@
+import asyncio
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import cache as cache_module
+from utils.cache import LRUCache, DiskStore, TieredCache
+
+
+def _counting_fetch(value):
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return value
+
+    return fetch, calls
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_size=2)
+    lru.set("a", 1, 0)
+    lru.set("b", 2, 0)
+    lru.get("a")
+    lru.set("c", 3, 0)
+
+    assert lru.get("b") is None
+    assert lru.get("a") == (1, 0)
+    assert len(lru) == 2
+
+
+def test_hit_after_miss_and_empty_results_not_cached():
+    cache = TieredCache("test_hits", ttl=60)
+    fetch, calls = _counting_fetch({"fdcId": 1})
+
+    assert asyncio.run(cache.get_or_fetch("k", fetch)) == {"fdcId": 1}
+    assert asyncio.run(cache.get_or_fetch("k", fetch)) == {"fdcId": 1}
+    assert len(calls) == 1
+
+    empty_fetch, empty_calls = _counting_fetch([])
+    asyncio.run(cache.get_or_fetch("empty", empty_fetch))
+    asyncio.run(cache.get_or_fetch("empty", empty_fetch))
+    assert len(empty_calls) == 2
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+
+
+def test_stale_entry_served_while_refreshing():
+    cache = TieredCache("test_stale", ttl=60, stale_ttl=3600)
+
+    async def run():
+        fetch, calls = _counting_fetch("new")
+        cache.memory.set("k", "old", cache_module.time.time() - 120)
+        assert await cache.get_or_fetch("k", fetch) == "old"
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert await cache.get_or_fetch("k", fetch) == "new"
+        return calls
+
+    assert len(asyncio.run(run())) == 1
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_failed_refresh_is_counted_and_retried():
+    cache = TieredCache("test_refresh_errors", ttl=60, stale_ttl=3600)
+    calls = []
+
+    async def failing_fetch():
+        calls.append(1)
+        raise RuntimeError("upstream down")
+
+    async def run():
+        cache.memory.set("k", "old", cache_module.time.time() - 120)
+        assert await cache.get_or_fetch("k", failing_fetch) == "old"
+        await asyncio.sleep(0.01)
+        # The stale entry is still served and the next stale hit refreshes again
+        assert await cache.get_or_fetch("k", failing_fetch) == "old"
+        await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert len(calls) == 2
+    assert not cache._refreshing
+    assert cache.stats()["refresh_errors"] == 2
+
+
+def test_disk_store_shared_across_caches(tmp_path, monkeypatch):
+    store = DiskStore(path=str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setitem(cache_module._stores, "disk", store)
+
+    first = TieredCache("test_disk", ttl=60, backend="disk")
+    fetch, calls = _counting_fetch(["apple"])
+    asyncio.run(first.get_or_fetch("k", fetch))
+
+    # A new process-level cache (e.g. after a cold start) reads the persisted entry
+    second = TieredCache("test_disk", ttl=60, backend="disk")
+    assert asyncio.run(second.get_or_fetch("k", fetch)) == ["apple"]
+    assert len(calls) == 1
+    assert second.stats()["store_hits"] == 1
@@ -0,0 +1,69 @@
+import asyncio
+import json
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import api.chat as chat
+from database.schemas import FoodItem
+
+
+def parse_events(body: str) -> list:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sends_intent_items_and_summary_in_order(monkeypatch):
+    saved = []
+
+    async def load(conversation_id, user_id):
+        return None
+
+    async def save(conversation_id, user_id, turns, summary):
+        saved.append((conversation_id, turns))
+
+    async def classify(client, request):
+        return "food_lookup", '{"action": "food_lookup"}', None
+
+    async def decompose(client, request):
+        return [FoodItem(description=name, single_serving_size=100, user_serving_size=100) for name in ("slow stew", "apple")]
+
+    async def process(client, item, estimate=None, select=None, search=None):
+        # The stew finishes last, so items arrive in completion order
+        await asyncio.sleep(0.05 if item.description == "slow stew" else 0)
+        return {"nutrition": {"description": item.description, "calories": 100}}
+
+    monkeypatch.setattr(chat, "get_openai_client", lambda: None)
+    monkeypatch.setattr(chat.conversations, "load", load)
+    monkeypatch.setattr(chat.conversations, "save", save)
+    monkeypatch.setattr(chat, "classify_request", classify)
+    monkeypatch.setattr(chat, "decompose_meal", decompose)
+    monkeypatch.setattr(chat, "process_single_food_item", process)
+    monkeypatch.setattr(chat, "CHAT_SPECULATIVE", False)
+    monkeypatch.setattr(chat, "LLM_BATCH_ESTIMATION", False)
+    monkeypatch.setattr(chat, "LLM_BATCH_SELECTION", False)
+
+    app = FastAPI()
+    app.include_router(chat.router)
+    with TestClient(app) as client:
+        response = client.post("/openai/chat/stream", json={"user_id": "u", "description": "slow stew and an apple"})
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_events(response.text)
+    assert [event for event, _ in events] == ["intent", "items", "item", "item", "summary"]
+    assert events[0][1] == {"action": "food_lookup"}
+    assert [item["description"] for item in events[1][1]["items"]] == ["slow stew", "apple"]
+    assert [(data["index"], data["nutrition"]["description"]) for _, data in events[2:4]] == [(1, "apple"), (0, "slow stew")]
+
+    summary = events[4][1]
+    assert [meal["description"] for meal in summary["meals"]] == ["slow stew", "apple"]
+    # The turn is stored once, under the id the summary reports
+    assert [conversation_id for conversation_id, _ in saved] == [summary["conversation_id"]]
+    assert saved[0][1][-2]["content"] == "slow stew and an apple"
@@ -0,0 +1,61 @@
+import asyncio
+import json
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import FakeOpenAI
+import api.chat as chat
+from database.schemas import ChatRequest, FoodItem, IntentWithItems
+
+ITEMS = [FoodItem(description="apple", single_serving_size=182, user_serving_size=182)]
+
+
+def combined(monkeypatch, parsed):
+    """Run classify_request in combined mode; parsed is what each structured call returns"""
+    client = FakeOpenAI(
+        create=lambda params: '{"action": "food_lookup", "confidence": 0.9}',
+        parse=lambda params: parsed,
+    )
+    monkeypatch.setattr(chat, "CHAT_PIPELINE_MODE", "combined")
+    monkeypatch.setattr(chat.intent_agreement, "use_fast_path", lambda guess: False)
+    request = ChatRequest(user_id="u", description="I ate an apple")
+    result = asyncio.run(chat.classify_request(client, request))
+    return result, {"parsed": [params["model"] for params in client.parse_calls], "two_step": len(client.create_calls)}
+
+
+def test_food_lookup_carries_its_items(monkeypatch):
+    parsed = IntentWithItems(action="food_lookup", confidence=0.95, reasoning="logged a meal", items=ITEMS)
+
+    (action, response_text, food_items), calls = combined(monkeypatch, parsed)
+
+    assert action == "food_lookup"
+    assert food_items == ITEMS
+    assert json.loads(response_text) == {"action": "food_lookup", "confidence": 0.95, "reasoning": "logged a meal"}
+    assert len(calls["parsed"]) == 1 and calls["two_step"] == 0
+
+
+def test_invalid_output_falls_back_to_two_step(monkeypatch):
+    (action, response_text, food_items), calls = combined(monkeypatch, None)
+
+    # The combined call is escalated once, then the two-step intent call decides
+    assert calls["parsed"] == [chat.model_router.route("combined_intent").model,
+                               chat.model_router.route("combined_intent").escalation_model]
+    assert calls["two_step"] == 1
+    assert action == "food_lookup"
+    assert json.loads(response_text)["confidence"] == 0.9
+    # The items are decomposed by the regular step
+    assert food_items is None
+
+
+def test_chat_drops_items(monkeypatch):
+    parsed = IntentWithItems(action="chat", confidence=0.9, reasoning="a question", items=ITEMS)
+
+    (action, response_text, food_items), calls = combined(monkeypatch, parsed)
+
+    assert action == "chat"
+    assert food_items is None
+    assert "items" not in json.loads(response_text)
+    assert calls["two_step"] == 0
@@ -0,0 +1,63 @@
+import asyncio
+import copy
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import client.conversations as conversations_module
+from client.conversations import ConversationStore
+
+
+def _store(table: dict) -> ConversationStore:
+    """A store over a shared dict standing in for the conversations table"""
+    store = ConversationStore(enabled=True)
+
+    def read(conversation_id):
+        entry = table.get(conversation_id)
+        return copy.deepcopy(entry) if entry is not None else None
+
+    def write(conversation_id, entry):
+        table[conversation_id] = copy.deepcopy(entry)
+
+    store._read = read
+    store._write = write
+    return store
+
+
+async def _add_turn(store: ConversationStore, content: str):
+    loaded = await store.load("c1", "u")
+    turns = loaded[0] if loaded else []
+    await store.save("c1", "u", turns + [{"role": "user", "content": content}], None)
+
+
+def test_containers_sharing_a_table_keep_every_turn():
+    table = {}
+    first, second = _store(table), _store(table)
+
+    async def run():
+        await _add_turn(first, "t1")
+        await _add_turn(second, "t2")
+        # first still holds its copy from t1, the table is newer
+        await _add_turn(first, "t3")
+
+    asyncio.run(run())
+    assert [turn["content"] for turn in table["c1"]["turns"]] == ["t1", "t2", "t3"]
+
+
+def test_in_process_copy_is_served_while_the_database_is_down(monkeypatch):
+    table = {}
+    store = _store(table)
+    asyncio.run(_add_turn(store, "t1"))
+
+    def broken(conversation_id):
+        raise ConnectionError("database down")
+
+    store._read = broken
+    monkeypatch.setattr(conversations_module, "CONVERSATION_RETRY_AFTER", 60)
+
+    turns, _ = asyncio.run(store.load("c1", "u"))
+    assert [turn["content"] for turn in turns] == ["t1"]
+    assert asyncio.run(store.load("c1", "someone else")) is None
+    assert store.stats()["errors"] == 1 and store.stats()["memory_hits"] == 2
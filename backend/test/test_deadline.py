@@ -0,0 +1,63 @@
+import asyncio
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import api.chat as chat
+from database.schemas import ChatRequest, FoodItem
+from utils.deadline import DeadlineExceeded, deadline_scope, remaining, stage, stage_timings, within_deadline
+
+
+def test_stage_budget_and_nested_deadlines():
+    async def run():
+        with deadline_scope(5):
+            # An inner scope can shorten the deadline but never extend it
+            with deadline_scope(60):
+                assert remaining() <= 5
+            async with stage("fast", budget=1):
+                await asyncio.sleep(0)
+            with pytest.raises(DeadlineExceeded):
+                async with stage("slow", budget=0.02):
+                    await asyncio.sleep(1)
+            assert set(stage_timings()) == {"fast", "slow"}
+        assert remaining() is None
+
+    asyncio.run(run())
+
+
+def test_outbound_calls_stop_at_the_deadline():
+    async def run():
+        with deadline_scope(0.02):
+            with pytest.raises(DeadlineExceeded):
+                await within_deadline(lambda: asyncio.sleep(1))
+
+    asyncio.run(run())
+
+
+def test_unfinished_items_are_cancelled_and_reported(monkeypatch):
+    async def process(client, item, estimate=None, select=None, search=None):
+        await asyncio.sleep(0 if item.description == "apple" else 1)
+        return {"nutrition": {"description": item.description, "calories": 52}}
+
+    monkeypatch.setattr(chat, "process_single_food_item", process)
+    monkeypatch.setattr(chat, "CHAT_DEADLINE_RESERVE", 0)
+    monkeypatch.setattr(chat, "LLM_BATCH_ESTIMATION", False)
+    monkeypatch.setattr(chat, "LLM_BATCH_SELECTION", False)
+    items = [FoodItem(description=name, single_serving_size=100, user_serving_size=100) for name in ("apple", "slow stew")]
+
+    async def classify(client, request):
+        return "food_lookup", "{}", items
+
+    monkeypatch.setattr(chat, "classify_request", classify)
+
+    async def run():
+        with deadline_scope(0.1):
+            return await chat.run_chat_pipeline(None, ChatRequest(user_id="u", description="apple and slow stew"))
+
+    response = asyncio.run(run())
+    assert [meal["description"] for meal in response.meals] == ["apple"]
+    assert response.errors == ["Timed out looking up slow stew"]
+    assert [timing["status"] for timing in response.timings["items"]] == ["ok", "timed_out"]
@@ -0,0 +1,95 @@
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client.fdc_nutrients import extract_usda_nutrients
+
+
+def _nutrient(nutrient_id, number, name, unit, amount):
+    return {
+        "type": "FoodNutrient",
+        "nutrient": {"id": nutrient_id, "number": number, "name": name, "unitName": unit},
+        "amount": amount
+    }
+
+
+SR_LEGACY_APPLE = {
+    "fdcId": 171688,
+    "description": "Apples, raw, with skin",
+    "dataType": "SR Legacy",
+    "foodNutrients": [
+        _nutrient(1008, "208", "Energy", "kcal", 52),
+        _nutrient(1062, "268", "Energy", "kJ", 218),
+        _nutrient(1003, "203", "Protein", "g", 0.26),
+        _nutrient(1005, "205", "Carbohydrate, by difference", "g", 13.81),
+        _nutrient(1004, "204", "Total lipid (fat)", "g", 0.17),
+        _nutrient(1079, "291", "Fiber, total dietary", "g", 2.4),
+        _nutrient(2000, "269", "Sugars, total including NLEA", "g", 10.39),
+    ]
+}
+
+FOUNDATION_EGG = {
+    "fdcId": 748967,
+    "description": "Eggs, Grade A, Large, egg whole",
+    "dataType": "Foundation",
+    "foodNutrients": [
+        _nutrient(2048, "958", "Energy (Atwater Specific Factors)", "kcal", 148),
+        _nutrient(2047, "957", "Energy (Atwater General Factors)", "kcal", 150),
+        _nutrient(1003, "203", "Protein", "g", 12.4),
+        _nutrient(1050, "205.2", "Carbohydrate, by summation", "g", 0.96),
+        _nutrient(1004, "204", "Total lipid (fat)", "g", 9.96),
+        _nutrient(1063, "269.3", "Sugars, Total NLEA", "g", 0.2),
+    ]
+}
+
+
+def test_sr_legacy_layout():
+    result = extract_usda_nutrients(SR_LEGACY_APPLE)
+
+    assert result["intent"] == "log_food"
+    assert result["description"] == "Apples, raw, with skin"
+    assert result["calories"] == 52
+    assert result["protein"] == 0.26
+    assert result["carbs"] == 13.81
+    assert result["fat"] == 0.17
+    assert result["fiber"] == 2.4
+    assert result["sugar"] == 10.39
+    assert result["assumptions"] == "Data from USDA FoodData Central"
+
+
+def test_foundation_layout_uses_atwater_energy():
+    result = extract_usda_nutrients(FOUNDATION_EGG)
+
+    assert result["calories"] == 148
+    assert result["carbs"] == 0.96
+    assert result["sugar"] == 0.2
+    assert result["fiber"] == 0
+    assert "fiber not reported" in result["assumptions"]
+
+
+def test_search_result_layout():
+    food = {
+        "description": "Bananas, raw",
+        "foodNutrients": [
+            {"nutrientId": 1008, "nutrientNumber": "208", "unitName": "KCAL", "value": 89},
+            {"nutrientId": 1003, "nutrientNumber": "203", "unitName": "G", "value": 1.09},
+            {"nutrientId": 1005, "nutrientNumber": "205", "unitName": "G", "value": 22.8},
+            {"nutrientId": 1004, "unitName": "G", "value": 0.33},
+        ]
+    }
+
+    result = extract_usda_nutrients(food)
+
+    assert result["calories"] == 89
+    assert result["fat"] == 0.33
+
+
+def test_missing_core_nutrients_returns_none():
+    food = {
+        "description": "Spice blend",
+        "foodNutrients": [_nutrient(1008, "208", "Energy", "kcal", 300)]
+    }
+
+    assert extract_usda_nutrients(food) is None
@@ -0,0 +1,74 @@
+import asyncio
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client.usda_client import USDAClient
+from utils.cache import TieredCache
+from utils.food_keys import canonical_food_key, singularize
+
+
+def test_equivalent_descriptions_share_a_key():
+    keys = {canonical_food_key(text).key for text in ["Bananas", "banana ", "1 banana", "a ripe banana"]}
+    assert keys == {"banana"}
+
+
+def test_quantity_and_unit_are_extracted():
+    assert canonical_food_key("100g white rice") == ("white rice", 100.0, "g")
+    assert canonical_food_key("2 tbsp Honey") == ("honey", 2.0, "tbsp")
+    assert canonical_food_key("1 ½ cups milk") == ("milk", 1.5, "cup")
+    assert canonical_food_key("two large eggs") == ("egg", 2.0, None)
+
+
+def test_synonyms_are_mapped():
+    assert canonical_food_key("Greek yoghurt").key == "greek yogurt"
+    assert canonical_food_key("semi-skimmed milk").key == "reduced fat milk"
+    assert canonical_food_key("aubergine").key == "eggplant"
+    # "whole" is meaningful for milk and must not be dropped as filler
+    assert canonical_food_key("whole milk").key == "whole milk"
+
+
+def test_singularize():
+    assert singularize("cherries") == "cherry"
+    assert singularize("potatoes") == "potato"
+    assert singularize("hummus") == "hummus"
+    assert singularize("glass") == "glass"
+
+
+def test_mince_is_beef_only_with_beef():
+    assert canonical_food_key("beef mince").key == "ground beef"
+    assert canonical_food_key("minced beef").key == "ground beef"
+    assert canonical_food_key("chicken mince").key == "chicken mince"
+    assert canonical_food_key("mince pie").key == "mince pie"
+
+
+def test_percentages_and_brand_numbers_stay_in_the_name():
+    assert canonical_food_key("2% milk") == ("2% milk", None, None)
+    assert canonical_food_key("2 % milk").key == "2% milk"
+    assert canonical_food_key("85% lean ground beef") == ("85% lean ground beef", None, None)
+    assert canonical_food_key("1 cup 2% milk") == ("2% milk", 1.0, "cup")
+    assert canonical_food_key("7up") == ("7up", None, None)
+    assert canonical_food_key("12 oz 7up") == ("7up", 12.0, "oz")
+    assert canonical_food_key("2% milk").key != canonical_food_key("milk").key
+
+
+def test_usda_search_sends_the_description_and_caches_by_key():
+    client = USDAClient()
+    # Memory only, so entries left on disk by earlier runs do not answer the searches
+    client.search_cache = TieredCache("test_usda_search", ttl=60)
+    queries = []
+
+    async def fetch_search(query, page_size):
+        queries.append(query)
+        return [{"fdcId": len(queries), "description": query}]
+
+    client._fetch_search = fetch_search
+
+    async def run():
+        return [await client.search_food(text) for text in ["2% Milk", "2 % milk", "milk", "chicken mince"]]
+
+    results = asyncio.run(run())
+    assert queries == ["2% Milk", "milk", "chicken mince"]
+    assert results[0] == results[1] != results[2]
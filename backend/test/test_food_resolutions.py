@@ -0,0 +1,72 @@
+import asyncio
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.models import FoodResolutionModel
+from database.crud import add_food_resolution_hits, get_food_resolution, upsert_food_resolution, delete_food_resolution
+from client.food_resolutions import FoodResolutionStore
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    FoodResolutionModel.__table__.create(engine)
+    return sessionmaker(bind=engine)()
+
+
+def test_resolution_round_trip_counts_hits():
+    db = _session()
+    assert get_food_resolution("greek yogurt", db) is None
+
+    upsert_food_resolution("greek yogurt", "330137", 0.42, "ranked", db)
+    # Lookups are read only, hits are added separately
+    get_food_resolution("greek yogurt", db)
+    add_food_resolution_hits({"greek yogurt": 2, "unknown": 1}, db)
+    db.expire_all()
+    resolution = get_food_resolution("greek yogurt", db)
+    assert (resolution.fdc_id, resolution.source, resolution.hit_count) == ("330137", "ranked", 2)
+
+    # A different choice replaces the mapping and restarts the count
+    upsert_food_resolution("greek yogurt", "170903", None, "llm", db)
+    resolution = get_food_resolution("greek yogurt", db)
+    assert (resolution.fdc_id, resolution.hit_count) == ("170903", 0)
+
+    assert delete_food_resolution("greek yogurt", db)
+    assert get_food_resolution("greek yogurt", db) is None
+
+
+def test_store_treats_database_errors_as_misses():
+    store = FoodResolutionStore(enabled=True)
+
+    def failing_read(description):
+        raise RuntimeError("connection refused")
+
+    calls = []
+    store._read = failing_read
+    assert asyncio.run(store.get("banana")) is None
+
+    # The table is skipped after a failure instead of retried for every item
+    store._read = lambda description: calls.append(description) or "173944"
+    assert asyncio.run(store.get("banana")) is None
+    assert calls == []
+    assert store.stats()["errors"] == 1
+
+
+def test_store_batches_hit_counts_in_the_background():
+    store = FoodResolutionStore(enabled=True)
+    writes = []
+    store._read = lambda description: "173944" if description == "banana" else None
+    store._write_hits = writes.append
+
+    async def run():
+        await asyncio.gather(*(store.get(description) for description in ["banana", "banana", "kiwi", "banana"]))
+        await asyncio.gather(*store._tasks)
+
+    asyncio.run(run())
+    assert sum(sum(hits.values()) for hits in writes) == 3
+    assert all(set(hits) == {"banana"} for hits in writes)
+    assert store.stats()["hits"] == 3
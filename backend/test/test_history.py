@@ -0,0 +1,58 @@
+import asyncio
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conftest import FakeOpenAI
+import api.chat as chat
+from database.schemas import ChatRequest
+from llm.history import compact_history, estimate_tokens, format_history, history_with_summary
+
+
+def _turns(count):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i}"} for i in range(count)]
+
+
+def test_recent_turns_kept_verbatim_and_older_summarized():
+    turns, summary = compact_history(_turns(10), keep_turns=4, token_budget=1000)
+    assert [turn["content"] for turn in turns] == ["message 6", "message 7", "message 8", "message 9"]
+    assert summary.splitlines()[0] == "User: message 0"
+    assert len(summary.splitlines()) == 6
+
+
+def test_history_stays_under_token_budget():
+    long_turns = [{"role": "user", "content": "x" * 400} for _ in range(50)]
+    turns, summary = compact_history(long_turns, keep_turns=6, token_budget=300)
+    total = sum(estimate_tokens(turn["content"]) for turn in turns) + estimate_tokens(summary or "")
+    assert total <= 300
+    assert turns  # the newest message survives
+
+
+def test_meal_turns_are_summarized_compactly():
+    meal = {"description": "Apples, raw", "calories": 78.0, "protein": 0.39}
+    turn = {"role": "assistant", "content": f"Meals assistant found to log: Apples, raw ({meal}) - done"}
+    _, summary = compact_history([turn], keep_turns=0, token_budget=1000)
+    assert summary == "Assistant: Logged Apples, raw (78 kcal)"
+
+
+def test_summary_is_rendered_first():
+    history = history_with_summary(_turns(2), "User: earlier")
+    assert format_history(history) == "Earlier conversation:\nUser: earlier\nUser: message 0\nAssistant: message 1"
+
+
+def test_intent_prompt_uses_compact_history(monkeypatch):
+    client = FakeOpenAI(create=lambda params: '{"action": "chat", "confidence": 0.9}')
+    monkeypatch.setattr(chat, "CHAT_PIPELINE_MODE", "two_step")
+    monkeypatch.setattr(chat.intent_agreement, "use_fast_path", lambda guess: False)
+    request = ChatRequest(user_id="u", description="how much protein is that",
+                          history=history_with_summary(_turns(2), "User: earlier"))
+
+    action, _, _ = asyncio.run(chat.classify_request(client, request))
+    # The user message follows the system instructions
+    prompts = [params["messages"][1]["content"] for params in client.create_calls]
+
+    assert action == "chat"
+    assert "Conversation history: \n" + format_history(request.history) in prompts[0]
+    assert '"role"' not in prompts[0]
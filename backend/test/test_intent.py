@@ -0,0 +1,48 @@
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.intent import INTENT_FAST_PATH_THRESHOLD, classify_intent, IntentAgreement
+
+
+def test_obvious_messages_clear_the_threshold():
+    for text in ["I had 2 eggs and toast", "log 2 apples", "100g chicken breast"]:
+        guess = classify_intent(text)
+        assert guess.action == "food_lookup" and guess.confidence >= 0.9, text
+    for text in ["what is protein?", "What did I eat today?", "Tell me about my last meal"]:
+        guess = classify_intent(text)
+        assert guess.action == "chat" and guess.confidence >= 0.9, text
+
+
+def test_non_food_messages_do_not_clear_the_threshold():
+    # "had" without food, quantities of something else, and questions after a meal
+    for text in ["I had a bad day", "I had a great workout", "1 more question",
+                 "i just had a coffee what do you think", "I had a question about fiber"]:
+        guess = classify_intent(text)
+        assert guess.action == "chat" or guess.confidence < 0.9, (text, guess)
+
+
+def test_fast_path_is_off_by_default():
+    agreement = IntentAgreement()
+    assert INTENT_FAST_PATH_THRESHOLD > 1.0
+    assert not agreement.use_fast_path(classify_intent("I had 2 eggs and toast"))
+    assert agreement.stats()["llm"] == 1
+
+
+def test_corrections_are_left_to_the_llm():
+    assert classify_intent("Actually it was 3 eggs").confidence < 0.9
+
+
+def test_agreement_stats():
+    agreement = IntentAgreement()
+    guess = classify_intent("what is protein?")
+    assert agreement.use_fast_path(guess, threshold=0.9)
+    assert not agreement.use_fast_path(guess, threshold=1.1)
+
+    agreement.record(guess, "chat")
+    agreement.record(guess, "food_lookup")
+    stats = agreement.stats()
+    assert (stats["fast_path"], stats["llm"], stats["compared"], stats["agreed"]) == (1, 1, 2, 1)
+    assert stats["by_confidence"]["0.9"] == {"compared": 2, "agreement_rate": 0.5}
@@ -0,0 +1,99 @@
+import asyncio
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai.types.chat import ChatCompletion
+from conftest import FakeOpenAI
+import llm.cache as llm_cache
+import llm.helpers as helpers
+from llm.cache import get_llm_cache, llm_cache_key
+from utils.cache import TieredCache
+
+MESSAGES = [{"role": "user", "content": "Pick the best match for apple"}]
+
+
+def counting_client() -> FakeOpenAI:
+    """Answers "answer <n>" for its n-th completion"""
+    client = FakeOpenAI(create=lambda params: f"answer {len(client.create_calls)}")
+    return client
+
+
+def test_key_is_stable_and_covers_the_completion_inputs():
+    key = llm_cache_key("gpt-4o-mini", "Select", MESSAGES, temperature=0.0, max_tokens=150)
+
+    # Dict key order and list copies do not change the key
+    reordered = [{"content": "Pick the best match for apple", "role": "user"}]
+    assert llm_cache_key("gpt-4o-mini", "Select", reordered, temperature=0.0, max_tokens=150) == key
+    assert len(key) == 64
+
+    assert llm_cache_key("gpt-4o", "Select", MESSAGES, temperature=0.0, max_tokens=150) != key
+    assert llm_cache_key("gpt-4o-mini", "Select", MESSAGES, temperature=0.3, max_tokens=150) != key
+    # A completion cut off at a smaller max_tokens is not served for a larger one
+    assert llm_cache_key("gpt-4o-mini", "Select", MESSAGES, temperature=0.0, max_tokens=500) != key
+    assert llm_cache_key("gpt-4o-mini", "Select", MESSAGES, temperature=0.0) != key
+
+
+def test_cache_is_opt_in_per_prompt_type(monkeypatch):
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", False)
+    assert get_llm_cache("selection") is None
+
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_PROMPTS", {"selection"})
+    monkeypatch.setattr(llm_cache, "LLM_CACHE_BACKEND", "memory")
+    monkeypatch.setattr(llm_cache, "_caches", {})
+    assert get_llm_cache("intent") is None
+    assert get_llm_cache("selection") is get_llm_cache("selection")
+
+
+def test_hits_and_misses_through_create_openai_response(monkeypatch):
+    cache = TieredCache("test_llm_selection", ttl=60)
+    monkeypatch.setattr(helpers, "get_llm_cache", lambda prompt_type: cache if prompt_type == "selection" else None)
+    client = counting_client()
+
+    async def respond(content: str, max_tokens: int = 150):
+        return await helpers.create_openai_response(
+            client, "gpt-4o-mini", [{"role": "user", "content": content}], "Select",
+            temperature=0.0, prompt_type="selection", max_tokens=max_tokens
+        )
+
+    async def run():
+        first = await respond("apple")
+        second = await respond("apple")
+        other = await respond("banana")
+        longer = await respond("apple", max_tokens=500)
+        return first, second, other, longer
+
+    first, second, other, longer = asyncio.run(run())
+
+    assert len(client.create_calls) == 3
+    assert first.choices[0].message.content == second.choices[0].message.content == "answer 1"
+    assert other.choices[0].message.content == "answer 2"
+    assert longer.choices[0].message.content == "answer 3"
+    assert client.create_calls[2]["max_tokens"] == 500
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 3
+
+
+def test_cached_completion_round_trips_as_chat_completion(monkeypatch):
+    cache = TieredCache("test_llm_round_trip", ttl=60)
+    monkeypatch.setattr(helpers, "get_llm_cache", lambda prompt_type: cache)
+    client = counting_client()
+
+    async def run():
+        fresh = await helpers.create_openai_response(client, "gpt-4o-mini", MESSAGES, "Select", prompt_type="selection")
+        cached = await helpers.create_openai_response(client, "gpt-4o-mini", MESSAGES, "Select", prompt_type="selection")
+        return fresh, cached
+
+    fresh, cached = asyncio.run(run())
+
+    assert len(client.create_calls) == 1
+    # What the cache stores is plain JSON, and it is served back as the same ChatCompletion
+    key = llm_cache_key("gpt-4o-mini", "Select", MESSAGES)
+    stored, _ = cache.memory.get(key)
+    assert isinstance(stored, dict)
+    assert isinstance(cached, ChatCompletion)
+    assert cached == fresh
+    assert cached.choices[0].message.content == "answer 1"
+    assert cached.usage.total_tokens == 12
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client.fdc_search import match_confidence
+from client.local_fdc import LocalFDCBackend, create_fdc_engine, create_search_index
+from scripts.ingest_fdc import load_download, write_foods
+
+
+CSV_TABLES = {
+    "food.csv": (
+        "fdc_id,data_type,description,food_category_id,publication_date\n"
+        "171688,sr_legacy_food,\"Apples, raw, with skin\",9,2019-04-01\n"
+        "173944,sr_legacy_food,\"Bananas, raw\",9,2019-04-01\n"
+        "171686,sr_legacy_food,\"Apple juice, canned or bottled, unsweetened, without added ascorbic acid\",9,2019-04-01\n"
+        "174933,sr_legacy_food,\"Pie, apple, commercially prepared, enriched flour\",18,2019-04-01\n"
+        "999999,branded_food,\"Banana chips, brand X\",9,2019-04-01\n"
+    ),
+    "food_category.csv": "id,code,description\n9,0900,Fruits and Fruit Juices\n18,1800,Baked Products\n",
+    "nutrient.csv": (
+        "id,name,unit_name,nutrient_nbr,rank\n"
+        "1008,Energy,KCAL,208,300\n"
+        "1003,Protein,G,203,600\n"
+    ),
+    "food_nutrient.csv": (
+        "id,fdc_id,nutrient_id,amount\n"
+        "1,171688,1008,52\n"
+        "2,171688,1003,0.26\n"
+        "3,173944,1008,89\n"
+        "4,999999,1008,519\n"
+    ),
+    "measure_unit.csv": "id,name\n1000,cup\n9999,undetermined\n",
+    "food_portion.csv": (
+        "id,fdc_id,seq_num,amount,measure_unit_id,portion_description,modifier,gram_weight\n"
+        "1,171688,1,1,9999,,medium (3\" dia),182\n"
+        "2,171688,2,1,1000,,\"quartered or chopped\",125\n"
+    ),
+}
+
+JSON_DOWNLOAD = {
+    "FoundationFoods": [{
+        "fdcId": 748967,
+        "description": "Eggs, Grade A, Large, egg whole",
+        "dataType": "Foundation",
+        "foodCategory": {"description": "Dairy and Egg Products"},
+        "foodNutrients": [{
+            "type": "FoodNutrient",
+            "nutrient": {"id": 1003, "number": "203", "name": "Protein", "unitName": "g"},
+            "amount": 12.4,
+            "dataPoints": 12
+        }],
+        "foodPortions": []
+    }]
+}
+
+
+def _build_mirror(tmp_path):
+    csv_dir = tmp_path / "sr_legacy"
+    csv_dir.mkdir()
+    for name, content in CSV_TABLES.items():
+        (csv_dir / name).write_text(content)
+    json_path = tmp_path / "foundation.json"
+    json_path.write_text(json.dumps(JSON_DOWNLOAD))
+
+    database_url = f"sqlite:///{tmp_path / 'fdc.sqlite3'}"
+    foods = load_download(csv_dir) + load_download(json_path)
+    engine = create_fdc_engine(database_url)
+    write_foods(engine, foods, replace=True)
+    create_search_index(engine)
+    return LocalFDCBackend(database_url)
+
+
+def test_csv_download_keeps_foundation_and_sr_legacy_only(tmp_path):
+    csv_dir = tmp_path / "csv"
+    csv_dir.mkdir()
+    for name, content in CSV_TABLES.items():
+        (csv_dir / name).write_text(content)
+
+    foods = load_download(csv_dir)
+
+    assert sorted(food["fdcId"] for food in foods) == [171686, 171688, 173944, 174933]
+    apple = next(food for food in foods if food["fdcId"] == 171688)
+    assert apple["dataType"] == "SR Legacy"
+    assert apple["foodCategory"]["description"] == "Fruits and Fruit Juices"
+    assert apple["foodNutrients"][0]["nutrient"]["number"] == "208"
+    assert apple["foodPortions"][1]["measureUnit"]["name"] == "cup"
+    assert apple["foodPortions"][1]["gramWeight"] == 125
+
+
+def test_backend_search_and_details(tmp_path):
+    backend = _build_mirror(tmp_path)
+
+    results = asyncio.run(backend.search_food("apple raw", page_size=5))
+    assert results[0]["fdcId"] == 171688
+    assert 999999 not in [food["fdcId"] for food in results]
+
+    details = asyncio.run(backend.get_food_details("748967"))
+    assert details["description"] == "Eggs, Grade A, Large, egg whole"
+    assert details["foodNutrients"][0]["amount"] == 12.4
+    assert "dataPoints" not in details["foodNutrients"][0]
+
+    assert asyncio.run(backend.get_food_details("none")) is None
+    assert asyncio.run(backend.get_food_details("123")) is None
+
+
+def test_ranked_search_prefers_raw_produce(tmp_path):
+    backend = _build_mirror(tmp_path)
+
+    results = asyncio.run(backend.search_food("apples", page_size=20))
+    assert results[0]["fdcId"] == 171688
+    # Clear enough to skip the selection call (FDC_SELECTION_MARGIN)
+    assert match_confidence(results) >= 0.2
+
+    results = asyncio.run(backend.search_food("apple juice", page_size=3))
+    assert results[0]["fdcId"] == 171686
+
+    results = asyncio.run(backend.search_food("apple pie", page_size=3))
+    assert results[0]["fdcId"] == 174933
+    assert results[0]["score"] >= results[1]["score"]
+
+
+def test_match_confidence():
+
+    assert match_confidence([]) == 0.0
+    assert match_confidence([{"score": 0.9}]) == 1.0
+    assert match_confidence([{"score": 0.8}, {"score": 0.6}]) == 0.25
@@ -0,0 +1,77 @@
+import asyncio
+import json
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from database.schemas import ChatRequest
+from llm.routing import InvalidOutput, ModelRouter, StageRoute, load_routes, request_route
+
+
+def test_routes_from_file_then_environment(tmp_path):
+    path = tmp_path / "routing.json"
+    path.write_text(json.dumps({
+        "intent": {"model": "gpt-4o", "max_tokens": 100},
+        "decompose": {"escalation_model": ""},
+        "unknown_stage": {"model": "x"},
+    }))
+
+    routes = load_routes(str(path), {"LLM_INTENT_MAX_TOKENS": "50", "LLM_CHAT_MODEL": "gpt-4o"})
+
+    assert routes["intent"].model == "gpt-4o"
+    assert routes["intent"].max_tokens == 50
+    assert routes["decompose"].escalation_model is None
+    assert routes["chat"].model == "gpt-4o"
+    assert "unknown_stage" not in routes
+
+
+def test_escalates_invalid_and_low_confidence_output():
+    router = ModelRouter({
+        "intent": StageRoute("small", "large", min_confidence=0.7),
+        "estimation": StageRoute("small"),
+    }, name=None)
+    models = []
+
+    async def classify(route):
+        models.append(route.model)
+        if len(models) == 1:
+            raise InvalidOutput("not json")
+        return {"action": "chat", "confidence": 0.6 if len(models) == 3 else 0.9}
+
+    async def estimate(route):
+        raise InvalidOutput("no estimate")
+
+    async def run():
+        first = await router.call("intent", classify, lambda result: result["confidence"])
+        second = await router.call("intent", classify, lambda result: result["confidence"])
+        with pytest.raises(InvalidOutput):
+            await router.call("estimation", estimate)
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert models == ["small", "large", "small", "large"]
+    assert first["confidence"] == second["confidence"] == 0.9
+    stats = router.stats()
+    assert stats["intent"]["escalations"] == 2 and stats["intent"]["escalation_rate"] == 1.0
+    assert stats["estimation"] == {**stats["estimation"], "invalid": 1, "escalations": 0}
+
+
+def test_request_overrides_only_explicit_fields():
+    route = StageRoute("gpt-4o-mini", max_tokens=500, temperature=0.3)
+
+    # Schema defaults (model="gpt-4", max_tokens=150) leave the route alone
+    assert request_route(route, ChatRequest(user_id="u", description="hi")) == route
+
+    explicit = ChatRequest(user_id="u", description="hi", model="gpt-4o", temperature=0.9, max_tokens=2000)
+    assert request_route(route, explicit) == StageRoute("gpt-4o", max_tokens=500, temperature=0.9)
+
+    unlisted = ChatRequest(user_id="u", description="hi", model="o1-pro", max_tokens=400)
+    assert request_route(route, unlisted) == route._replace(max_tokens=400)
+
+    # What older app builds send explicitly: the reply keeps its 500 token budget
+    legacy = ChatRequest(user_id="u", description="hi", model="gpt-4", temperature=0, max_tokens=150)
+    assert request_route(route, legacy) == route._replace(temperature=0.0)
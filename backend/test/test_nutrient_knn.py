@@ -0,0 +1,60 @@
+import asyncio
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from client.nutrient_knn import NutrientKNN, build_knn_index
+
+
+def _record(fdc_id, description, calories, protein, carbs, fat):
+    nutrients = {"203": protein, "204": fat, "205": carbs, "208": calories}
+    return {
+        "fdcId": fdc_id,
+        "description": description,
+        "foodNutrients": [{"nutrient": {"number": number}, "amount": amount} for number, amount in nutrients.items()],
+    }
+
+
+RECORDS = [
+    _record(1, "Apples, raw, with skin", 52, 0.26, 13.81, 0.17),
+    _record(2, "Apple juice, unsweetened", 46, 0.1, 11.3, 0.13),
+    _record(3, "Bananas, raw", 89, 1.09, 22.84, 0.33),
+    _record(4, "Chicken breast, roasted", 165, 31.0, 0.0, 3.57),
+    {"fdcId": 5, "description": "Water, tap", "foodNutrients": []},  # no macros, not indexed
+]
+
+
+def _build(tmp_path, **kwargs):
+    path = str(tmp_path / "fdc_knn.bin")
+    assert build_knn_index(RECORDS, path) == 4
+    return NutrientKNN(path, name=None, **kwargs)
+
+
+def test_nearest_food_and_weighted_nutrients(tmp_path):
+    knn = _build(tmp_path, neighbours=1)
+    estimate = knn.nearest("2 ripe bananas")
+    assert estimate.neighbours[0][:2] == (3, "Bananas, raw")
+    assert estimate.nutrients["calories"] == 89
+    assert 0.5 < estimate.similarity <= 1.0
+
+    # Several neighbours blend their nutrients by similarity
+    blended = _build(tmp_path, neighbours=2).nearest("apple")
+    assert {fdc_id for fdc_id, _, _ in blended.neighbours} == {1, 2}
+    assert 46 < blended.nutrients["calories"] < 52
+
+
+def test_low_similarity_falls_through(tmp_path):
+    knn = _build(tmp_path)
+    assert asyncio.run(knn.estimate("roasted chicken breast", min_similarity=0.5)) is not None
+    assert asyncio.run(knn.estimate("chicken tikka masala", min_similarity=0.9)) is None
+    assert asyncio.run(knn.estimate("zzz")) is None
+    assert knn.stats()["low_similarity"] == 1
+
+
+def test_missing_index_is_disabled(tmp_path):
+    knn = NutrientKNN(str(tmp_path / "missing.bin"), name=None)
+    assert asyncio.run(knn.estimate("apple")) is None
+    assert not knn.enabled
+    assert asyncio.run(NutrientKNN(None, name=None).estimate("apple")) is None
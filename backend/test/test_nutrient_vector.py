@@ -0,0 +1,32 @@
+import sys
+import os
+from types import SimpleNamespace
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.nutrient_vector import NutrientVector, MACROS
+
+APPLE = {"calories": 52, "protein": 0.26, "fiber": 2.4, "carbs": 13.81, "fat": 0.17, "sugar": 10.39}
+
+
+def test_scale_per_100g_to_grams():
+    scaled = NutrientVector.from_dict(APPLE).for_grams(182).to_dict()
+    assert scaled == {"calories": 94.64, "protein": 0.47, "fiber": 4.37, "carbs": 25.13, "fat": 0.31, "sugar": 18.91}
+
+
+def test_sum_and_micronutrients():
+    meals = [SimpleNamespace(**APPLE), SimpleNamespace(**APPLE, sodium=None)]
+    totals = NutrientVector.sum(NutrientVector.from_object(meal) for meal in meals)
+    assert totals["calories"] == 104
+    # Micronutrients are only reported once present
+    assert tuple(totals.to_dict()) == MACROS
+    totals += NutrientVector.from_dict({"sodium": 5, "calories": "bad"})
+    assert totals.to_dict()["sodium"] == 5
+    assert totals.to_dict()["iron"] == 0
+
+
+def test_json_round_trip():
+    vector = NutrientVector.from_dict({**APPLE, "iron": 0.12})
+    assert NutrientVector.from_json(vector.to_json()) == vector
+    assert NutrientVector.sum([]) == NutrientVector()
@@ -0,0 +1,61 @@
+import asyncio
+import gc
+import sys
+import os
+import threading
+import weakref
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm.client as client_module
+
+
+def fresh_client_state(monkeypatch):
+    monkeypatch.setattr(client_module, "get_secret", lambda key: "sk-test")
+    monkeypatch.setattr(client_module, "_openai_client", None)
+    monkeypatch.setattr(client_module, "_global_semaphore", None)
+    monkeypatch.setattr(client_module, "_client_loop", None)
+
+
+async def get_client():
+    return client_module.get_openai_client()
+
+
+def test_client_is_reused_within_a_loop_and_dropped_with_it(monkeypatch):
+    fresh_client_state(monkeypatch)
+
+    async def twice():
+        return await get_client(), await get_client()
+
+    first, again = asyncio.run(twice())
+    assert first is again
+    old = weakref.ref(first)
+    del first, again
+
+    second = asyncio.run(get_client())
+    gc.collect()
+
+    # The finished loop's client is not kept alive next to the new one
+    assert old() is None
+    assert client_module._openai_client is second
+
+
+def test_client_of_a_running_loop_is_closed_on_that_loop(monkeypatch):
+    fresh_client_state(monkeypatch)
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever)
+    thread.start()
+    try:
+        old = asyncio.run_coroutine_threadsafe(get_client(), other_loop).result(timeout=5)
+
+        new = asyncio.run(get_client())
+
+        # The close was scheduled on the old loop, which still runs it
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), other_loop).result(timeout=5)
+        assert old._client.is_closed
+        assert new is not old and not new._client.is_closed
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join()
+        other_loop.close()
@@ -0,0 +1,61 @@
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.chat import apply_portion
+from database.schemas import FoodItem
+from utils.food_keys import starts_with_count
+from utils.portions import portion_grams, density_for, size_hint
+
+# SR Legacy style (undetermined unit, measure in modifier) and Foundation style portions
+APPLE_PORTIONS = [
+    {"amount": 1, "gramWeight": 125, "modifier": "cup, quartered or chopped", "measureUnit": {"name": "undetermined"}},
+    {"amount": 1, "gramWeight": 223, "modifier": "large (3-1/4\" dia)", "measureUnit": {"name": "undetermined"}},
+    {"amount": 1, "gramWeight": 182, "modifier": "medium (3\" dia)", "measureUnit": {"name": "undetermined"}},
+]
+MILK_PORTIONS = [{"amount": 1, "gramWeight": 244, "modifier": None, "measureUnit": {"name": "cup"}}]
+
+
+def test_mass_units_convert_directly():
+    assert portion_grams("white rice", 100, "g") == 100
+    assert portion_grams("chicken breast", 2, "oz") == 56.7
+
+
+def test_fdc_portions_are_used_for_household_measures():
+    assert portion_grams("apple", 2, None, APPLE_PORTIONS) == 364
+    assert portion_grams("apple", 1, None, APPLE_PORTIONS, size="large") == 223
+    assert portion_grams("apple", 0.5, "cup", APPLE_PORTIONS) == 62.5
+    # tbsp derived from the record's own cup weight
+    assert round(portion_grams("milk", 2, "tbsp", MILK_PORTIONS), 1) == 30.5
+
+
+def test_density_table_and_unconvertible_portions():
+    assert round(portion_grams("honey", 2, "tbsp"), 1) == 42.6
+    assert density_for("peanut butter") == 1.09
+    assert portion_grams("pizza", 2, "slice") is None
+    assert portion_grams("egg", 2, None) is None
+
+
+def test_size_hint():
+    assert size_hint("Large egg") == "large"
+    assert size_hint("eggs") is None
+
+
+def _serving(description: str) -> int:
+    return apply_portion(FoodItem(description=description, single_serving_size=100, user_serving_size=240)).user_serving_size
+
+
+def test_description_quantities_need_a_unit_or_a_leading_count():
+    # Percentages and brand numbers are part of the name, not a number of servings
+    assert _serving("2% milk") == 240
+    assert _serving("85% lean ground beef") == 240
+    assert _serving("7up") == 240
+    # A number inside the description does not count the item itself
+    assert _serving("salad with 3 eggs") == 240
+    assert _serving("1 cup 2% milk") == round(portion_grams("2% milk", 1, "cup"))
+    assert _serving("150g white rice") == 150
+
+    assert starts_with_count("2 eggs") and starts_with_count("a banana") and starts_with_count("½ avocado")
+    assert not starts_with_count("2% milk") and not starts_with_count("7up") and not starts_with_count("banana")
@@ -0,0 +1,63 @@
+import asyncio
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from utils.rate_limit import TokenBucket, RateLimited, BACKGROUND, INTERACTIVE, request_priority
+
+
+def test_burst_then_reject_when_wait_exceeds_budget():
+    bucket = TokenBucket(None, rate_per_hour=3600, burst=2, max_wait=0.1)
+
+    async def run():
+        await bucket.acquire()
+        await bucket.acquire()
+        with pytest.raises(RateLimited):
+            await bucket.acquire()
+
+    asyncio.run(run())
+    assert bucket.stats()["granted"] == 2
+    assert bucket.stats()["rejected"] == 1
+
+
+def test_interactive_waiters_are_served_before_background():
+    # 50 tokens/s: each waiter gets a token ~20 ms apart
+    bucket = TokenBucket(None, rate_per_hour=180000, burst=1, max_wait=1.0, background_reserve=0)
+    order = []
+
+    async def take(name, priority):
+        await bucket.acquire(priority)
+        order.append(name)
+
+    async def run():
+        await bucket.acquire()
+        background = asyncio.ensure_future(take("background", BACKGROUND))
+        await asyncio.sleep(0)
+        with request_priority(INTERACTIVE):
+            await asyncio.gather(take("interactive", None), background)
+
+    asyncio.run(run())
+    assert order == ["interactive", "background"]
+    assert bucket.stats()["waited"] == 2
+
+
+def test_quota_headers_and_429_block_requests():
+    bucket = TokenBucket(None, rate_per_hour=1000, burst=50, max_wait=1.0, cooldown=30)
+    bucket.observe(200, {"x-ratelimit-limit": "3600", "x-ratelimit-remaining": "3"})
+    stats = bucket.stats()
+    assert stats["tokens"] == 3
+    assert stats["rate_per_hour"] == 3600
+    assert stats["quota_remaining"] == 3
+
+    bucket.observe(429, {"retry-after": "10"})
+
+    async def run():
+        with pytest.raises(RateLimited):
+            await bucket.acquire()
+
+    asyncio.run(run())
+    assert bucket.stats()["throttled"] == 1
+    assert 9 < bucket.stats()["blocked_for"] <= 10
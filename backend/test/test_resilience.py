@@ -0,0 +1,113 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from utils.resilience import Dependency, CircuitOpen
+
+
+def _flaky(failures: int, result="ok"):
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise ConnectionError("boom")
+        return result
+
+    return fn, calls
+
+
+def test_retries_transient_failures():
+    dependency = Dependency(None, lambda e: isinstance(e, ConnectionError), attempts=3, base_delay=0.001)
+    fn, calls = _flaky(2)
+    assert asyncio.run(dependency.call(fn)) == "ok"
+    assert len(calls) == 3
+    assert dependency.stats()["retries"] == 2
+    assert dependency.stats()["state"] == "closed"
+
+    # Errors that are not the dependency's fault are raised at once
+    async def bad_request():
+        calls.append(1)
+        raise ValueError("bad input")
+
+    with pytest.raises(ValueError):
+        asyncio.run(dependency.call(bad_request))
+    assert dependency.stats()["failures"] == 2
+
+
+def test_circuit_opens_then_probes():
+    dependency = Dependency(None, lambda e: True, attempts=1, failure_threshold=2, reset_timeout=0.05)
+    fn, calls = _flaky(2)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            asyncio.run(dependency.call(fn))
+    assert not dependency.available
+
+    with pytest.raises(CircuitOpen):
+        asyncio.run(dependency.call(fn))
+    assert len(calls) == 2
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert dependency.stats()["state"] == "half_open"
+    assert asyncio.run(dependency.call(fn)) == "ok"
+    assert dependency.stats()["state"] == "closed"
+
+
+def test_hedged_request_after_p95_delay():
+    dependency = Dependency(None, lambda e: True, hedge=True, hedge_min_delay=0.01)
+    dependency._latencies.extend([0.01] * 20)
+    delays = [0.5, 0.0]
+
+    async def fn():
+        await asyncio.sleep(delays.pop(0))
+        return "fast"
+
+    async def run():
+        started = asyncio.get_running_loop().time()
+        result = await dependency.call(fn)
+        return result, asyncio.get_running_loop().time() - started
+
+    result, elapsed = asyncio.run(run())
+    assert result == "fast"
+    assert elapsed < 0.2
+    assert dependency.stats()["hedges"] == 1
+    assert dependency.stats()["hedge_wins"] == 1
+
+
+def test_each_attempt_and_hedge_takes_its_own_slot():
+    events = []
+    active = {"slots": 0, "max": 0}
+
+    @asynccontextmanager
+    async def slot():
+        active["slots"] += 1
+        active["max"] = max(active["max"], active["slots"])
+        events.append("enter")
+        try:
+            yield
+        finally:
+            active["slots"] -= 1
+            events.append("exit")
+
+    # Retries back off outside the slot
+    dependency = Dependency(None, lambda e: True, attempts=2, base_delay=0.01, slot=slot)
+    fn, _ = _flaky(1)
+    assert asyncio.run(dependency.call(fn)) == "ok"
+    assert events == ["enter", "exit", "enter", "exit"]
+
+    # A hedge is a second concurrent request, so it holds a second slot
+    hedged = Dependency(None, lambda e: True, hedge=True, hedge_min_delay=0.01, slot=slot)
+    hedged._latencies.extend([0.01] * 20)
+    delays = [0.2, 0.0]
+
+    async def slow_then_fast():
+        await asyncio.sleep(delays.pop(0))
+        return "fast"
+
+    assert asyncio.run(hedged.call(slow_then_fast)) == "fast"
+    assert active == {"slots": 0, "max": 2}
@@ -0,0 +1,100 @@
+import asyncio
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.deadline import DeadlineExceeded, deadline_scope, remaining
+from utils.singleflight import SingleFlight
+from utils.cache import TieredCache
+
+
+def test_concurrent_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "banana"
+
+    async def run():
+        return await asyncio.gather(*[flights.do("banana", fetch) for _ in range(5)])
+
+    assert asyncio.run(run()) == ["banana"] * 5
+    assert calls == [1]
+    assert flights.stats()["coalesced"] == 4
+    assert flights.stats()["in_flight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return 42
+
+    async def run():
+        first = asyncio.ensure_future(flights.do("k", fetch))
+        second = asyncio.ensure_future(flights.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 42
+
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("usda down")
+
+    async def run():
+        return await asyncio.gather(*[flights.do("k", fetch) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert flights.stats()["errors"] == 1
+
+
+def test_cache_misses_are_coalesced():
+    cache = TieredCache("test_singleflight", ttl=60)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"fdcId": 1}
+
+    async def run():
+        return await asyncio.gather(*[cache.get_or_fetch("1", fetch) for _ in range(4)])
+
+    assert asyncio.run(run()) == [{"fdcId": 1}] * 4
+    assert calls == [1]
+    assert cache.stats()["coalesced"] == 3
+
+
+def test_shared_call_ignores_the_first_callers_deadline():
+    flights = SingleFlight()
+    seen = []
+
+    async def fetch():
+        seen.append(remaining())
+        await asyncio.sleep(0.1)
+        return "banana"
+
+    async def call(seconds):
+        with deadline_scope(seconds):
+            return await flights.do("banana", fetch)
+
+    async def run():
+        # The first caller starts the flight; running out of time fails only its own wait
+        return await asyncio.gather(call(0.02), call(5), return_exceptions=True)
+
+    hurried, patient = asyncio.run(run())
+    assert isinstance(hurried, DeadlineExceeded)
+    assert patient == "banana"
+    assert seen == [None]
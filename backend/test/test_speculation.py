@@ -0,0 +1,110 @@
+import asyncio
+import sys
+import os
+
+# Add parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api.chat as chat
+from database.schemas import ChatRequest, FoodItem
+
+ITEMS = [FoodItem(description=name, single_serving_size=100, user_serving_size=100) for name in ("apple", "rice")]
+
+
+def speculate(monkeypatch, action):
+    """Patch the LLM and USDA calls; returns the USDA searches that were started and finished"""
+    searched, finished = [], []
+
+    async def classify(client, request):
+        await asyncio.sleep(0.05)
+        return action, "hi" if action == "chat" else None, None
+
+    async def decompose(client, request):
+        return ITEMS
+
+    async def lookup(description):
+        searched.append(description)
+        await asyncio.sleep(0.2)
+        finished.append(description)
+
+    monkeypatch.setattr(chat, "CHAT_SPECULATIVE", True)
+    monkeypatch.setattr(chat, "CHAT_PIPELINE_MODE", "two_step")
+    monkeypatch.setattr(chat, "classify_request", classify)
+    monkeypatch.setattr(chat, "decompose_meal", decompose)
+    monkeypatch.setattr(chat, "lookup_usda_nutrition", lookup)
+    return searched, finished
+
+
+def test_speculative_decomposition_is_used_for_food(monkeypatch):
+    speculate(monkeypatch, "food_lookup")
+    before = dict(chat.speculation_stats)
+
+    async def run():
+        result = await chat.classify_with_speculation(None, ChatRequest(user_id="u", description="I ate an apple and rice"))
+        for search in result[3]:
+            chat.discard_search(search)
+        return result
+
+    action, _, food_items, searches = asyncio.run(run())
+
+    assert action == "food_lookup"
+    assert food_items == ITEMS
+    assert len(searches) == 2
+    assert chat.speculation_stats["used"] == before["used"] + 1
+    assert chat.speculation_stats["searches"] == before["searches"] + 2
+
+
+def test_speculative_work_is_cancelled_for_chat(monkeypatch):
+    searched, finished = speculate(monkeypatch, "chat")
+    before = dict(chat.speculation_stats)
+
+    async def run():
+        result = await chat.classify_with_speculation(None, ChatRequest(user_id="u", description="what is protein?"))
+        await asyncio.sleep(0.3)
+        return result
+
+    action, response_text, food_items, searches = asyncio.run(run())
+
+    assert (action, response_text, food_items, searches) == ("chat", "hi", None, [])
+    assert searched == ["apple", "rice"] and finished == []
+    assert chat.speculation_stats["wasted"] == before["wasted"] + 1
+    assert chat.speculation_stats["wasted_searches"] == before["wasted_searches"] + 2
+
+
+def test_lookups_reuse_speculative_searches(monkeypatch):
+    searched, _ = speculate(monkeypatch, "food_lookup")
+    before = dict(chat.speculation_stats)
+    selected = []
+
+    async def lookup(description):
+        searched.append(description)
+        return {"success": True, "search_results": [{"fdc_id": description}]}
+
+    async def resolution(food_key):
+        # apple was resolved before, so its search is not needed
+        return "123" if food_key == "apple" else None
+
+    async def select(client, item, usda_result, select=None):
+        selected.append(usda_result["search_results"][0]["fdc_id"])
+        return usda_result["search_results"][0]["fdc_id"], "llm"
+
+    async def nutrition(client, item, fdc_id):
+        return {"nutrition": {"description": item.description, "fdc_id": fdc_id}}
+
+    monkeypatch.setattr(chat, "lookup_usda_nutrition", lookup)
+    monkeypatch.setattr(chat.food_resolutions, "get", resolution)
+    monkeypatch.setattr(chat.food_resolutions, "record", lambda *args: None)
+    monkeypatch.setattr(chat, "select_usda_food", select)
+    monkeypatch.setattr(chat, "usda_nutrition_for_item", nutrition)
+    monkeypatch.setattr(chat, "LLM_BATCH_ESTIMATION", False)
+    monkeypatch.setattr(chat, "LLM_BATCH_SELECTION", False)
+
+    response = asyncio.run(chat.run_chat_pipeline(None, ChatRequest(user_id="u", description="I ate an apple and rice")))
+
+    assert [meal["fdc_id"] for meal in response.meals] == ["123", "rice"]
+    # Each item was searched once, speculatively; apple's search went unused
+    assert sorted(searched) == ["apple", "rice"]
+    assert selected == ["rice"]
+    assert chat.speculation_stats["searches"] == before["searches"] + 2
+    assert chat.speculation_stats["wasted_searches"] == before["wasted_searches"] + 1
+    assert not chat._speculative_searches
@@ -0,0 +1,91 @@
+"""Micro-batching of concurrent single-key loads into one bulk call."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from .deadline import within_deadline
+from .metrics import register_stats
+from .rate_limit import current_priority, priority_context
+
+
+class MicroBatcher:
+    """
+    Collects keys requested within a short window (across coroutines and
+    requests in the same process) and resolves them with one load_many call.
+    Short-lived batchers can pass name=None to stay out of /metrics.
+
+    A batch mixes callers from different requests, so by default load_many runs
+    in an empty context (no caller's deadline or concurrency slots) bounded by
+    timeout, at the priority of its most urgent caller, and each caller waits
+    within its own deadline. A batcher owned by a single request passes
+    isolated=False to run under its context.
+    """
+
+    def __init__(self, name: Optional[str], load_many: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+                 window: float = 0.005, max_batch: int = 20, timeout: Optional[float] = None,
+                 isolated: bool = True):
+        self.load_many = load_many
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.isolated = isolated
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._priority = None
+        self._timer = None
+        self._tasks = set()
+        self._counters = {"loads": 0, "batches": 0, "keys": 0, "timeouts": 0}
+        if name:
+            register_stats(name, self.stats)
+
+    async def load(self, key: str) -> Any:
+        """Value for key (None when load_many did not return it)"""
+        self._counters["loads"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(key, []).append(future)
+        priority = current_priority()
+        self._priority = priority if self._priority is None else min(self._priority, priority)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        # Giving up cancels only this caller's future, the batch carries on for the others
+        return await within_deadline(lambda: future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            batch, self._pending = self._pending, {}
+            priority, self._priority = self._priority, None
+            context = priority_context(priority) if self.isolated else None
+            task = asyncio.get_running_loop().create_task(self._run(batch), context=context)
+            # Keep a reference so the task is not garbage collected mid-flight
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: Dict[str, List[asyncio.Future]]):
+        self._counters["batches"] += 1
+        self._counters["keys"] += len(batch)
+        try:
+            async with asyncio.timeout(self.timeout):
+                results = await self.load_many(list(batch))
+        except TimeoutError:
+            self._counters["timeouts"] += 1
+            print(f"Batch load of {len(batch)} keys timed out after {self.timeout}s")
+            results = {}
+        except Exception as e:
+            print(f"Batch load failed: {e}")
+            results = {}
+
+        for key, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(results.get(key))
+
+    def stats(self) -> dict:
+        batches = self._counters["batches"]
+        return {
+            **self._counters,
+            "avg_batch_size": round(self._counters["keys"] / batches, 2) if batches else 0.0,
+        }
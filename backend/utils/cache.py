@@ -0,0 +1,260 @@
+"""Two-tier TTL cache: in-process LRU in front of a /tmp SQLite or Postgres store."""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from .metrics import register_stats
+from .rate_limit import BACKGROUND, priority_context
+from .singleflight import SingleFlight
+
+# Maximum entries kept per namespace in a persistent store (oldest are evicted first)
+STORE_MAX_ENTRIES = int(os.getenv("CACHE_STORE_MAX_ENTRIES", "50000"))
+DISK_CACHE_PATH = os.getenv("CACHE_DISK_PATH", "/tmp/nutrition_cache.sqlite3")
+
+# Trim the store once every this many writes
+_TRIM_EVERY = 500
+
+
+class LRUCache:
+    """Size-bounded in-process LRU of (value, stored_at) entries"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value: Any, stored_at: float):
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskStore:
+    """SQLite file store, survives Lambda warm invocations via /tmp"""
+
+    blocking = False
+
+    def __init__(self, path: str = DISK_CACHE_PATH, max_entries: int = STORE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "stored_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_cache_entries_stored_at ON cache_entries (namespace, stored_at)"
+        )
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, namespace: str, key: str, value: Any, stored_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), stored_at)
+            )
+            self._writes += 1
+            if self._writes % _TRIM_EVERY == 0:
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key IN ("
+                    "SELECT key FROM cache_entries WHERE namespace = ? "
+                    "ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (namespace, namespace, self.max_entries)
+                )
+
+
+class PostgresStore:
+    """Store in the app database, shared by every Lambda container"""
+
+    blocking = True
+
+    def __init__(self, max_entries: int = STORE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._writes = 0
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[Any, float]]:
+        from database.db import get_db_session
+        from database.models import CacheEntryModel
+
+        db = get_db_session()
+        try:
+            entry = db.get(CacheEntryModel, (namespace, key))
+            return (entry.value, entry.stored_at) if entry else None
+        finally:
+            db.close()
+
+    def set(self, namespace: str, key: str, value: Any, stored_at: float):
+        from database.db import get_db_session
+        from database.models import CacheEntryModel
+
+        db = get_db_session()
+        try:
+            db.merge(CacheEntryModel(namespace=namespace, key=key, value=value, stored_at=stored_at))
+            db.commit()
+            self._writes += 1
+            if self._writes % _TRIM_EVERY == 0:
+                cutoff = db.query(CacheEntryModel.stored_at).filter(
+                    CacheEntryModel.namespace == namespace
+                ).order_by(CacheEntryModel.stored_at.desc()).offset(self.max_entries).limit(1).scalar()
+                if cutoff is not None:
+                    db.query(CacheEntryModel).filter(
+                        CacheEntryModel.namespace == namespace,
+                        CacheEntryModel.stored_at <= cutoff
+                    ).delete()
+                    db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+_stores = {}
+
+
+def get_store(backend: str):
+    """Shared store instance for a backend name ("memory", "disk" or "postgres")"""
+    if backend == "memory":
+        return None
+    if backend not in _stores:
+        if backend == "disk":
+            _stores[backend] = DiskStore()
+        elif backend == "postgres":
+            _stores[backend] = PostgresStore()
+        else:
+            raise ValueError(f"Unknown cache backend: {backend}")
+    return _stores[backend]
+
+
+class TieredCache:
+    """
+    TTL cache with an in-process LRU in front of an optional persistent store.
+
+    Entries older than ttl but younger than ttl + stale_ttl are served stale
+    while a background task refreshes them. Under Mangum the refresh may only
+    complete on the next warm invocation, which is fine for slow-moving data.
+    Concurrent misses for the same key share one fetch.
+    """
+
+    def __init__(self, namespace: str, ttl: float, stale_ttl: float = 0,
+                 max_size: int = 1024, backend: str = "memory"):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.memory = LRUCache(max_size)
+        try:
+            self.store = get_store(backend)
+        except Exception as e:
+            print(f"Cache store unavailable ({namespace}, {backend}), using memory only: {e}")
+            self.store = None
+            backend = "memory"
+        self.backend = backend
+        self._refreshing = {}
+        self._flights = SingleFlight()
+        self._counters = {"hits": 0, "stale_hits": 0, "misses": 0,
+                          "memory_hits": 0, "store_hits": 0, "refreshes": 0, "refresh_errors": 0, "store_errors": 0}
+        register_stats(f"cache.{namespace}", self.stats)
+
+    async def _store_call(self, method, *args):
+        try:
+            if self.store.blocking:
+                return await asyncio.to_thread(method, *args)
+            return method(*args)
+        except Exception as e:
+            self._counters["store_errors"] += 1
+            print(f"Cache store error ({self.namespace}): {e}")
+            return None
+
+    async def _lookup(self, key: str) -> Optional[Tuple[Any, float]]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            self._counters["memory_hits"] += 1
+            return entry
+        if self.store is None:
+            return None
+        entry = await self._store_call(self.store.get, self.namespace, key)
+        if entry is not None:
+            self._counters["store_hits"] += 1
+            self.memory.set(key, *entry)
+        return entry
+
+    async def set(self, key: str, value: Any):
+        stored_at = time.time()
+        self.memory.set(key, value, stored_at)
+        if self.store is not None:
+            await self._store_call(self.store.set, self.namespace, key, value, stored_at)
+
+    async def _refresh(self, key: str, fetch: Callable[[], Awaitable[Any]]):
+        value = await fetch()
+        if value:
+            await self.set(key, value)
+
+    def _refresh_done(self, key: str, task: asyncio.Task):
+        """Forget a finished refresh, counting its failure (the stale entry stays until the next one)"""
+        self._refreshing.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            self._counters["refresh_errors"] += 1
+            print(f"Cache refresh failed ({self.namespace}): {task.exception()}")
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, calling fetch() on a miss; empty results are not cached"""
+        entry = await self._lookup(key)
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < self.ttl:
+                self._counters["hits"] += 1
+                return value
+            if age < self.ttl + self.stale_ttl:
+                self._counters["stale_hits"] += 1
+                if key not in self._refreshing:
+                    self._counters["refreshes"] += 1
+                    # Nobody waits on a refresh: it runs without the request's deadline, and
+                    # rate-limited APIs serve it after interactive calls
+                    task = asyncio.create_task(self._refresh(key, fetch), context=priority_context(BACKGROUND))
+                    self._refreshing[key] = task
+                    task.add_done_callback(lambda done, key=key: self._refresh_done(key, done))
+                return value
+
+        self._counters["misses"] += 1
+        return await self._flights.do(key, lambda: self._fetch_and_set(key, fetch))
+
+    async def _fetch_and_set(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        value = await fetch()
+        if value:
+            await self.set(key, value)
+        return value
+
+    def stats(self) -> dict:
+        lookups = self._counters["hits"] + self._counters["stale_hits"] + self._counters["misses"]
+        return {
+            **self._counters,
+            "coalesced": self._flights.stats()["coalesced"],
+            "backend": self.backend,
+            "memory_entries": len(self.memory),
+            "hit_rate": round((lookups - self._counters["misses"]) / lookups, 4) if lookups else 0.0,
+        }
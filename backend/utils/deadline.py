@@ -0,0 +1,94 @@
+"""Per-request deadlines and stage time budgets, carried in context variables."""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+_deadline: ContextVar = ContextVar("request_deadline", default=None)
+_stage_timings: ContextVar = ContextVar("stage_timings", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """A stage or the whole request ran out of time"""
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """Give the enclosed calls (and tasks they create) at most seconds, never extending an outer deadline"""
+    deadline = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(deadline if outer is None else min(deadline, outer))
+    timings_token = _stage_timings.set({})
+    try:
+        yield
+    finally:
+        _stage_timings.reset(timings_token)
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline (None without one)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def time_limit(budget: Optional[float] = None, reserve: float = 0.0) -> Optional[float]:
+    """The smaller of budget and the time left minus reserve (None when neither applies)"""
+    left = remaining()
+    if left is not None:
+        left -= reserve
+        budget = left if budget is None else min(budget, left)
+    return None if budget is None else max(budget, 0.0)
+
+
+async def within_deadline(fn):
+    """Await fn() but give up (DeadlineExceeded) when the current deadline passes"""
+    limit = time_limit()
+    if limit is None:
+        return await fn()
+    if limit <= 0:
+        raise DeadlineExceeded("request deadline already passed")
+    try:
+        async with asyncio.timeout(limit) as scope:
+            return await fn()
+    except TimeoutError as e:
+        if scope.expired():
+            raise DeadlineExceeded(f"request deadline passed after {limit:.1f}s") from e
+        raise
+
+
+def stage_timings() -> dict:
+    """Milliseconds spent in each stage of the current deadline scope"""
+    return dict(_stage_timings.get() or {})
+
+
+@contextmanager
+def timed_stage(name: str):
+    """Record how long the enclosed block took under name, without a time limit"""
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings[name] = round((time.monotonic() - started) * 1000, 1)
+
+
+@asynccontextmanager
+async def stage(name: str, budget: Optional[float] = None, reserve: float = 0.0):
+    """
+    Run the enclosed block within time_limit(budget, reserve), recording how
+    long it took under name; raises DeadlineExceeded when the limit is hit.
+    Do not yield from a generator inside it: the limit cancels the whole task.
+    """
+    limit = time_limit(budget, reserve)
+    with timed_stage(name):
+        try:
+            async with asyncio.timeout(limit) as scope:
+                yield
+        except TimeoutError as e:
+            if scope.expired():
+                raise DeadlineExceeded(f"{name} did not finish within {limit:.1f}s") from e
+            raise
@@ -0,0 +1,193 @@
+"""Canonical food keys shared by the USDA, selection and estimation caches."""
+
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+
+class FoodKey(NamedTuple):
+    """Canonical description of a food plus the quantity stripped from it"""
+    key: str
+    quantity: Optional[float] = None
+    unit: Optional[str] = None
+
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11,
+    "twelve": 12, "dozen": 12, "half": 0.5, "quarter": 0.25,
+}
+UNICODE_FRACTIONS = {"½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4", "⅛": "1/8"}
+
+# Unit spellings -> canonical unit
+UNITS = {
+    "g": "g", "gr": "g", "gram": "g", "grams": "g", "gm": "g",
+    "kg": "kg", "kilo": "kg", "kilos": "kg", "kilogram": "kg", "kilograms": "kg",
+    "mg": "mg", "oz": "oz", "ounce": "oz", "ounces": "oz",
+    "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "ml": "ml", "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml",
+    "l": "l", "liter": "l", "liters": "l", "litre": "l", "litres": "l",
+    "cup": "cup", "cups": "cup",
+    "tbsp": "tbsp", "tbs": "tbsp", "tablespoon": "tbsp", "tablespoons": "tbsp",
+    "tsp": "tsp", "teaspoon": "tsp", "teaspoons": "tsp",
+    "glass": "glass", "glasses": "glass", "mug": "mug", "mugs": "mug",
+    "bowl": "bowl", "bowls": "bowl", "plate": "plate", "plates": "plate",
+    "slice": "slice", "slices": "slice", "piece": "piece", "pieces": "piece",
+    "handful": "handful", "handfuls": "handful", "can": "can", "cans": "can",
+    "bottle": "bottle", "bottles": "bottle", "serving": "serving", "servings": "serving",
+    "scoop": "scoop", "scoops": "scoop", "pinch": "pinch", "dash": "dash",
+    "stick": "stick", "sticks": "stick", "clove": "clove", "cloves": "clove",
+}
+
+FILLER_WORDS = frozenset({
+    "a", "an", "the", "some", "of", "ripe", "about", "approximately", "around",
+    "roughly", "just", "like", "maybe", "my", "i", "had", "ate", "approx",
+    "medium", "large", "small", "big", "little",
+})
+
+# Words that look plural but are not
+SINGULAR_EXCEPTIONS = frozenset({
+    "hummus", "asparagus", "couscous", "molasses", "swiss", "citrus", "grits",
+    "brussels", "chips", "fries", "greens", "glass", "bass", "cress",
+    "watercress", "series", "species", "sprinkles",
+})
+IRREGULAR_SINGULARS = {
+    "potatoes": "potato", "tomatoes": "tomato", "mangoes": "mango", "avocados": "avocado",
+    "leaves": "leaf", "loaves": "loaf", "halves": "half", "knives": "knife",
+    "cherries": "cherry", "berries": "berry", "strawberries": "strawberry",
+    "blueberries": "blueberry", "raspberries": "raspberry", "blackberries": "blackberry",
+    "anchovies": "anchovy", "patties": "patty", "cookies": "cookie", "pies": "pie",
+    "geese": "goose", "mice": "mouse", "sandwiches": "sandwich", "peaches": "peach",
+    "radishes": "radish", "dishes": "dish", "boxes": "box", "squashes": "squash",
+}
+
+# Local synonym table, applied to whole phrases first, then to single words
+PHRASE_SYNONYMS = {
+    "greek yoghurt": "greek yogurt",
+    "spring onion": "green onion",
+    "garbanzo bean": "chickpea",
+    "semi skimmed milk": "reduced fat milk",
+    "skimmed milk": "skim milk",
+    # Only beef mince is ground beef ("chicken mince", "mince pie" keep their words)
+    "minced beef": "ground beef",
+    "beef mince": "ground beef",
+    "minced steak": "ground beef",
+    "icing sugar": "powdered sugar",
+    "caster sugar": "granulated sugar",
+    "wholemeal bread": "whole wheat bread",
+    "brown bread": "whole wheat bread",
+    "porridge oat": "oatmeal",
+}
+WORD_SYNONYMS = {
+    "yoghurt": "yogurt", "yogourt": "yogurt",
+    "aubergine": "eggplant", "courgette": "zucchini", "capsicum": "bell pepper",
+    "coriander": "cilantro", "rocket": "arugula", "prawn": "shrimp",
+    "scallion": "green onion", "garbanzo": "chickpea", "soya": "soy",
+    "porridge": "oatmeal", "wholemeal": "whole wheat", "wholewheat": "whole wheat",
+    "oj": "orange juice", "pb": "peanut butter",
+    "beetroot": "beet", "swede": "rutabaga", "mangetout": "snow pea",
+}
+
+_FRACTION_RE = re.compile("|".join(UNICODE_FRACTIONS))
+_PHRASE_RE = re.compile(r"\b(" + "|".join(
+    re.escape(phrase) for phrase in sorted(PHRASE_SYNONYMS, key=len, reverse=True)
+) + r")\b")
+# 2, 1.5, 1/2 and mixed numbers like 1 1/2
+_NUMBER = r"\d+(?:\.\d+)?(?:\s+\d+\s*/\s*\d+|\s*/\s*\d+)?"
+_QUANTITY_RE = re.compile(rf"(?<![\w.])({_NUMBER})\s*([a-z]+)?\b")
+# "%" stays: "2% milk" and "85% lean ground beef" are different foods from "milk" and "lean ground beef"
+_PUNCTUATION_RE = re.compile(r"[^\w\s./%]")
+_PERCENT_RE = re.compile(r"(\d)\s+%")
+
+
+def singularize(word: str) -> str:
+    """Rule-based English singular form of a food word"""
+    if word in SINGULAR_EXCEPTIONS or len(word) <= 3:
+        return word
+    if word in IRREGULAR_SINGULARS:
+        return IRREGULAR_SINGULARS[word]
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def _parse_number(text: str) -> float:
+    value = 0.0
+    for part in text.split():
+        if "/" in part:
+            numerator, denominator = part.split("/")
+            value += float(numerator) / float(denominator) if float(denominator) else 0.0
+        else:
+            value += float(part)
+    return value
+
+
+def _is_name_token(text: str, match: re.Match) -> bool:
+    """A number that is part of the name: a percentage (2% milk) or a brand such as 7up"""
+    if text[match.end(1):].lstrip().startswith("%"):
+        return True
+    word = match.group(2)
+    return bool(word) and word not in UNITS and match.end(1) == match.start(2)
+
+
+def _extract_quantity(text: str):
+    """First numeric quantity (and its unit, if any) and the text without it"""
+    for match in _QUANTITY_RE.finditer(text):
+        if _is_name_token(text, match):
+            continue
+        quantity = _parse_number(re.sub(r"\s*/\s*", "/", match.group(1)))
+        unit = UNITS.get(match.group(2) or "")
+        end = match.end() if unit or not match.group(2) else match.end(1)
+        return quantity, unit, text[:match.start()] + " " + text[end:]
+    return None, None, text
+
+
+_LEADING_NUMBER_RE = re.compile(rf"^({_NUMBER})(?:\s|$)")
+
+
+def starts_with_count(text: str) -> bool:
+    """Whether the description opens with a count, as in 2 eggs or a banana (but not 2% milk or 7up)"""
+    text = _FRACTION_RE.sub(lambda m: " " + UNICODE_FRACTIONS[m.group(0)], (text or "").lower())
+    text = _PERCENT_RE.sub(r"\1%", text).strip()
+    words = text.split()
+    return bool(words) and (words[0] in NUMBER_WORDS or bool(_LEADING_NUMBER_RE.match(text)))
+
+
+@lru_cache(maxsize=8192)
+def canonical_food_key(text: str) -> FoodKey:
+    """
+    Canonical form of a food description: lowercased, singular, without
+    quantities or filler words, with local synonyms applied.
+
+    "Bananas", "banana ", "1 banana" and "a ripe banana" all map to "banana".
+    """
+    text = _FRACTION_RE.sub(lambda m: " " + UNICODE_FRACTIONS[m.group(0)], (text or "").lower())
+    text = _PUNCTUATION_RE.sub(" ", text)
+    text = _PERCENT_RE.sub(r"\1%", text)
+
+    quantity, unit, text = _extract_quantity(text)
+    words = text.split()
+
+    # Number words ("two eggs", "a banana") and a following unit ("a cup of milk")
+    if quantity is None and words and words[0] in NUMBER_WORDS:
+        quantity = float(NUMBER_WORDS[words[0]])
+        if len(words) > 1 and words[1] in UNITS:
+            unit = UNITS[words[1]]
+            words = words[2:]
+        else:
+            words = words[1:]
+    elif unit is None and words and words[0] in UNITS:
+        # "cup of milk" without an explicit count
+        unit = UNITS[words[0]]
+        quantity = 1.0 if quantity is None else quantity
+        words = words[1:]
+
+    words = [singularize(word) for word in words if word not in FILLER_WORDS and word != "."]
+    phrase = _PHRASE_RE.sub(lambda m: PHRASE_SYNONYMS[m.group(0)], " ".join(words))
+    phrase = " ".join(WORD_SYNONYMS.get(word, word) for word in phrase.split())
+
+    return FoodKey(phrase, quantity, unit)
@@ -0,0 +1,45 @@
+"""In-process registry of component statistics exposed on /metrics."""
+
+from collections import deque
+from typing import Callable, Dict
+
+_stats_providers: Dict[str, Callable[[], dict]] = {}
+
+
+def register_stats(name: str, provider: Callable[[], dict]):
+    """Register a callable returning a component's current counters"""
+    _stats_providers[name] = provider
+
+
+def collect_stats() -> Dict[str, dict]:
+    """Snapshot of every registered component's counters"""
+    return {name: provider() for name, provider in sorted(_stats_providers.items())}
+
+
+class LatencyStats:
+    """Count, mean and recent percentiles of durations, per label"""
+
+    def __init__(self, name: str, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._totals: Dict[str, list] = {}
+        register_stats(name, self.stats)
+
+    def record(self, label: str, seconds: float):
+        self._samples.setdefault(label, deque(maxlen=self.window)).append(seconds)
+        totals = self._totals.setdefault(label, [0, 0.0])
+        totals[0] += 1
+        totals[1] += seconds
+
+    def stats(self) -> dict:
+        result = {}
+        for label, samples in sorted(self._samples.items()):
+            count, total = self._totals[label]
+            ordered = sorted(samples)
+            result[label] = {
+                "count": count,
+                "avg_ms": round(total / count * 1000, 1),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] * 1000, 1),
+            }
+        return result
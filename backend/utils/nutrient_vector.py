@@ -0,0 +1,92 @@
+"""
+Fixed-order nutrient vectors for scaling and summing meals.
+
+Values live in a flat array('d') (8 bytes per nutrient, no per-field
+objects), so scaling by grams and summing long meal histories only touches
+one small buffer per vector. Macros are always reported; micronutrients
+(mg) only when some value is non-zero.
+"""
+import json
+from array import array
+from typing import Iterable, Optional
+
+MACROS = ("calories", "protein", "fiber", "carbs", "fat", "sugar")
+MICROS = ("sodium", "calcium", "iron")
+FIELDS = MACROS + MICROS
+_INDEX = {name: i for i, name in enumerate(FIELDS)}
+_ZEROS = array("d", [0.0]) * len(FIELDS)
+
+
+def _as_float(value) -> float:
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class NutrientVector:
+    """Nutrient amounts in FIELDS order"""
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: Optional[Iterable[float]] = None):
+        self.values = array("d", values) if values is not None else array("d", _ZEROS)
+        if len(self.values) != len(FIELDS):
+            raise ValueError(f"NutrientVector needs {len(FIELDS)} values, got {len(self.values)}")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NutrientVector":
+        """Vector from a dict keyed by nutrient name; missing or invalid values are 0"""
+        return cls(_as_float(data.get(name)) for name in FIELDS)
+
+    @classmethod
+    def from_object(cls, obj) -> "NutrientVector":
+        """Vector from attributes, e.g. a MealModel row"""
+        return cls(_as_float(getattr(obj, name, None)) for name in FIELDS)
+
+    @classmethod
+    def from_json(cls, text: str) -> "NutrientVector":
+        return cls.from_dict(json.loads(text))
+
+    @classmethod
+    def sum(cls, vectors: Iterable["NutrientVector"]) -> "NutrientVector":
+        """Element-wise total, accumulated into a single buffer"""
+        total = cls()
+        for vector in vectors:
+            total += vector
+        return total
+
+    def scaled(self, factor: float) -> "NutrientVector":
+        return NutrientVector(value * factor for value in self.values)
+
+    def for_grams(self, grams: float) -> "NutrientVector":
+        """Amounts for grams of a food, treating this vector as per 100 g"""
+        return self.scaled(grams / 100)
+
+    def __iadd__(self, other: "NutrientVector") -> "NutrientVector":
+        values, others = self.values, other.values
+        for i in range(len(values)):
+            values[i] += others[i]
+        return self
+
+    def __add__(self, other: "NutrientVector") -> "NutrientVector":
+        result = NutrientVector(self.values)
+        result += other
+        return result
+
+    def __getitem__(self, name: str) -> float:
+        return self.values[_INDEX[name]]
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, NutrientVector) and self.values == other.values
+
+    def __repr__(self) -> str:
+        return f"NutrientVector({self.to_dict()})"
+
+    def to_dict(self, digits: int = 2) -> dict:
+        """Macros always, micronutrients only when any is non-zero"""
+        fields = FIELDS if any(self.values[len(MACROS):]) else MACROS
+        return {name: round(self.values[_INDEX[name]], digits) for name in fields}
+
+    def to_json(self, digits: int = 2) -> str:
+        return json.dumps(self.to_dict(digits))
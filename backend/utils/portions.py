@@ -0,0 +1,117 @@
+"""
+Deterministic portion -> grams conversion.
+
+Mass units convert directly; household measures use the food's FDC
+foodPortions when they list the unit, then the bundled density table for
+volumes, then generic weights for a few small measures.
+"""
+import re
+from typing import List, Optional
+from utils.food_keys import UNITS
+
+GRAMS_PER_UNIT = {"g": 1.0, "kg": 1000.0, "mg": 0.001, "oz": 28.35, "lb": 453.6}
+ML_PER_UNIT = {
+    "ml": 1.0, "l": 1000.0, "cup": 240.0, "tbsp": 15.0, "tsp": 5.0,
+    "glass": 240.0, "mug": 250.0, "can": 355.0, "bottle": 500.0, "bowl": 350.0,
+}
+# Small measures without a useful volume, used when FDC has no matching portion
+DEFAULT_GRAMS_PER_UNIT = {"handful": 30.0, "pinch": 0.4, "dash": 0.6, "clove": 3.0}
+
+# Bundled densities (g/ml) by word in the canonical food key; longer phrases win
+DENSITIES = {
+    "water": 1.0, "tea": 1.0, "coffee": 1.0, "soda": 1.04, "cola": 1.04, "juice": 1.04,
+    "milk": 1.03, "cream": 1.0, "yogurt": 1.03, "kefir": 1.03, "soup": 1.0, "broth": 1.0,
+    "beer": 1.01, "wine": 0.99, "smoothie": 1.05,
+    "oil": 0.92, "butter": 0.96, "peanut butter": 1.09, "honey": 1.42, "syrup": 1.33,
+    "maple syrup": 1.32, "jam": 1.3, "ketchup": 1.14, "mayonnaise": 0.91, "sauce": 1.05,
+    "sugar": 0.85, "brown sugar": 0.93, "powdered sugar": 0.56, "flour": 0.53, "salt": 1.2,
+    "rice": 0.79, "oatmeal": 0.34, "oat": 0.34, "cereal": 0.15, "granola": 0.45,
+    "pasta": 0.55, "quinoa": 0.78, "lentil": 0.82, "bean": 0.75, "chickpea": 0.7,
+    "berry": 0.6, "blueberry": 0.6, "strawberry": 0.6, "grape": 0.64,
+    "nut": 0.6, "almond": 0.6, "peanut": 0.6, "cheese": 0.45, "cottage cheese": 0.95,
+    "spinach": 0.13, "lettuce": 0.2, "salad": 0.2, "broccoli": 0.38, "pea": 0.6, "corn": 0.7,
+}
+_DENSITY_PHRASES = sorted(DENSITIES, key=len, reverse=True)
+
+SIZE_WORDS = ("extra large", "large", "medium", "small")
+# Portion words that stand for "one of the item" when the user gives a plain count
+COUNT_WORDS = ("medium", "whole", "each", "piece", "item", "fruit", "large", "small", "serving")
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def density_for(food_key: str) -> Optional[float]:
+    """g/ml for a canonical food key from the bundled table"""
+    padded = f" {food_key} "
+    for phrase in _DENSITY_PHRASES:
+        if f" {phrase} " in padded:
+            return DENSITIES[phrase]
+    return None
+
+
+def _portion_text(portion: dict) -> str:
+    unit_name = (portion.get("measureUnit") or {}).get("name") or ""
+    if unit_name == "undetermined":
+        unit_name = ""
+    parts = [unit_name, portion.get("modifier") or "", portion.get("portionDescription") or ""]
+    return " ".join(parts).lower()
+
+
+def _grams_per_portion(portion: dict) -> Optional[float]:
+    grams = portion.get("gramWeight")
+    if not grams:
+        return None
+    return float(grams) / float(portion.get("amount") or 1)
+
+
+def _portion_units(text: str) -> set:
+    return {UNITS[word] for word in _WORD_RE.findall(text) if word in UNITS}
+
+
+def portion_grams(food_key: str, quantity: Optional[float], unit: Optional[str],
+                  food_portions: Optional[List[dict]] = None, size: Optional[str] = None) -> Optional[float]:
+    """
+    Grams for quantity x unit of a food, or None when it cannot be converted
+    locally. unit None means a plain count ("2 eggs"); size ("large") picks
+    between count portions.
+    """
+    quantity = 1.0 if quantity is None else quantity
+    if unit in GRAMS_PER_UNIT:
+        return quantity * GRAMS_PER_UNIT[unit]
+
+    portions = [(portion, _portion_text(portion)) for portion in food_portions or [] if _grams_per_portion(portion)]
+
+    if unit is None:
+        # Plain count: the requested size, else the most "typical single item" portion
+        for word in ((size,) if size else ()) + COUNT_WORDS:
+            for portion, text in portions:
+                if word in text and not _portion_units(text) - {"piece", "serving"}:
+                    return quantity * _grams_per_portion(portion)
+        return None
+
+    for portion, text in portions:
+        if unit in _portion_units(text):
+            return quantity * _grams_per_portion(portion)
+
+    if unit in ML_PER_UNIT:
+        ml = quantity * ML_PER_UNIT[unit]
+        # Food-specific density from any volume portion FDC lists (e.g. "1 cup = 245 g")
+        for portion, text in portions:
+            volume_units = _portion_units(text) & {"cup", "tbsp", "tsp", "ml"}
+            if volume_units:
+                return ml * _grams_per_portion(portion) / ML_PER_UNIT[volume_units.pop()]
+        density = density_for(food_key)
+        return ml * density if density else None
+
+    if unit in DEFAULT_GRAMS_PER_UNIT:
+        return quantity * DEFAULT_GRAMS_PER_UNIT[unit]
+    return None
+
+
+def size_hint(text: str) -> Optional[str]:
+    """Size word ("large", "small", ...) mentioned in a description"""
+    lowered = (text or "").lower()
+    for word in SIZE_WORDS:
+        if re.search(rf"\b{word}\b", lowered):
+            return word
+    return None
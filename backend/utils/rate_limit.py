@@ -0,0 +1,177 @@
+"""Token-bucket rate limiting with priority waiting for quota-capped APIs."""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Mapping, Optional
+from .deadline import time_limit
+from .metrics import register_stats
+
+# Lower values are served first
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+_priority: ContextVar = ContextVar("request_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def request_priority(level: int):
+    """Run the enclosed calls (and tasks they create) at the given priority"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+def priority_context(level: int) -> contextvars.Context:
+    """An empty context (no deadline or concurrency slots) that carries only the given priority"""
+    context = contextvars.Context()
+    context.run(_priority.set, level)
+    return context
+
+
+class RateLimited(Exception):
+    """No token could be granted within the wait budget"""
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at rate_per_hour, holding at most burst tokens.
+
+    Callers without an immediate token wait in a bounded priority queue for at
+    most max_wait seconds; a caller whose expected wait is longer is rejected
+    right away. Background callers leave background_reserve of the bucket to
+    interactive ones. observe() folds in the API's remaining-quota headers and
+    429 responses so the bucket never spends quota the server says is gone.
+    """
+
+    def __init__(self, name: Optional[str], rate_per_hour: float, burst: int, max_queue: int = 100,
+                 max_wait: float = 2.0, background_reserve: float = 0.2, cooldown: float = 60.0):
+        self.rate = rate_per_hour / 3600
+        self.capacity = float(burst)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.reserve = {INTERACTIVE: 0.0, BACKGROUND: background_reserve * burst}
+        self.cooldown = cooldown
+        self.tokens = float(burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._dispatcher = None
+        self._loop = None
+        self._quota = {"limit": None, "remaining": None}
+        self._counters = {"granted": 0, "waited": 0, "rejected": 0, "throttled": 0}
+        if name:
+            register_stats(name, self.stats)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _ready_in(self, priority: int, needed: float, now: float) -> float:
+        """Seconds until `needed` tokens above the priority's reserve are available"""
+        shortfall = needed + self.reserve[priority] - self.tokens
+        refill = shortfall / self.rate if shortfall > 0 else 0.0
+        return max(refill, self._blocked_until - now)
+
+    async def acquire(self, priority: int = None, max_wait: float = None):
+        """Take one token, waiting (by priority) up to max_wait; raises RateLimited"""
+        priority = current_priority() if priority is None else priority
+        max_wait = time_limit(self.max_wait if max_wait is None else max_wait)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Waiters belong to the loop they were created on (Mangum runs one loop per invocation)
+            self._waiters, self._dispatcher, self._loop = [], None, loop
+
+        now = time.monotonic()
+        self._refill(now)
+        ahead = sum(1 for waiter_priority, _, _ in self._waiters if waiter_priority <= priority)
+        wait = self._ready_in(priority, ahead + 1, now)
+        if wait <= 0:
+            self.tokens -= 1
+            self._counters["granted"] += 1
+            return
+        if wait > max_wait or len(self._waiters) >= self.max_queue:
+            self._counters["rejected"] += 1
+            raise RateLimited(f"rate limited, next token in {wait:.1f}s")
+
+        future = loop.create_future()
+        entry = (priority, next(self._sequence), future)
+        heapq.heappush(self._waiters, entry)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+        try:
+            await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError:
+            self._counters["rejected"] += 1
+            raise RateLimited(f"rate limited, no token within {max_wait:.1f}s") from None
+        finally:
+            if future.cancelled() and entry in self._waiters:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+        self._counters["waited"] += 1
+        self._counters["granted"] += 1
+
+    async def _dispatch(self):
+        """Hand tokens to waiters in priority order as the bucket refills"""
+        while self._waiters:
+            now = time.monotonic()
+            self._refill(now)
+            priority, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = self._ready_in(priority, 1, now)
+            if wait <= 0:
+                heapq.heappop(self._waiters)
+                self.tokens -= 1
+                future.set_result(None)
+            else:
+                await asyncio.sleep(wait)
+
+    def observe(self, status_code: int, headers: Mapping[str, str]):
+        """Update the bucket from a response's status and X-RateLimit-* headers"""
+        limit = headers.get("x-ratelimit-limit")
+        remaining = headers.get("x-ratelimit-remaining")
+        if limit is not None and limit.isdigit():
+            self._quota["limit"] = int(limit)
+            self.rate = int(limit) / 3600
+        if remaining is not None and remaining.isdigit():
+            self._quota["remaining"] = int(remaining)
+            self.tokens = min(self.tokens, float(remaining))
+
+        if status_code == 429 or remaining == "0":
+            self._counters["throttled"] += status_code == 429
+            retry_after = headers.get("retry-after")
+            pause = float(retry_after) if retry_after and retry_after.isdigit() else self.cooldown
+            self.tokens = 0.0
+            self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        self._refill(now)
+        waiting = {name: 0 for name in PRIORITY_NAMES.values()}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                waiting[PRIORITY_NAMES[priority]] += 1
+        return {
+            **self._counters,
+            "tokens": round(self.tokens, 2),
+            "capacity": self.capacity,
+            "rate_per_hour": round(self.rate * 3600, 1),
+            "waiting": waiting,
+            "blocked_for": round(max(0.0, self._blocked_until - now), 1),
+            "quota_limit": self._quota["limit"],
+            "quota_remaining": self._quota["remaining"],
+        }
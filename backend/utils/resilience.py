@@ -0,0 +1,183 @@
+"""Circuit breaking, jittered retries and hedged requests for external dependencies."""
+
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, AsyncContextManager, Awaitable, Callable, Optional
+from .deadline import remaining, within_deadline
+from .metrics import register_stats
+
+# Latency samples kept for the hedge delay, and the minimum before hedging starts
+LATENCY_WINDOW = 200
+HEDGE_MIN_SAMPLES = 20
+
+
+class CircuitOpen(Exception):
+    """The dependency's circuit is open, so the call was not attempted"""
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_timeout seconds; then a single probe call decides whether it closes.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return "open"
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead (claims the probe when half open)"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release(self):
+        """Give up a claimed probe without a verdict"""
+        self._probing = False
+
+    def success(self):
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def failure(self):
+        self.failures += 1
+        self._probing = False
+        if self._opened_at is not None or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+
+
+class Dependency:
+    """
+    Resilience policy for one external dependency: a circuit breaker, up to
+    attempts tries with full-jitter exponential backoff, and (when hedge is
+    set) a second concurrent request once the first has run longer than the
+    recent p95 latency. is_failure(error) decides which errors are the
+    dependency's fault; other errors are raised without retrying or tripping
+    the breaker. slot(), when given, is entered around every attempt and hedge
+    (not the backoff sleeps), e.g. a concurrency limit.
+    """
+
+    def __init__(self, name: Optional[str], is_failure: Callable[[Exception], bool],
+                 attempts: int = 2, base_delay: float = 0.2, max_delay: float = 2.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 hedge: bool = False, hedge_min_delay: float = 0.05,
+                 slot: Optional[Callable[[], AsyncContextManager]] = None):
+        self.is_failure = is_failure
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.slot = slot
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._counters = {"calls": 0, "failures": 0, "retries": 0, "short_circuits": 0,
+                          "hedges": 0, "hedge_wins": 0}
+        if name:
+            register_stats(f"dependency.{name}", self.stats)
+
+    @property
+    def available(self) -> bool:
+        """False while the circuit is open (calls would fail immediately)"""
+        return self.breaker.state != "open"
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: uniform in [0, min(max_delay, base_delay * 2**attempt)]"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def hedge_delay(self) -> Optional[float]:
+        """p95 of recent successful latencies, or None until there are enough samples"""
+        if len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return max(self.hedge_min_delay, ordered[int(0.95 * (len(ordered) - 1))])
+
+    async def call(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Run fn() under the policy; raises CircuitOpen or fn's last error"""
+        self._counters["calls"] += 1
+        for attempt in range(self.attempts):
+            if not self.breaker.allow():
+                self._counters["short_circuits"] += 1
+                raise CircuitOpen("circuit open")
+            try:
+                # No attempt outlives the request deadline (DeadlineExceeded is not a dependency failure)
+                result = await within_deadline(lambda: self._hedged(fn) if self.hedge else self._timed(fn))
+            except asyncio.CancelledError:
+                # A cancelled caller says nothing about the dependency; release a half-open probe
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not self.is_failure(e):
+                    self.breaker.release()
+                    raise
+                self._counters["failures"] += 1
+                self.breaker.failure()
+                delay = self.backoff(attempt)
+                left = remaining()
+                if attempt + 1 >= self.attempts or not self.available or (left is not None and delay >= left):
+                    raise
+                self._counters["retries"] += 1
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.success()
+                return result
+
+    async def _timed(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        # Latency is measured inside the slot, so queueing for it does not move the hedge delay
+        async with self.slot() if self.slot is not None else nullcontext():
+            started = time.monotonic()
+            result = await fn()
+            self._latencies.append(time.monotonic() - started)
+            return result
+
+    async def _hedged(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """First successful result of fn() and, after hedge_delay, a second fn()"""
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(self._timed(fn))
+        pending = {primary}
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    self._counters["hedges"] += 1
+                    pending.add(asyncio.ensure_future(self._timed(fn)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self._counters["hedge_wins"] += task is not primary
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        ordered = sorted(self._latencies)
+        return {
+            **self._counters,
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 1) if ordered else None,
+        }
@@ -0,0 +1,49 @@
+"""Coalescing of identical in-flight async calls (singleflight)."""
+
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Optional
+from .deadline import within_deadline
+from .metrics import register_stats
+
+
+class SingleFlight:
+    """
+    Concurrent do(key, fn) calls with the same key share one execution of fn.
+    The shared call runs in its own task, so a cancelled caller does not cancel
+    it for the others; its result or exception is delivered to every caller.
+    The task starts in an empty context, so it carries none of the first caller's
+    deadline, priority or concurrency slots; each caller waits within its own deadline.
+    """
+
+    def __init__(self, name: Optional[str] = None):
+        self._flights: Dict[str, asyncio.Task] = {}
+        self._counters = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+        if name:
+            register_stats(name, self.stats)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self._counters["calls"] += 1
+        task = self._flights.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self._counters["coalesced"] += 1
+        else:
+            self._counters["executions"] += 1
+            task = asyncio.get_running_loop().create_task(fn(), context=contextvars.Context())
+            self._flights[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+        return await within_deadline(lambda: asyncio.shield(task))
+
+    def _finish(self, key: str, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled() and task.exception() is not None:
+            self._counters["errors"] += 1
+
+    def stats(self) -> dict:
+        calls = self._counters["calls"]
+        return {
+            **self._counters,
+            "in_flight": len(self._flights),
+            "coalesced_rate": round(self._counters["coalesced"] / calls, 4) if calls else 0.0,
+        }
@@ -70,12 +70,10 @@ const ChatOverlay: React.FC<ChatOverlayProps> = ({
       const { data: result } = await api.post("/openai/chat", {
         user_id: user?.uid, // Dynamic user ID
         description: input,
-        history: context,
+        // The server keeps the history for known conversations
+        history: conversationId ? undefined : context,
         conversation_id: conversationId,
         user_feedback: userFeedback || undefined,
-        model: "gpt-4",
-        temperature: 0,
-        max_tokens: 150,
       });
 
       // Always use the conversation ID from the response